@@ -0,0 +1,73 @@
+import os
+import sys
+# Add project root to the Python path
+sys.path.insert(0, os.path.dirname(os.path.dirname(__file__)))
+
+import argparse
+import time
+import uuid
+
+from src.main import app, db
+from src.models.employee import Employee
+from src.models.change_journal import journal_changes, OPERATION_DELETE
+from src.routes.auth import principal_cache
+
+def create_bench_employee(password):
+    """Creates a throwaway employee that can log in; returns (id, email)."""
+    run_id = uuid.uuid4().hex[:8]
+    employee = Employee(name=f"bench-{run_id}", email=f"bench-{run_id}@bench.invalid", role="employee")
+    employee.set_password(password)
+    db.session.add(employee)
+    db.session.commit()
+    return employee.id, employee.email
+
+def delete_bench_employee(employee_id):
+    Employee.query.filter(Employee.id == employee_id).delete(synchronize_session=False)
+    # Bulk deletes skip the ORM journal listener: record the tombstone so synced clients drop it
+    journal_changes(db.session.connection(), "employee", [employee_id], OPERATION_DELETE)
+    db.session.commit()
+
+def time_requests(client, headers, employee_id, requests, cached):
+    """Average seconds per GET /auth/status; without `cached`, every request misses the principal cache."""
+    started = time.perf_counter()
+    for _ in range(requests):
+        if not cached:
+            principal_cache.invalidate(employee_id)
+        response = client.get("/auth/status", headers=headers)
+        assert response.status_code == 200, response.get_json()
+    return (time.perf_counter() - started) / requests
+
+def check_revocation(client, headers, employee_id):
+    """A role change bumps token_version: the token issued before it must be refused."""
+    employee = db.session.get(Employee, employee_id)
+    employee.role = "supervisor"
+    db.session.commit()
+    response = client.get("/auth/status", headers=headers)
+    assert response.status_code == 401, f"token still accepted after a role change: {response.status_code}"
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="GET /auth/status latency with and without the principal cache.")
+    parser.add_argument("--requests", type=int, default=2000, help="Requests per run")
+    args = parser.parse_args()
+
+    password = uuid.uuid4().hex
+    with app.app_context():
+        employee_id, email = create_bench_employee(password)
+        try:
+            client = app.test_client()
+            login = client.post("/auth/login", json={"username": email, "password": password})
+            assert login.status_code == 200, login.get_json()
+            headers = {"Authorization": f"Bearer {login.get_json()['access_token']}"}
+
+            time_requests(client, headers, employee_id, min(args.requests, 200), cached=True) # Warm up
+            uncached = time_requests(client, headers, employee_id, args.requests, cached=False)
+            cached = time_requests(client, headers, employee_id, args.requests, cached=True)
+            print(
+                f"/auth/status on {db.engine.dialect.name}: employee lookup {uncached * 1e6:8.1f} us, "
+                f"cached principal {cached * 1e6:8.1f} us per request ({uncached / cached:.1f}x)"
+            )
+            check_revocation(client, headers, employee_id)
+            print("Revocation OK: the token was refused after the employee's role changed.")
+        finally:
+            db.session.rollback()
+            delete_bench_employee(employee_id)
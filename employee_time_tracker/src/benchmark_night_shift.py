@@ -0,0 +1,44 @@
+import os
+import sys
+# Add project root to the Python path
+sys.path.insert(0, os.path.dirname(os.path.dirname(__file__)))
+
+import argparse
+import random
+import time
+from datetime import datetime, timedelta
+
+from src.utils.hours_calculator import night_shift_overlap_seconds
+from src.check_night_shift import legacy_night_shift_seconds
+
+def make_intervals(count, hours, seed=0):
+    """`count` local intervals of `hours` each, starting at random minutes over four weeks."""
+    rng = random.Random(seed)
+    base = datetime(2025, 3, 3)
+    length = timedelta(hours=hours)
+    intervals = []
+    for _ in range(count):
+        start = base + timedelta(minutes=rng.randrange(0, 28 * 24 * 60))
+        intervals.append((start, start + length))
+    return intervals
+
+def time_function(function, intervals):
+    started = time.perf_counter()
+    for start, end in intervals:
+        function(start, end)
+    return time.perf_counter() - started
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Night shift overlap timing: closed form vs minute sampling.")
+    parser.add_argument("--intervals", type=int, default=2000, help="Worked intervals per run")
+    parser.add_argument("--hours", type=float, nargs="+", default=[4, 9, 72], help="Interval lengths to time")
+    args = parser.parse_args()
+
+    for hours in args.hours:
+        intervals = make_intervals(args.intervals, hours)
+        legacy = time_function(legacy_night_shift_seconds, intervals)
+        closed_form = time_function(night_shift_overlap_seconds, intervals)
+        print(
+            f"{hours:>6g} h intervals: minute sampling {legacy * 1e6 / len(intervals):9.1f} us, "
+            f"closed form {closed_form * 1e6 / len(intervals):6.2f} us per interval ({legacy / closed_form:.0f}x)"
+        )
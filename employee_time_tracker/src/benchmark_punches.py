@@ -0,0 +1,97 @@
+
+import os
+import sys
+# Add project root to the Python path
+sys.path.insert(0, os.path.dirname(os.path.dirname(__file__)))
+
+import argparse
+import datetime
+import time
+import uuid
+import jwt
+from concurrent.futures import ThreadPoolExecutor
+
+from src.main import app, db
+from src.models.employee import Employee
+from src.models.time_record import TimeRecord
+from src.models.daily_work_summary import DailyWorkSummary
+from src.models.change_journal import journal_changes, OPERATION_DELETE
+from src.routes.auth import SECRET_KEY
+from src.utils import punch_writer
+
+PUNCH_SEQUENCE = ("/record/checkin", "/record/lunch/start", "/record/lunch/end", "/record/checkout")
+
+def create_bench_employees(count):
+    """Creates throwaway employees for the run and returns their ids."""
+    run_id = uuid.uuid4().hex[:8]
+    employees = [
+        Employee(
+            name=f"bench-{run_id}-{index}", email=f"bench-{run_id}-{index}@bench.invalid",
+            role="employee", password_hash="!" # Not a valid hash: these accounts can't log in
+        )
+        for index in range(count)
+    ]
+    db.session.add_all(employees)
+    db.session.commit()
+    return [employee.id for employee in employees]
+
+def delete_bench_employees(employee_ids):
+    DailyWorkSummary.query.filter(DailyWorkSummary.employee_id.in_(employee_ids)).delete(synchronize_session=False)
+    TimeRecord.query.filter(TimeRecord.employee_id.in_(employee_ids)).delete(synchronize_session=False)
+    Employee.query.filter(Employee.id.in_(employee_ids)).delete(synchronize_session=False)
+    # Bulk deletes skip the ORM journal listener: record the tombstones so synced clients drop them
+    journal_changes(db.session.connection(), "employee", employee_ids, OPERATION_DELETE)
+    db.session.commit()
+
+def run_employee_shift(client, employee_id):
+    """Punches a full shift for one employee; returns [(latency seconds, status code)]."""
+    token = jwt.encode(
+        {"user_id": employee_id, "tv": 0, "exp": datetime.datetime.utcnow() + datetime.timedelta(hours=1)},
+        SECRET_KEY, algorithm="HS256"
+    )
+    headers = {"Authorization": f"Bearer {token}"}
+    samples = []
+    for path in PUNCH_SEQUENCE:
+        started = time.perf_counter()
+        response = client.post(path, headers=headers, json={"idempotency_key": uuid.uuid4().hex})
+        samples.append((time.perf_counter() - started, response.status_code))
+    return samples
+
+def run_benchmark(group_commit, employees, concurrency):
+    punch_writer.GROUP_COMMIT_ENABLED = group_commit
+    with app.app_context():
+        employee_ids = create_bench_employees(employees)
+    client = app.test_client()
+    try:
+        started = time.perf_counter()
+        with ThreadPoolExecutor(max_workers=concurrency) as pool:
+            shifts = list(pool.map(lambda employee_id: run_employee_shift(client, employee_id), employee_ids))
+        elapsed = time.perf_counter() - started
+    finally:
+        with app.app_context():
+            delete_bench_employees(employee_ids)
+
+    samples = [sample for shift in shifts for sample in shift]
+    latencies = sorted(latency for latency, _ in samples)
+    failed = sum(1 for _, status in samples if status >= 300)
+    return {
+        "mode": "group commit" if group_commit else "per-request commit",
+        "punches": len(samples),
+        "failed": failed,
+        "punches_per_second": len(samples) / elapsed,
+        "p50_ms": latencies[len(latencies) // 2] * 1000,
+        "p99_ms": latencies[min(len(latencies) - 1, int(len(latencies) * 0.99))] * 1000,
+    }
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Punch ingestion load benchmark (uses the configured DATABASE_URL).")
+    parser.add_argument("--employees", type=int, default=400, help="Employees punching a full shift (4 punches each)")
+    parser.add_argument("--concurrency", type=int, default=32, help="Concurrent request threads")
+    args = parser.parse_args()
+
+    for group_commit in (False, True):
+        result = run_benchmark(group_commit, args.employees, args.concurrency)
+        print(
+            f"{result['mode']:>20}: {result['punches']} punches, {result['failed']} failed, "
+            f"{result['punches_per_second']:.0f} punches/s, p50 {result['p50_ms']:.1f} ms, p99 {result['p99_ms']:.1f} ms"
+        )
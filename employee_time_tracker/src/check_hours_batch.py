@@ -0,0 +1,92 @@
+import os
+import sys
+# Add project root to the Python path
+sys.path.insert(0, os.path.dirname(os.path.dirname(__file__)))
+
+import random
+from datetime import datetime, date, timedelta
+from types import SimpleNamespace
+
+import numpy as np
+
+import src.main # Loads the app and models in dependency order
+from src.models.time_record import shift_work_date
+from src.utils.business_time import to_local, to_utc
+from src.utils.hours_batch import calculate_worked_hours_batch, encode_record_types
+from src.utils.hours_calculator import summarize_work_days, weekly_summaries_from_daily
+
+# Six weeks across a year boundary (ISO week 2025-01 starts on 2024-12-30)
+PERIOD_START = date(2024, 12, 16)
+PERIOD_DAYS = 42
+EMPLOYEES = 25
+
+# Local (start hour, punches as (record_type, hours after start)) day patterns
+DAY_PATTERNS = (
+    (8, (("arrival", 0), ("lunch_start", 4), ("lunch_end", 5), ("departure", 9))),
+    (22, (("arrival", 0), ("lunch_start", 3), ("lunch_end", 3.5), ("departure", 8))), # Night shift, ends the next day
+    (23, (("arrival", 0), ("departure", 7.25))),
+    (8, (("arrival", 0), ("lunch_start", 4))), # Left open: must not pair with the next day's punches
+    (9, (("arrival", 0), ("arrival", 0.5), ("departure", 8))), # Repeated arrival
+    (7, (("lunch_end", 0), ("departure", 2))), # Starts with a lunch_end
+    (10, (("departure", 0),)), # Lone departure
+    (8, (("arrival", 0), ("unknown", 1), ("departure", 6))), # Unknown type: ignored, but the day counts
+)
+
+def make_punches(rng):
+    """(employee_id, record) pairs; records carry timestamp (naive UTC), record_type and work_date."""
+    punches = []
+    for employee_id in range(1, EMPLOYEES + 1):
+        last_record_type = last_work_date = None
+        for offset in range(PERIOD_DAYS):
+            if rng.random() < 0.2:
+                continue # Day off
+            start_hour, pattern = rng.choice(DAY_PATTERNS)
+            day_start = datetime.combine(PERIOD_START + timedelta(days=offset), datetime.min.time())
+            for record_type, hours in pattern:
+                timestamp = to_utc(day_start + timedelta(hours=start_hour + hours, seconds=rng.randrange(0, 600)))
+                work_date = shift_work_date(record_type, timestamp, last_record_type, last_work_date)
+                punches.append((employee_id, SimpleNamespace(timestamp=timestamp, record_type=record_type, work_date=work_date)))
+                last_record_type, last_work_date = record_type, work_date
+    return punches
+
+def per_employee_report(records):
+    """Weekly summaries the way the single-employee report builds them (via daily summaries)."""
+    summaries = summarize_work_days(sorted(records, key=lambda record: record.timestamp))
+    return weekly_summaries_from_daily([
+        SimpleNamespace(work_date=work_date, **summary) for work_date, summary in sorted(summaries.items())
+    ])
+
+def check_parity(seed=0):
+    """Compares calculate_worked_hours_batch with the per-employee path; returns the weeks checked."""
+    punches = make_punches(random.Random(seed))
+    rng = random.Random(seed + 1)
+    rng.shuffle(punches) # The batch must not depend on input order
+
+    employee_ids = np.array([employee_id for employee_id, _ in punches], dtype=np.int64)
+    timestamps = np.array([to_local(record.timestamp) for _, record in punches], dtype="datetime64[s]").astype(np.int64)
+    record_type_codes = encode_record_types(record.record_type for _, record in punches)
+    work_days = np.array([record.work_date for _, record in punches], dtype="datetime64[D]").astype(np.int64)
+    batch = calculate_worked_hours_batch(employee_ids, timestamps, record_type_codes, work_days)
+
+    records_by_employee = {}
+    for employee_id, record in punches:
+        records_by_employee.setdefault(employee_id, []).append(record)
+    assert sorted(batch) == sorted(records_by_employee), "employees differ"
+
+    checked = 0
+    for employee_id, records in records_by_employee.items():
+        expected = per_employee_report(records)
+        actual = batch[employee_id]
+        assert [week["week_key"] for week in actual] == [week["week_key"] for week in expected], \
+            f"employee {employee_id}: weeks {[w['week_key'] for w in actual]}, expected {[w['week_key'] for w in expected]}"
+        for actual_week, expected_week in zip(actual, expected):
+            for field, expected_value in expected_week.items():
+                actual_value = actual_week[field]
+                same = abs(actual_value - expected_value) < 1e-6 if isinstance(expected_value, float) else actual_value == expected_value
+                assert same, f"employee {employee_id}, week {expected_week['week_key']}: {field} {actual_value}, expected {expected_value}"
+            checked += 1
+    return checked
+
+if __name__ == "__main__":
+    checked = check_parity()
+    print(f"calculate_worked_hours_batch OK: {checked} employee-weeks match the per-employee report.")
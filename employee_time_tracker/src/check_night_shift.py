@@ -0,0 +1,82 @@
+import os
+import sys
+# Add project root to the Python path
+sys.path.insert(0, os.path.dirname(os.path.dirname(__file__)))
+
+import random
+from datetime import datetime, timedelta, time
+
+from src.utils.business_time import to_local
+from src.utils.hours_calculator import night_shift_overlap_seconds, NIGHT_SHIFT_START, NIGHT_SHIFT_END
+
+# Night windows checked: the configured one (crosses midnight) and one that doesn't
+NIGHT_WINDOWS = ((NIGHT_SHIFT_START, NIGHT_SHIFT_END), (time(1, 0), time(4, 30)))
+# Days around the last America/Sao_Paulo DST changes (clocks back on 2018-02-18, forward on 2018-11-04)
+DST_DAYS = (datetime(2018, 2, 17), datetime(2018, 11, 3))
+
+def legacy_night_shift_seconds(start, end, night_start=NIGHT_SHIFT_START, night_end=NIGHT_SHIFT_END):
+    """The minute-by-minute sampling calculate_worked_hours used before the closed form."""
+    night_seconds = 0.0
+    current_time = start
+    while current_time < end:
+        next_time = current_time + timedelta(minutes=1)
+        # Check if the *middle* of the minute interval falls within night shift
+        check_time = (current_time + timedelta(seconds=30)).time()
+        if night_start <= night_end: # Shift doesn't cross midnight
+            is_night = night_start <= check_time < night_end
+        else: # Shift crosses midnight
+            is_night = check_time >= night_start or check_time < night_end
+        if is_night:
+            night_seconds += min(60, (end - current_time).total_seconds())
+        current_time = next_time
+    return night_seconds
+
+def sampling_tolerance(start, end):
+    """Sampling is exact on whole minutes; otherwise it can be off by up to a minute at each
+    window edge inside the interval and at its last, partial minute."""
+    if start.second == 0 and start.microsecond == 0 and end.second == 0 and end.microsecond == 0:
+        return 0.0
+    window_edges = 2 * ((end - start).days + 2)
+    return 60.0 * (window_edges + 1)
+
+def parity_cases(rng):
+    """(label, start, end) local intervals, as calculate_worked_hours builds them from punches."""
+    base = datetime(2025, 3, 3)
+    yield "midnight crossing", base + timedelta(hours=21), base + timedelta(hours=30)
+    yield "ends at midnight", base + timedelta(hours=20), base + timedelta(hours=24)
+    yield "inside the window", base + timedelta(hours=23, minutes=15), base + timedelta(hours=28, minutes=45)
+    yield "day shift", base + timedelta(hours=8), base + timedelta(hours=17)
+    yield "multi-day", base + timedelta(hours=9, minutes=7), base + timedelta(days=3, hours=4, minutes=41)
+    yield "empty", base + timedelta(hours=23), base + timedelta(hours=23)
+    yield "reversed", base + timedelta(hours=23), base + timedelta(hours=22)
+    # Punches are UTC: convert them like the calculator does, across the DST changes
+    for day in DST_DAYS:
+        for hour in range(0, 48):
+            start_utc = day + timedelta(hours=hour)
+            for length in (timedelta(hours=1), timedelta(hours=8, minutes=30), timedelta(hours=30)):
+                yield f"DST {day.date()} +{hour}h", to_local(start_utc), to_local(start_utc + length)
+    for index in range(300):
+        start = base + timedelta(minutes=rng.randrange(0, 14 * 24 * 60))
+        end = start + timedelta(minutes=rng.randrange(0, 3 * 24 * 60))
+        yield f"random whole minutes #{index}", start, end
+    for index in range(300):
+        start = base + timedelta(seconds=rng.randrange(0, 14 * 24 * 3600), microseconds=rng.randrange(0, 10 ** 6))
+        end = start + timedelta(seconds=rng.randrange(0, 3 * 24 * 3600))
+        yield f"random seconds #{index}", start, end
+
+def check_parity(seed=0):
+    """Compares the closed form with the legacy sampling; returns the number of cases checked."""
+    checked = 0
+    for label, start, end in parity_cases(random.Random(seed)):
+        for night_start, night_end in NIGHT_WINDOWS:
+            expected = legacy_night_shift_seconds(start, end, night_start, night_end)
+            actual = night_shift_overlap_seconds(start, end, night_start, night_end)
+            assert abs(actual - expected) <= sampling_tolerance(start, end), (
+                f"{label} [{start} - {end}) window {night_start}-{night_end}: {actual} s, sampling gave {expected} s"
+            )
+            checked += 1
+    return checked
+
+if __name__ == "__main__":
+    checked = check_parity()
+    print(f"night_shift_overlap_seconds OK: {checked} intervals match the minute sampling.")
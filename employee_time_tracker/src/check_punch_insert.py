@@ -0,0 +1,50 @@
+import os
+import sys
+# Add project root to the Python path
+sys.path.insert(0, os.path.dirname(os.path.dirname(__file__)))
+
+import uuid
+from datetime import datetime, timedelta
+
+from src.main import app, db
+from src.models.employee import Employee
+from src.models.time_record import TimeRecord
+from src.models.daily_work_summary import DailyWorkSummary
+from src.utils.business_time import to_utc
+from src.utils.punches import record_punch, PUNCH_CREATED
+
+# A night shift crossing midnight: every punch must report the day the shift started
+NIGHT_SHIFT = (("arrival", 22), ("lunch_start", 26), ("lunch_end", 27), ("departure", 30)) # Local hours from day start
+
+def check_record_punch(session):
+    """Punches a night shift for a throwaway employee and checks each PunchResult against the stored row."""
+    employee = Employee(
+        name=f"check-{uuid.uuid4().hex[:8]}", email=f"check-{uuid.uuid4().hex[:8]}@check.invalid",
+        role="employee", password_hash="!" # Not a valid hash: can't log in
+    )
+    session.add(employee)
+    session.commit()
+    employee_id = employee.id
+    shift_day = (datetime.utcnow() - timedelta(days=30)).date()
+    try:
+        for record_type, hour in NIGHT_SHIFT:
+            timestamp = to_utc(datetime.combine(shift_day, datetime.min.time()) + timedelta(hours=hour))
+            result = record_punch(session, employee_id, record_type, timestamp=timestamp)
+            assert result.outcome == PUNCH_CREATED, f"{record_type}: {result.outcome}"
+            stored = session.get(TimeRecord, result.record_id)
+            assert stored is not None, f"{record_type}: id {result.record_id} is not a stored punch"
+            assert (stored.employee_id, stored.record_type, stored.timestamp) == (employee_id, record_type, timestamp), \
+                f"{record_type}: id {result.record_id} points at {stored}"
+            assert stored.work_date == shift_day, f"{record_type}: work_date {stored.work_date}, expected {shift_day}"
+        summary = session.get(DailyWorkSummary, (employee_id, shift_day))
+        assert summary is not None and summary.worked_seconds == 7 * 3600, f"summary not refreshed: {summary}"
+    finally:
+        DailyWorkSummary.query.filter(DailyWorkSummary.employee_id == employee_id).delete(synchronize_session=False)
+        TimeRecord.query.filter(TimeRecord.employee_id == employee_id).delete(synchronize_session=False)
+        session.delete(session.get(Employee, employee_id)) # ORM delete: journaled for delta sync
+        session.commit()
+
+if __name__ == "__main__":
+    with app.app_context():
+        check_record_punch(db.session)
+        print(f"record_punch OK on {db.engine.dialect.name}: returned ids and work_dates match the stored rows.")
@@ -0,0 +1,24 @@
+import os
+import sys
+# Add project root to the Python path
+sys.path.insert(0, os.path.dirname(os.path.dirname(__file__)))
+
+from src.main import app, db
+from src.models.change_journal import compact_journal, JOURNAL_RETENTION_DAYS
+
+def compact_change_journal(retention_days=JOURNAL_RETENTION_DAYS):
+    """Drops change journal entries older than the retention window (run daily, e.g. from cron).
+
+    Clients whose sync cursor predates what is left get a 410 and reload the full list.
+    """
+    with app.app_context():
+        try:
+            deleted = compact_journal(db.session, retention_days)
+            db.session.commit()
+            print(f"Change journal compacted: {deleted} entries older than {retention_days} days deleted.")
+        except Exception as e:
+            db.session.rollback()
+            print(f"Error compacting change journal: {e}")
+
+if __name__ == "__main__":
+    compact_change_journal(int(sys.argv[1]) if len(sys.argv) > 1 else JOURNAL_RETENTION_DAYS)
@@ -0,0 +1,133 @@
+
+import os
+import sys
+# Add project root to the Python path
+sys.path.insert(0, os.path.dirname(os.path.dirname(__file__)))
+
+from datetime import datetime, date, time
+from sqlalchemy import select, text
+from src.main import app, db
+from src.models.employee import Employee
+from src.models.time_record import TimeRecord
+from src.models.daily_work_summary import DailyWorkSummary
+from src.models.material_log import MaterialLog
+from src.models.supervisor_checkin import SupervisorCheckin
+from src.models.supervisor_correction_request import SupervisorCorrectionRequest
+
+START = datetime.combine(date(2025, 1, 1), time.min)
+END = datetime.combine(date(2025, 1, 31), time.max)
+
+# (description, statement, index the plan is expected to use)
+HOT_QUERIES = [
+    (
+        "Time records of one employee in a period (time-records)",
+        select(TimeRecord).where(
+            TimeRecord.employee_id == 1,
+            TimeRecord.timestamp >= START,
+            TimeRecord.timestamp <= END
+        ).order_by(TimeRecord.timestamp),
+        "ix_time_record_employee_timestamp",
+    ),
+    (
+        "Punches of one employee on one work day (status, summary refresh)",
+        select(TimeRecord).where(
+            TimeRecord.employee_id == 1,
+            TimeRecord.work_date == START.date()
+        ),
+        "ix_time_record_employee_work_date",
+    ),
+    (
+        "First arrivals of all employees in a period (lateness)",
+        select(DailyWorkSummary.work_date, DailyWorkSummary.first_arrival, Employee.name, Employee.expected_arrival_time).join(
+            Employee, Employee.id == DailyWorkSummary.employee_id
+        ).where(
+            DailyWorkSummary.work_date >= START.date(),
+            DailyWorkSummary.work_date <= END.date(),
+            DailyWorkSummary.first_arrival.isnot(None),
+            Employee.expected_arrival_time.isnot(None)
+        ).order_by(DailyWorkSummary.first_arrival),
+        "ix_daily_work_summary_work_date",
+    ),
+    (
+        "Newest time records page for all employees (time-records keyset pagination)",
+        select(TimeRecord).where(
+            TimeRecord.timestamp <= END
+        ).order_by(TimeRecord.timestamp.desc(), TimeRecord.id.desc()).limit(100),
+        "ix_time_record_timestamp_id",
+    ),
+    (
+        "Material deliveries of one employee in a period",
+        select(MaterialLog).where(
+            MaterialLog.employee_id == 1,
+            MaterialLog.delivery_date >= START,
+            MaterialLog.delivery_date <= END
+        ),
+        "ix_material_log_employee_delivery_date",
+    ),
+    (
+        "Check-ins of one supervisor in a period",
+        select(SupervisorCheckin).where(
+            SupervisorCheckin.supervisor_id == 1,
+            SupervisorCheckin.timestamp >= START,
+            SupervisorCheckin.timestamp <= END
+        ),
+        "ix_supervisor_checkin_supervisor_timestamp",
+    ),
+    (
+        "Punches at one site in a period (site reports)",
+        select(TimeRecord).where(
+            TimeRecord.site_id == 1,
+            TimeRecord.timestamp >= START,
+            TimeRecord.timestamp <= END
+        ).order_by(TimeRecord.timestamp),
+        "ix_time_record_site_timestamp",
+    ),
+    (
+        "Supervisor check-ins at one site in a period (site reports)",
+        select(SupervisorCheckin).where(
+            SupervisorCheckin.site_id == 1,
+            SupervisorCheckin.timestamp >= START,
+            SupervisorCheckin.timestamp <= END
+        ),
+        "ix_supervisor_checkin_site_timestamp",
+    ),
+    (
+        "Pending correction requests, oldest first (admin review queue)",
+        select(SupervisorCorrectionRequest).where(
+            SupervisorCorrectionRequest.status == "pending"
+        ).order_by(SupervisorCorrectionRequest.request_timestamp, SupervisorCorrectionRequest.id).limit(50),
+        "ix_correction_request_status_timestamp",
+    ),
+]
+
+EXPLAIN_PREFIX = {
+    "sqlite": "EXPLAIN QUERY PLAN",
+    "postgresql": "EXPLAIN",
+    "mysql": "EXPLAIN",
+}
+
+def explain_hot_queries():
+    """Runs EXPLAIN on the hot report queries and checks each one uses its index.
+
+    Returns True when every query plan mentions the expected index.
+    """
+    with app.app_context():
+        dialect = db.engine.dialect
+        prefix = EXPLAIN_PREFIX.get(dialect.name, "EXPLAIN")
+        all_ok = True
+        with db.engine.connect() as connection:
+            if dialect.name == "postgresql":
+                # Small tables would otherwise be sequentially scanned regardless of indexes
+                connection.execute(text("SET enable_seqscan = off"))
+            for description, statement, expected_index in HOT_QUERIES:
+                sql = str(statement.compile(dialect=dialect, compile_kwargs={"literal_binds": True}))
+                plan_rows = connection.execute(text(f"{prefix} {sql}")).fetchall()
+                plan = "\n".join(" ".join(str(value) for value in row) for row in plan_rows)
+                uses_index = expected_index in plan
+                all_ok = all_ok and uses_index
+                print(f"[{'OK' if uses_index else 'MISSING INDEX'}] {description} (expects {expected_index})")
+                print("    " + plan.replace("\n", "\n    "))
+        return all_ok
+
+if __name__ == "__main__":
+    sys.exit(0 if explain_hot_queries() else 1)
@@ -12,7 +12,7 @@ app = Flask(__name__, static_folder=os.path.join(os.path.dirname(__file__), 'sta
 app.config['SECRET_KEY'] = 'your_very_secret_key_here' # Change this!
 
 # Initialize CORS - Allow all origins for development
-CORS(app, resources={r"/*": {"origins": "*"}})
+CORS(app, resources={r"/*": {"origins": "*"}}, expose_headers=["X-Sync-Cursor"]) # Sync cursor of full admin lists
 
 # Define db instance here
 db = SQLAlchemy()
@@ -37,6 +37,9 @@ from src.routes.record import record_bp
 from src.routes.admin import admin_bp
 from src.routes.supervisor import supervisor_bp
 from src.routes.materials import materials_bp # Import materials blueprint
+from src.routes.photos import photos_bp
+from src.routes.sites import sites_bp
+from src.routes.corrections import corrections_bp
 
 # Register blueprints
 app.register_blueprint(auth_bp, url_prefix='/auth') # Changed prefix for consistency
@@ -44,6 +47,9 @@ app.register_blueprint(record_bp, url_prefix='/record') # Changed prefix for con
 app.register_blueprint(admin_bp, url_prefix='/admin')
 app.register_blueprint(supervisor_bp, url_prefix="/supervisor") # Changed prefix for consistency
 app.register_blueprint(materials_bp, url_prefix='/admin/materials') # Register materials blueprint under admin
+app.register_blueprint(photos_bp, url_prefix='/photos') # Content-addressed photo store
+app.register_blueprint(sites_bp, url_prefix='/admin/sites') # Work sites and their geofences
+app.register_blueprint(corrections_bp, url_prefix='/admin/correction-requests') # Review queue
 
 
 @app.route('/', defaults={'path': ''})
@@ -77,6 +83,9 @@ if __name__ == '__main__':
         from src.models.supervisor_correction_request import SupervisorCorrectionRequest
         from src.models.material import MaterialType # Corrected import name
         from src.models.material_log import MaterialLog
+        from src.models.daily_work_summary import DailyWorkSummary
+        from src.models.change_journal import ChangeJournal
+        from src.models.site import Site
         db.create_all()
     app.run(host='0.0.0.0', port=port, debug=True)
 
@@ -0,0 +1,76 @@
+
+import os
+import sys
+# Add project root to the Python path
+sys.path.insert(0, os.path.dirname(os.path.dirname(__file__)))
+
+import sqlalchemy as sa
+from datetime import datetime
+from src.main import app, db
+
+# Import all models to ensure they are registered with SQLAlchemy
+from src.models.employee import Employee
+from src.models.time_record import TimeRecord
+from src.models.supervisor_checkin import SupervisorCheckin
+from src.models.supervisor_questionnaire import SupervisorQuestionnaireResponse
+from src.models.supervisor_correction_request import SupervisorCorrectionRequest
+from src.models.material import MaterialType
+from src.models.material_log import MaterialLog
+from src.models.daily_work_summary import DailyWorkSummary
+from src.models.change_journal import ChangeJournal
+from src.models.site import Site
+
+from src.migrations import load_migrations
+
+schema_migrations = sa.Table(
+    "schema_migrations", sa.MetaData(),
+    sa.Column("version", sa.Integer, primary_key=True),
+    sa.Column("description", sa.String(255), nullable=False),
+    sa.Column("applied_at", sa.DateTime, nullable=False),
+)
+
+def pending_migrations(connection):
+    """Versioned migrations not yet applied to the connection's database, in order."""
+    if not sa.inspect(connection).has_table(schema_migrations.name):
+        return load_migrations()
+    applied = {row.version for row in connection.execute(sa.select(schema_migrations.c.version))}
+    return [migration for migration in load_migrations() if migration.VERSION not in applied]
+
+def apply_migrations():
+    """Upgrades the database in place without dropping data.
+
+    Creates tables that don't exist yet, then applies every pending versioned migration,
+    each in its own transaction (or in autocommit mode if it sets TRANSACTIONAL = False).
+    """
+    with app.app_context():
+        # create_all only adds missing tables; existing tables are left untouched
+        db.create_all()
+        schema_migrations.create(db.engine, checkfirst=True)
+
+        with db.engine.connect() as connection:
+            pending = pending_migrations(connection)
+        if not pending:
+            print("Database is up to date.")
+            return
+
+        for migration in pending:
+            print(f"Applying migration {migration.VERSION:04d}: {migration.DESCRIPTION}...")
+            record_applied = schema_migrations.insert().values(
+                version=migration.VERSION,
+                description=migration.DESCRIPTION,
+                applied_at=datetime.utcnow()
+            )
+            if getattr(migration, "TRANSACTIONAL", True):
+                with db.engine.begin() as connection:
+                    migration.upgrade(connection)
+                    connection.execute(record_applied)
+            else:
+                # Statement by statement (CREATE INDEX CONCURRENTLY can't run in a transaction);
+                # if interrupted, the version isn't recorded and the migration runs again
+                with db.engine.connect().execution_options(isolation_level="AUTOCOMMIT") as connection:
+                    migration.upgrade(connection)
+                    connection.execute(record_applied)
+        print(f"Applied {len(pending)} migration(s).")
+
+if __name__ == "__main__":
+    apply_migrations()
@@ -0,0 +1,63 @@
+"""
+Versioned, non-destructive schema migrations.
+
+Each migration is a module in this package named `mNNNN_<description>.py` that defines
+VERSION (int), DESCRIPTION (str) and `upgrade(connection)`. Applied versions are recorded
+in the `schema_migrations` table; run `python src/migrate.py` to apply pending ones.
+Helpers below are idempotent so a migration can also run on databases whose tables were
+just created by `db.create_all()`.
+
+Each migration runs in its own transaction unless it sets TRANSACTIONAL = False; then it
+runs on an autocommit connection, which lets create_index_if_missing build PostgreSQL
+indexes without blocking writes. Such a migration must be safe to re-run from the start.
+"""
+import importlib
+import pkgutil
+import sqlalchemy as sa
+
+def load_migrations():
+    """Returns the migration modules of this package ordered by VERSION."""
+    migrations = []
+    for module_info in pkgutil.iter_modules(__path__):
+        if module_info.name.startswith("m"):
+            migrations.append(importlib.import_module(f"{__name__}.{module_info.name}"))
+    return sorted(migrations, key=lambda module: module.VERSION)
+
+def is_autocommit(connection):
+    return connection.get_execution_options().get("isolation_level") == "AUTOCOMMIT"
+
+def _postgresql_index_is_valid(connection, index_name):
+    return connection.execute(sa.text(
+        "SELECT i.indisvalid FROM pg_class c JOIN pg_index i ON i.indexrelid = c.oid WHERE c.relname = :name"
+    ), {"name": index_name}).scalar() is not False
+
+def create_index_if_missing(connection, table_name, index_name, column_names, unique=False):
+    """
+    Creates an index on an existing table unless an index with that name already exists.
+
+    A plain CREATE INDEX blocks writes to the table until the index is built. On PostgreSQL,
+    in a non-transactional migration (autocommit connection), it is built CONCURRENTLY
+    instead, without blocking writes; an invalid index left by an interrupted concurrent
+    build is dropped and built again.
+    """
+    concurrently = connection.dialect.name == "postgresql" and is_autocommit(connection)
+    inspector = sa.inspect(connection)
+    if index_name in {index["name"] for index in inspector.get_indexes(table_name)}:
+        if not concurrently or _postgresql_index_is_valid(connection, index_name):
+            return False
+        connection.execute(sa.text(f'DROP INDEX CONCURRENTLY IF EXISTS "{index_name}"'))
+    table = sa.Table(table_name, sa.MetaData(), autoload_with=connection)
+    sa.Index(
+        index_name, *[table.c[name] for name in column_names], unique=unique, postgresql_concurrently=concurrently
+    ).create(connection)
+    return True
+
+def add_column_if_missing(connection, table_name, column):
+    """Adds `column` (an unbound sa.Column) to an existing table unless it is already there."""
+    inspector = sa.inspect(connection)
+    if column.name in {existing["name"] for existing in inspector.get_columns(table_name)}:
+        return False
+    column_ddl = sa.schema.CreateColumn(column).compile(dialect=connection.dialect)
+    ddl = f"ALTER TABLE {table_name} ADD COLUMN {column_ddl}"
+    connection.execute(sa.text(ddl))
+    return True
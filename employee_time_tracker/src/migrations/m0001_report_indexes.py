@@ -0,0 +1,13 @@
+from src.migrations import create_index_if_missing
+
+VERSION = 1
+DESCRIPTION = "Composite indexes for the report queries on time_record, material_log and supervisor_checkin"
+# Only idempotent steps: indexes are built without blocking writes on PostgreSQL
+TRANSACTIONAL = False
+
+def upgrade(connection):
+    create_index_if_missing(connection, "time_record", "ix_time_record_employee_timestamp", ["employee_id", "timestamp"])
+    create_index_if_missing(connection, "time_record", "ix_time_record_type_timestamp", ["record_type", "timestamp"])
+    create_index_if_missing(connection, "material_log", "ix_material_log_employee_delivery_date", ["employee_id", "delivery_date"])
+    create_index_if_missing(connection, "material_log", "ix_material_log_type_delivery_date", ["material_type_id", "delivery_date"])
+    create_index_if_missing(connection, "supervisor_checkin", "ix_supervisor_checkin_supervisor_timestamp", ["supervisor_id", "timestamp"])
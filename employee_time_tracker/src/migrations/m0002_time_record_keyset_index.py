@@ -0,0 +1,9 @@
+from src.migrations import create_index_if_missing
+
+VERSION = 2
+DESCRIPTION = "Index on time_record (timestamp, id) for keyset pagination of /admin/time-records"
+# Only idempotent steps: indexes are built without blocking writes on PostgreSQL
+TRANSACTIONAL = False
+
+def upgrade(connection):
+    create_index_if_missing(connection, "time_record", "ix_time_record_timestamp_id", ["timestamp", "id"])
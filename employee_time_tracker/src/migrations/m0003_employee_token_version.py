@@ -0,0 +1,8 @@
+import sqlalchemy as sa
+from src.migrations import add_column_if_missing
+
+VERSION = 3
+DESCRIPTION = "Add employee.token_version for token revocation and the principal cache"
+
+def upgrade(connection):
+    add_column_if_missing(connection, "employee", sa.Column("token_version", sa.Integer, nullable=False, server_default="0"))
@@ -0,0 +1,14 @@
+import sqlalchemy as sa
+from src.migrations import add_column_if_missing, create_index_if_missing
+
+VERSION = 4
+DESCRIPTION = "Add time_record.idempotency_key with a unique (employee_id, idempotency_key) index"
+# Only idempotent steps: indexes are built without blocking writes on PostgreSQL
+TRANSACTIONAL = False
+
+def upgrade(connection):
+    add_column_if_missing(connection, "time_record", sa.Column("idempotency_key", sa.String(64), nullable=True))
+    create_index_if_missing(
+        connection, "time_record", "ix_time_record_employee_idempotency_key",
+        ["employee_id", "idempotency_key"], unique=True
+    )
@@ -0,0 +1,9 @@
+import sqlalchemy as sa
+from src.migrations import add_column_if_missing
+
+VERSION = 5
+DESCRIPTION = "Add lunch start/end times to daily_work_summary (run rebuild_daily_summary.py to backfill)"
+
+def upgrade(connection):
+    add_column_if_missing(connection, "daily_work_summary", sa.Column("first_lunch_start", sa.DateTime, nullable=True))
+    add_column_if_missing(connection, "daily_work_summary", sa.Column("last_lunch_end", sa.DateTime, nullable=True))
@@ -0,0 +1,13 @@
+import sqlalchemy as sa
+from src.migrations import add_column_if_missing, create_index_if_missing
+
+VERSION = 6
+DESCRIPTION = "Tag time_record and supervisor_checkin with site_id / outside_geofence (site table via create_all)"
+# Only idempotent steps: indexes are built without blocking writes on PostgreSQL
+TRANSACTIONAL = False
+
+def upgrade(connection):
+    for table_name in ("time_record", "supervisor_checkin"):
+        add_column_if_missing(connection, table_name, sa.Column("site_id", sa.Integer, nullable=True))
+        add_column_if_missing(connection, table_name, sa.Column("outside_geofence", sa.Boolean, nullable=True))
+        create_index_if_missing(connection, table_name, f"ix_{table_name}_site_timestamp", ["site_id", "timestamp"])
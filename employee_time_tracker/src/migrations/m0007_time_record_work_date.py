@@ -0,0 +1,47 @@
+import sqlalchemy as sa
+from src.migrations import add_column_if_missing, create_index_if_missing
+
+VERSION = 7
+DESCRIPTION = (
+    "Add and backfill time_record.work_date (run rebuild_daily_summary.py afterwards to re-key summaries; "
+    "on PostgreSQL, writes to time_record block until the index is built and the backfill commits)"
+)
+
+BACKFILL_BATCH_SIZE = 1000
+
+def upgrade(connection):
+    from src.models.time_record import shift_work_date
+
+    add_column_if_missing(connection, "time_record", sa.Column("work_date", sa.Date, nullable=True))
+    create_index_if_missing(connection, "time_record", "ix_time_record_employee_work_date", ["employee_id", "work_date"])
+
+    time_record = sa.table(
+        "time_record",
+        sa.column("id", sa.Integer), sa.column("employee_id", sa.Integer), sa.column("timestamp", sa.DateTime),
+        sa.column("record_type", sa.String), sa.column("work_date", sa.Date)
+    )
+    # Walk every employee's punches in order: a punch's work_date depends on the previous one.
+    # Read in keyset batches so the table is never held in memory at once
+    order = (time_record.c.employee_id, time_record.c.timestamp, time_record.c.id)
+    update = time_record.update().where(time_record.c.id == sa.bindparam("record_id")).values(work_date=sa.bindparam("new_work_date"))
+    last_employee_id, last_record_type, last_work_date = None, None, None
+    position = None
+    while True:
+        query = sa.select(time_record).order_by(*order).limit(BACKFILL_BATCH_SIZE)
+        if position is not None:
+            query = query.where(sa.tuple_(*order) > sa.tuple_(*[sa.literal(value) for value in position]))
+        rows = connection.execute(query).all()
+        if not rows:
+            break
+        pending = []
+        for row in rows:
+            if row.employee_id != last_employee_id:
+                last_employee_id, last_record_type, last_work_date = row.employee_id, None, None
+            work_date = row.work_date
+            if work_date is None:
+                work_date = shift_work_date(row.record_type, row.timestamp, last_record_type, last_work_date)
+                pending.append({"record_id": row.id, "new_work_date": work_date})
+            last_record_type, last_work_date = row.record_type, work_date
+        if pending:
+            connection.execute(update, pending)
+        position = (rows[-1].employee_id, rows[-1].timestamp, rows[-1].id)
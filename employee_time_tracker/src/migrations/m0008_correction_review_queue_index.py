@@ -0,0 +1,11 @@
+from src.migrations import create_index_if_missing
+
+VERSION = 8
+DESCRIPTION = "Index supervisor_correction_request on (status, request_timestamp) for the review queue"
+# Only idempotent steps: indexes are built without blocking writes on PostgreSQL
+TRANSACTIONAL = False
+
+def upgrade(connection):
+    create_index_if_missing(
+        connection, "supervisor_correction_request", "ix_correction_request_status_timestamp", ["status", "request_timestamp"]
+    )
@@ -0,0 +1,27 @@
+import sqlalchemy as sa
+
+VERSION = 9
+DESCRIPTION = "Full-text search index over questionnaire responses (FTS5 on SQLite, tsvector/GIN on PostgreSQL)"
+
+BACKFILL_BATCH_SIZE = 500
+
+def upgrade(connection):
+    from src.utils.questionnaire_search import create_search_index, index_responses, SEARCHED_FIELDS
+
+    if not create_search_index(connection):
+        return # Searches fall back to LIKE on this database
+
+    response = sa.table(
+        "supervisor_questionnaire_response",
+        sa.column("id", sa.Integer), *[sa.column(field, sa.Text) for field in SEARCHED_FIELDS]
+    )
+    # Batches by id range, so the responses are never held in memory at once
+    last_id = 0
+    while True:
+        rows = connection.execute(
+            sa.select(response).where(response.c.id > last_id).order_by(response.c.id).limit(BACKFILL_BATCH_SIZE)
+        ).all()
+        if not rows:
+            break
+        index_responses(connection, rows)
+        last_id = rows[-1].id
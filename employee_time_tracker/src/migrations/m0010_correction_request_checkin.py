@@ -0,0 +1,8 @@
+import sqlalchemy as sa
+from src.migrations import add_column_if_missing
+
+VERSION = 10
+DESCRIPTION = "Link supervisor_correction_request to the visit check-in it was made on"
+
+def upgrade(connection):
+    add_column_if_missing(connection, "supervisor_correction_request", sa.Column("checkin_id", sa.Integer, nullable=True))
@@ -0,0 +1,9 @@
+from src.migrations import create_index_if_missing
+
+VERSION = 11
+DESCRIPTION = "Index change_journal.changed_at for the delta sync settle cutoff and journal retention"
+# Only idempotent steps: indexes are built without blocking writes on PostgreSQL
+TRANSACTIONAL = False
+
+def upgrade(connection):
+    create_index_if_missing(connection, "change_journal", "ix_change_journal_changed_at", ["changed_at"])
@@ -0,0 +1,9 @@
+from src.migrations import create_index_if_missing
+
+VERSION = 12
+DESCRIPTION = "Index daily_work_summary.work_date for the all-employee reports (lateness, hours worked)"
+# Only idempotent steps: indexes are built without blocking writes on PostgreSQL
+TRANSACTIONAL = False
+
+def upgrade(connection):
+    create_index_if_missing(connection, "daily_work_summary", "ix_daily_work_summary_work_date", ["work_date"])
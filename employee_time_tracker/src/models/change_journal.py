@@ -0,0 +1,155 @@
+from src.main import db # Import db from main app in src
+from datetime import datetime, timedelta
+import os
+
+# Import the journaled models so their listeners can be attached below
+from .employee import Employee
+from .material import MaterialType
+from .material_log import MaterialLog
+
+class ChangeJournal(db.Model):
+    """Append-only log of row changes, read by the `since=` delta sync of the admin lists.
+
+    The autoincrement id is the sync cursor: clients ask for entries after the last id they saw.
+    """
+    __table_args__ = (
+        db.Index("ix_change_journal_collection_id", "collection", "id"),
+        db.Index("ix_change_journal_changed_at", "changed_at"), # Settle cutoff and retention
+    )
+
+    id = db.Column(db.Integer, primary_key=True)
+    collection = db.Column(db.String(50), nullable=False) # e.g., "employee", "material_type", "material_log"
+    row_id = db.Column(db.Integer, nullable=False)
+    operation = db.Column(db.String(10), nullable=False) # "upsert" or "delete" (tombstone)
+    changed_at = db.Column(db.DateTime, nullable=False, default=datetime.utcnow)
+
+    def __repr__(self):
+        return f"<ChangeJournal {self.id}: {self.operation} {self.collection} {self.row_id}>"
+
+OPERATION_UPSERT = "upsert"
+OPERATION_DELETE = "delete"
+
+# Cursors must never pass an id whose transaction hasn't committed yet, or clients would skip
+# that change for good. Where journal writers are serialized until commit (SQLite's database
+# write lock; the advisory lock taken below on PostgreSQL) ids become visible in order and the
+# committed maximum is a safe cursor. Elsewhere ids can commit out of order, so entries younger
+# than this are not served yet; a journaling transaction that stays open longer than this can
+# still lose its change, so keep it above the slowest admin write.
+JOURNAL_SETTLE_SECONDS = float(os.getenv("CHANGE_JOURNAL_SETTLE_SECONDS", "2"))
+# Entries older than this are dropped by compact_change_journal.py; cursors from before the
+# oldest remaining entry are refused and the client reloads the full list
+JOURNAL_RETENTION_DAYS = int(os.getenv("CHANGE_JOURNAL_RETENTION_DAYS", "30"))
+# Transaction-scoped PostgreSQL advisory lock key serializing journal writers
+JOURNAL_WRITE_LOCK_KEY = 0x6A726E6C # "jrnl"
+
+COMMIT_ORDERED_DIALECTS = ("sqlite", "postgresql")
+
+class JournalCursorExpired(Exception):
+    """The sync cursor is older than the retained journal: the client must reload the full list."""
+
+def journal_changes(connection, collection, row_ids, operation):
+    """
+    Appends journal entries for rows written in the current transaction.
+
+    ORM changes to the journaled models are recorded automatically; call this after
+    writing them with Core statements (bulk inserts, bulk updates or deletes).
+    """
+    now = datetime.utcnow()
+    rows = [
+        {"collection": collection, "row_id": row_id, "operation": operation, "changed_at": now}
+        for row_id in row_ids
+    ]
+    if rows:
+        if connection.dialect.name == "postgresql":
+            # Held until commit: the next writer allocates its ids only after ours are visible
+            connection.execute(db.text("SELECT pg_advisory_xact_lock(:key)"), {"key": JOURNAL_WRITE_LOCK_KEY})
+        connection.execute(ChangeJournal.__table__.insert(), rows)
+
+def _commit_ordered(session):
+    return session.get_bind().dialect.name in COMMIT_ORDERED_DIALECTS
+
+def latest_settled_journal_id(session):
+    """Cursor for a full load: every change at or before it is included in a read started now."""
+    if not _commit_ordered(session):
+        cutoff = datetime.utcnow() - timedelta(seconds=JOURNAL_SETTLE_SECONDS)
+        unsettled = session.query(db.func.min(ChangeJournal.id)).filter(ChangeJournal.changed_at > cutoff).scalar()
+        if unsettled is not None:
+            return unsettled - 1
+    return session.query(db.func.max(ChangeJournal.id)).scalar() or 0
+
+def compact_journal(session, retention_days=JOURNAL_RETENTION_DAYS):
+    """
+    Deletes journal entries older than `retention_days`, always keeping the newest one so
+    read_changes can still tell expired cursors from current ones. Doesn't commit.
+
+    Returns:
+        int: Number of entries deleted.
+    """
+    newest_id = session.query(db.func.max(ChangeJournal.id)).scalar()
+    if newest_id is None:
+        return 0
+    cutoff = datetime.utcnow() - timedelta(days=retention_days)
+    return session.query(ChangeJournal).filter(
+        ChangeJournal.changed_at < cutoff,
+        ChangeJournal.id < newest_id
+    ).delete(synchronize_session=False)
+
+def read_changes(session, collection, since_id, limit):
+    """
+    Returns (upserted row ids, deleted row ids, new cursor id, has_more) after `since_id`.
+
+    Only each row's latest operation counts, so a row created and then deleted inside the
+    window is reported once, as deleted.
+
+    Raises:
+        JournalCursorExpired: If entries after `since_id` may have been compacted away.
+    """
+    oldest_id = session.query(db.func.min(ChangeJournal.id)).scalar()
+    if oldest_id is not None and since_id < oldest_id - 1:
+        raise JournalCursorExpired(since_id)
+
+    entries = session.query(ChangeJournal.id, ChangeJournal.row_id, ChangeJournal.operation, ChangeJournal.changed_at).filter(
+        ChangeJournal.collection == collection,
+        ChangeJournal.id > since_id
+    ).order_by(ChangeJournal.id).limit(limit + 1).all()
+    has_more = len(entries) > limit
+    entries = entries[:limit]
+
+    if not _commit_ordered(session):
+        # Stop before the first unsettled entry; it (and everything after it) is served next time
+        cutoff = datetime.utcnow() - timedelta(seconds=JOURNAL_SETTLE_SECONDS)
+        for index, entry in enumerate(entries):
+            if entry.changed_at > cutoff:
+                entries = entries[:index]
+                has_more = False
+                break
+
+    latest_operation = {}
+    for entry in entries:
+        latest_operation[entry.row_id] = entry.operation
+    upserted = [row_id for row_id, operation in latest_operation.items() if operation == OPERATION_UPSERT]
+    deleted = [row_id for row_id, operation in latest_operation.items() if operation == OPERATION_DELETE]
+    cursor_id = entries[-1].id if entries else since_id
+    return upserted, deleted, cursor_id, has_more
+
+# Journal ORM changes in the same transaction as the change itself
+from sqlalchemy import event
+
+JOURNALED_MODELS = {
+    Employee: "employee",
+    MaterialType: "material_type",
+    MaterialLog: "material_log",
+}
+
+def _listen_for_changes(model, collection):
+    @event.listens_for(model, "after_insert")
+    @event.listens_for(model, "after_update")
+    def journal_upsert(mapper, connection, target):
+        journal_changes(connection, collection, [target.id], OPERATION_UPSERT)
+
+    @event.listens_for(model, "after_delete")
+    def journal_delete(mapper, connection, target):
+        journal_changes(connection, collection, [target.id], OPERATION_DELETE)
+
+for journaled_model, journal_collection in JOURNALED_MODELS.items():
+    _listen_for_changes(journaled_model, journal_collection)
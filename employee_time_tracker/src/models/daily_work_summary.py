@@ -0,0 +1,123 @@
+from src.main import db # Import db from main app in src
+from datetime import datetime
+from collections import defaultdict
+
+# Import related models for relationships
+from .employee import Employee
+from .time_record import TimeRecord
+from src.utils.hours_calculator import summarize_work_days
+
+class DailyWorkSummary(db.Model):
+    """Materialized per-employee, per-day totals derived from TimeRecord punches.
+
+    Kept up to date on every commit that touches a TimeRecord (see the session listeners
+    below), so reports can read one row per employee-day instead of every raw punch.
+    """
+    # Reports over all employees filter on the day alone (the primary key leads with employee_id)
+    __table_args__ = (
+        db.Index("ix_daily_work_summary_work_date", "work_date"),
+    )
+
+    employee_id = db.Column(db.Integer, db.ForeignKey("employee.id"), primary_key=True)
+    work_date = db.Column(db.Date, primary_key=True)
+    first_arrival = db.Column(db.DateTime, nullable=True)
+    first_lunch_start = db.Column(db.DateTime, nullable=True)
+    last_lunch_end = db.Column(db.DateTime, nullable=True)
+    last_departure = db.Column(db.DateTime, nullable=True)
+    worked_seconds = db.Column(db.Float, nullable=False, default=0.0)
+    night_seconds = db.Column(db.Float, nullable=False, default=0.0) # Worked seconds inside the night shift window
+    lunch_seconds = db.Column(db.Float, nullable=False, default=0.0)
+    updated_at = db.Column(db.DateTime, default=datetime.utcnow, onupdate=datetime.utcnow)
+
+    employee = db.relationship("Employee")
+
+    def __repr__(self):
+        return f"<DailyWorkSummary {self.employee_id} on {self.work_date}>"
+
+# Key in session.info holding the (employee_id, work_date) pairs touched since the last commit
+TOUCHED_WORK_DAYS_KEY = "touched_work_days"
+# Same pairs, handed over to after_commit listeners once the summaries are refreshed
+COMMITTED_WORK_DAYS_KEY = "committed_work_days"
+
+def mark_work_day(session, employee_id, work_date):
+    """Flags the employee's work day (a TimeRecord.work_date) for a summary refresh on the next commit.
+
+    ORM changes to TimeRecord are tracked automatically; call this after writing punches
+    with Core statements (bulk inserts, raw updates) that bypass the ORM.
+    """
+    session.info.setdefault(TOUCHED_WORK_DAYS_KEY, set()).add((employee_id, work_date))
+
+def refresh_daily_summaries(session, work_days):
+    """
+    Recomputes DailyWorkSummary rows for the given (employee_id, work_date) pairs.
+
+    Punches carry the work_date of their shift, so each day is rebuilt from its own punches
+    (an equality lookup on ix_time_record_employee_work_date). Rows are created, updated,
+    or deleted when the day has no punches left.
+    """
+    days_by_employee = defaultdict(set)
+    for employee_id, work_date in work_days:
+        days_by_employee[employee_id].add(work_date)
+
+    for employee_id, days in days_by_employee.items():
+        records = session.query(TimeRecord).filter(
+            TimeRecord.employee_id == employee_id,
+            TimeRecord.work_date.in_(list(days))
+        ).order_by(TimeRecord.timestamp, TimeRecord.id).all()
+        summaries = summarize_work_days(records, days)
+
+        existing = {
+            row.work_date: row for row in session.query(DailyWorkSummary).filter(
+                DailyWorkSummary.employee_id == employee_id,
+                DailyWorkSummary.work_date.in_(list(days))
+            )
+        }
+        for work_date in days:
+            summary = summaries.get(work_date)
+            row = existing.get(work_date)
+            if summary is None:
+                if row is not None:
+                    session.delete(row)
+                continue
+            if row is None:
+                row = DailyWorkSummary(employee_id=employee_id, work_date=work_date)
+                session.add(row)
+            row.first_arrival = summary['first_arrival']
+            row.first_lunch_start = summary['first_lunch_start']
+            row.last_lunch_end = summary['last_lunch_end']
+            row.last_departure = summary['last_departure']
+            row.worked_seconds = summary['worked_seconds']
+            row.night_seconds = summary['night_seconds']
+            row.lunch_seconds = summary['lunch_seconds']
+
+# Keep summaries in sync with TimeRecord changes made through the ORM
+from sqlalchemy import event, inspect
+from sqlalchemy.orm import Session, object_session
+
+@event.listens_for(TimeRecord, "after_insert")
+@event.listens_for(TimeRecord, "after_delete")
+def track_inserted_deleted_punch(mapper, connection, target):
+    mark_work_day(object_session(target), target.employee_id, target.work_date)
+
+@event.listens_for(TimeRecord, "after_update")
+def track_updated_punch(mapper, connection, target):
+    session = object_session(target)
+    mark_work_day(session, target.employee_id, target.work_date)
+    # A moved punch also changes the day (or employee) it was moved away from
+    state = inspect(target)
+    old_employee_ids = state.attrs.employee_id.history.deleted or [target.employee_id]
+    old_work_dates = state.attrs.work_date.history.deleted or [target.work_date]
+    mark_work_day(session, old_employee_ids[0], old_work_dates[0])
+
+@event.listens_for(Session, "before_commit")
+def refresh_touched_work_days(session):
+    if session.new or session.dirty or session.deleted:
+        session.flush() # Tracks pending punches and makes them visible to the refresh queries
+    work_days = session.info.pop(TOUCHED_WORK_DAYS_KEY, None)
+    if work_days:
+        refresh_daily_summaries(session, work_days)
+        session.info.setdefault(COMMITTED_WORK_DAYS_KEY, set()).update(work_days)
+
+@event.listens_for(Session, "after_rollback")
+def discard_touched_work_days(session):
+    session.info.pop(TOUCHED_WORK_DAYS_KEY, None)
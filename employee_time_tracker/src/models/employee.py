@@ -3,6 +3,12 @@ from src.main import db # Import db from main app in src
 from datetime import datetime, date, time
 from sqlalchemy.dialects.mysql import LONGTEXT # Use LONGTEXT for potentially large text fields
 from werkzeug.security import generate_password_hash # To hash passwords
+from sqlalchemy.orm import deferred
+
+# The LONGTEXT HR columns are deferred as one group: they are only read by the full
+# employee listing, not by authentication, reports or dropdowns.
+# Use `.options(undefer_group(HR_DETAILS_GROUP))` when all of them are needed.
+HR_DETAILS_GROUP = "hr_details"
 
 class Employee(db.Model):
     id = db.Column(db.Integer, primary_key=True)
@@ -23,7 +29,7 @@ class Employee(db.Model):
     address_state = db.Column(db.String(2), nullable=True) # UF (e.g., SP)
     address_zip = db.Column(db.String(9), nullable=True) # Store formatted CEP (e.g., XXXXX-XXX)
     marital_status = db.Column(db.String(50), nullable=True)
-    dependents_info = db.Column(LONGTEXT, nullable=True) # Store JSON or text description
+    dependents_info = deferred(db.Column(LONGTEXT, nullable=True), group=HR_DETAILS_GROUP) # Store JSON or text description
 
     # Dados Contratuais
     admission_date = db.Column(db.Date, nullable=True)
@@ -51,19 +57,23 @@ class Employee(db.Model):
     # Pecuniary Abatement info could be stored elsewhere or calculated
 
     # 13º Salário (Usually calculated, but can store flags/notes)
-    thirteenth_salary_notes = db.Column(LONGTEXT, nullable=True)
+    thirteenth_salary_notes = deferred(db.Column(LONGTEXT, nullable=True), group=HR_DETAILS_GROUP)
 
     # Benefícios
-    benefits_info = db.Column(LONGTEXT, nullable=True) # Store JSON or text description (VT, VR, Health Plan, etc.)
+    benefits_info = deferred(db.Column(LONGTEXT, nullable=True), group=HR_DETAILS_GROUP) # Store JSON or text description (VT, VR, Health Plan, etc.)
 
     # Documentos Legais (Store references or flags, not the docs themselves)
-    legal_docs_references = db.Column(LONGTEXT, nullable=True) # e.g., path to scanned docs, notes
+    legal_docs_references = deferred(db.Column(LONGTEXT, nullable=True), group=HR_DETAILS_GROUP) # e.g., path to scanned docs, notes
 
     # Histórico de Avaliações e Treinamentos
-    evaluation_training_history = db.Column(LONGTEXT, nullable=True) # Store JSON or text description
+    evaluation_training_history = deferred(db.Column(LONGTEXT, nullable=True), group=HR_DETAILS_GROUP) # Store JSON or text description
 
     # Dados para Obrigações Legais e Previdenciárias
-    legal_obligations_info = db.Column(LONGTEXT, nullable=True) # Store relevant IDs or notes (INSS, FGTS, etc.)
+    legal_obligations_info = deferred(db.Column(LONGTEXT, nullable=True), group=HR_DETAILS_GROUP) # Store relevant IDs or notes (INSS, FGTS, etc.)
+
+    # Bumped to revoke every token issued so far (checked by token_required); password and
+    # role changes bump it automatically (see bump_token_version)
+    token_version = db.Column(db.Integer, nullable=False, default=0, server_default="0")
 
     # Timestamps
     created_at = db.Column(db.DateTime, default=datetime.utcnow)
@@ -82,4 +92,12 @@ class Employee(db.Model):
     def __repr__(self):
         return f"<Employee {self.id}: {self.name} ({self.email})>"
 
+# Revoke issued tokens when the credentials they were granted for change
+from sqlalchemy import event, inspect
 
+@event.listens_for(Employee, "before_update")
+def bump_token_version(mapper, connection, target):
+    state = inspect(target)
+    if state.attrs.password_hash.history.has_changes() or state.attrs.role.history.has_changes():
+        # Incremented in SQL, so concurrent updates can't lose a bump
+        target.token_version = Employee.token_version + 1
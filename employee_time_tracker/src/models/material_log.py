@@ -7,6 +7,11 @@ from .employee import Employee
 from .material import MaterialType # Corrected import
 
 class MaterialLog(db.Model):
+    __table_args__ = (
+        db.Index("ix_material_log_employee_delivery_date", "employee_id", "delivery_date"),
+        db.Index("ix_material_log_type_delivery_date", "material_type_id", "delivery_date"),
+    )
+
     id = db.Column(db.Integer, primary_key=True)
     material_type_id = db.Column(db.Integer, db.ForeignKey("material_type.id"), nullable=False) # Corrected ForeignKey
     employee_id = db.Column(db.Integer, db.ForeignKey("employee.id"), nullable=False) # Employee receiving the material
@@ -29,14 +34,19 @@ class MaterialLog(db.Model):
 
     def calculate_replacement_date(self):
         """Calculates the expected replacement date based on material type duration."""
-        if self.material_type and self.material_type.expected_duration_days:
-            self.expected_replacement_date = (self.delivery_date + timedelta(days=self.material_type.expected_duration_days)).date()
-        else:
-            self.expected_replacement_date = None
+        self.expected_replacement_date = expected_replacement_date(
+            self.delivery_date, self.material_type.expected_duration_days if self.material_type else None
+        )
 
     def __repr__(self):
         return f"<MaterialLog {self.id}: {self.quantity} of {self.material_type_id} to {self.employee_id} on {self.delivery_date}>"
 
+def expected_replacement_date(delivery_date, expected_duration_days):
+    """Day a delivery is due for replacement (None for materials without an expected duration)."""
+    if not expected_duration_days:
+        return None
+    return (delivery_date + timedelta(days=expected_duration_days)).date()
+
 # Add event listener to calculate replacement date before insert/update
 from sqlalchemy import event
 
@@ -0,0 +1,18 @@
+from src.main import db # Import db from main app in src
+from datetime import datetime
+
+class Site(db.Model):
+    """A work location (e.g., a condominium) with a circular geofence."""
+    id = db.Column(db.Integer, primary_key=True)
+    name = db.Column(db.String(150), nullable=False, unique=True)
+    address = db.Column(db.String(255), nullable=True)
+    latitude = db.Column(db.Float, nullable=False)
+    longitude = db.Column(db.Float, nullable=False)
+    radius_meters = db.Column(db.Float, nullable=False, default=150.0) # Geofence radius
+    active = db.Column(db.Boolean, nullable=False, default=True) # Inactive sites are ignored when tagging
+
+    created_at = db.Column(db.DateTime, default=datetime.utcnow)
+    updated_at = db.Column(db.DateTime, default=datetime.utcnow, onupdate=datetime.utcnow)
+
+    def __repr__(self):
+        return f"<Site {self.id}: {self.name}>"
@@ -4,14 +4,23 @@ from datetime import datetime
 
 # Import related models for relationships
 from .employee import Employee
+from .site import Site
 
 class SupervisorCheckin(db.Model):
+    __table_args__ = (
+        db.Index("ix_supervisor_checkin_supervisor_timestamp", "supervisor_id", "timestamp"),
+        db.Index("ix_supervisor_checkin_site_timestamp", "site_id", "timestamp"), # Site-level reports
+    )
+
     id = db.Column(db.Integer, primary_key=True)
     supervisor_id = db.Column(db.Integer, db.ForeignKey("employee.id"), nullable=False)
     timestamp = db.Column(db.DateTime, nullable=False, default=datetime.utcnow)
     latitude = db.Column(db.Float, nullable=True) # Optional, depending on requirements
     longitude = db.Column(db.Float, nullable=True) # Optional, depending on requirements
     photo_url = db.Column(db.String(255), nullable=False) # URL to the stored photo
+    # Site resolved from latitude/longitude when written (None without coordinates or sites nearby)
+    site_id = db.Column(db.Integer, db.ForeignKey("site.id"), nullable=True)
+    outside_geofence = db.Column(db.Boolean, nullable=True) # True if no site's geofence contains the location
     location_name = db.Column(db.String(255), nullable=True) # e.g., Condominium Name
 
     # Relationship (backref defined in SupervisorQuestionnaireResponse model)
@@ -6,13 +6,20 @@ from sqlalchemy.dialects.mysql import LONGTEXT
 # Import related models for relationships
 from .employee import Employee
 from .time_record import TimeRecord
+from .supervisor_checkin import SupervisorCheckin
 
 class SupervisorCorrectionRequest(db.Model):
+    __table_args__ = (
+        db.Index("ix_correction_request_status_timestamp", "status", "request_timestamp"), # Admin review queue
+    )
+
     id = db.Column(db.Integer, primary_key=True)
     supervisor_id = db.Column(db.Integer, db.ForeignKey("employee.id"), nullable=False)
     employee_id = db.Column(db.Integer, db.ForeignKey("employee.id"), nullable=False) # Employee whose record needs correction
     # Optional: Link to a specific time record being corrected
     time_record_id = db.Column(db.Integer, db.ForeignKey("time_record.id"), nullable=True)
+    # Optional: Check-in of the visit the request was made on (set by /supervisor/visits)
+    checkin_id = db.Column(db.Integer, db.ForeignKey("supervisor_checkin.id"), nullable=True)
     request_timestamp = db.Column(db.DateTime, nullable=False, default=datetime.utcnow)
 
     requested_change_type = db.Column(db.String(50), nullable=False) # e.g., "arrival_time", "departure_time", "lunch_start", "lunch_end", "absence_justification"
@@ -29,6 +36,7 @@ class SupervisorCorrectionRequest(db.Model):
     supervisor = db.relationship("Employee", foreign_keys=[supervisor_id], backref=db.backref("submitted_correction_requests", lazy=True))
     employee = db.relationship("Employee", foreign_keys=[employee_id], backref=db.backref("correction_requests_for", lazy=True))
     time_record = db.relationship("TimeRecord", backref=db.backref("correction_request", uselist=False, lazy=True))
+    checkin = db.relationship("SupervisorCheckin", backref=db.backref("correction_requests", lazy=True))
     reviewed_by_admin = db.relationship("Employee", foreign_keys=[reviewed_by_admin_id], backref=db.backref("reviewed_correction_requests", lazy=True))
 
     def __repr__(self):
@@ -1,18 +1,36 @@
 
 from src.main import db # Import db from main app in src
 from datetime import datetime
+from src.utils.business_time import local_date
 
 # Import related models for relationships
 from .employee import Employee
+from .site import Site
 
 class TimeRecord(db.Model):
+    # Composite indexes for the report queries (employee + period, punch type + period)
+    __table_args__ = (
+        db.Index("ix_time_record_employee_timestamp", "employee_id", "timestamp"),
+        db.Index("ix_time_record_type_timestamp", "record_type", "timestamp"),
+        db.Index("ix_time_record_timestamp_id", "timestamp", "id"), # Keyset pagination over all employees
+        db.Index("ix_time_record_employee_idempotency_key", "employee_id", "idempotency_key", unique=True),
+        db.Index("ix_time_record_site_timestamp", "site_id", "timestamp"), # Site-level reports
+        db.Index("ix_time_record_employee_work_date", "employee_id", "work_date"), # Per-day lookups and aggregations
+    )
+
     id = db.Column(db.Integer, primary_key=True)
     employee_id = db.Column(db.Integer, db.ForeignKey("employee.id"), nullable=False)
     timestamp = db.Column(db.DateTime, nullable=False, default=datetime.utcnow)
     record_type = db.Column(db.String(20), nullable=False) # e.g., "arrival", "lunch_start", "lunch_end", "departure"
+    # Business-timezone day of the shift the punch belongs to (see shift_work_date)
+    work_date = db.Column(db.Date, nullable=True)
     latitude = db.Column(db.Float, nullable=True)
     longitude = db.Column(db.Float, nullable=True)
     photo_url = db.Column(db.String(255), nullable=True) # URL to the stored photo
+    # Site resolved from latitude/longitude when written (None without coordinates or sites nearby)
+    site_id = db.Column(db.Integer, db.ForeignKey("site.id"), nullable=True)
+    outside_geofence = db.Column(db.Boolean, nullable=True) # True if no site's geofence contains the location
+    idempotency_key = db.Column(db.String(64), nullable=True) # Client-generated key that makes punch retries safe
 
     # Relationship (backref defined in Employee model)
     # employee = db.relationship("Employee", backref="time_records", lazy=True)
@@ -20,3 +38,46 @@ class TimeRecord(db.Model):
     def __repr__(self):
         return f"<TimeRecord {self.id} for {self.employee_id} at {self.timestamp}>"
 
+def shift_work_date(record_type, timestamp, last_record_type=None, last_work_date=None):
+    """
+    Work day a punch belongs to: punches continuing an open shift take the day of the shift,
+    so a 22:00-05:00 shift is attributed to the day it started; check-ins (and punches
+    without an open shift) take their own business-timezone day.
+
+    Args:
+        record_type (str): Type of the punch.
+        timestamp (datetime): Punch time (naive UTC).
+        last_record_type (str, optional): Type of the employee's previous punch.
+        last_work_date (date, optional): work_date of the employee's previous punch.
+    """
+    if record_type != "arrival" and last_record_type not in (None, "departure") and last_work_date is not None:
+        return last_work_date
+    return local_date(timestamp)
+
+# Fill work_date on ORM writes (the Core punch inserts in utils/punches.py compute it themselves)
+from sqlalchemy import event, select, inspect
+
+@event.listens_for(TimeRecord, "before_insert")
+@event.listens_for(TimeRecord, "before_update")
+def assign_work_date(mapper, connection, target):
+    state = inspect(target)
+    if state.persistent:
+        moved = any(state.attrs[name].history.has_changes() for name in ("timestamp", "record_type", "employee_id"))
+        if not moved or state.attrs.work_date.history.has_changes():
+            return
+    elif target.work_date is not None:
+        return
+    if target.timestamp is None:
+        target.timestamp = datetime.utcnow()
+    conditions = [TimeRecord.employee_id == target.employee_id, TimeRecord.timestamp <= target.timestamp]
+    if target.id is not None:
+        conditions.append(TimeRecord.id != target.id)
+    previous = connection.execute(
+        select(TimeRecord.record_type, TimeRecord.work_date).where(*conditions).order_by(
+            TimeRecord.timestamp.desc(), TimeRecord.id.desc()
+        ).limit(1)
+    ).first()
+    target.work_date = shift_work_date(
+        target.record_type, target.timestamp,
+        previous.record_type if previous else None, previous.work_date if previous else None
+    )
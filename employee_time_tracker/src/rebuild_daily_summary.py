@@ -0,0 +1,56 @@
+
+import os
+import sys
+# Add project root to the Python path
+sys.path.insert(0, os.path.dirname(os.path.dirname(__file__)))
+
+from src.main import app, db
+from src.models.employee import Employee
+from src.models.time_record import TimeRecord
+from src.models.daily_work_summary import DailyWorkSummary
+from src.utils.hours_calculator import summarize_work_days
+from src.migrate import pending_migrations
+
+def rebuild_daily_summaries():
+    """Backfills (or rebuilds from scratch) DailyWorkSummary from every TimeRecord.
+
+    Running servers don't see this commit; their cached reports expire within
+    REPORT_CACHE_TTL_SECONDS (see utils/report_cache.py). The schema must be current
+    (src/migrate.py): summaries are keyed by TimeRecord.work_date.
+
+    Returns False, without touching the summaries, if migrations are pending.
+    """
+    with app.app_context():
+        with db.engine.connect() as connection:
+            pending = pending_migrations(connection)
+        if pending:
+            print(f"Database has {len(pending)} pending migration(s) "
+                  f"(from {pending[0].VERSION:04d}). Run src/migrate.py first.")
+            return False
+
+        print("Deleting existing daily summaries...")
+        DailyWorkSummary.query.delete()
+
+        employee_ids = [employee_id for (employee_id,) in db.session.query(Employee.id).order_by(Employee.id)]
+        total_rows = 0
+        for employee_id in employee_ids:
+            records = TimeRecord.query.filter_by(employee_id=employee_id).order_by(TimeRecord.timestamp, TimeRecord.id).all()
+            summaries = summarize_work_days(records)
+            db.session.bulk_insert_mappings(DailyWorkSummary, [
+                {"employee_id": employee_id, "work_date": work_date, **summary}
+                for work_date, summary in summaries.items()
+            ])
+            total_rows += len(summaries)
+            db.session.expunge_all() # Keep memory flat across employees
+
+        try:
+            db.session.commit()
+            print(f"Daily summaries rebuilt: {total_rows} rows for {len(employee_ids)} employees.")
+            return True
+        except Exception as e:
+            db.session.rollback()
+            print(f"Error rebuilding daily summaries: {e}")
+            return False
+
+if __name__ == "__main__":
+    sys.exit(0 if rebuild_daily_summaries() else 1)
@@ -14,15 +14,23 @@ from src.models.supervisor_questionnaire import SupervisorQuestionnaireResponse
 from src.models.supervisor_correction_request import SupervisorCorrectionRequest
 from src.models.material import MaterialType
 from src.models.material_log import MaterialLog
+from src.models.daily_work_summary import DailyWorkSummary
+from src.models.change_journal import ChangeJournal
+from src.models.site import Site
+from src.utils.questionnaire_search import create_search_index, drop_search_index
 
 def reset_database():
     with app.app_context():
         print("Dropping all tables...")
         # Drop tables in reverse order of dependency if needed, or use metadata.drop_all
         # For simplicity, metadata.drop_all handles dependencies
+        with db.engine.begin() as connection:
+            drop_search_index(connection) # Not a model table, so drop_all doesn't know about it
         db.drop_all()
         print("Creating all tables...")
         db.create_all()
+        with db.engine.begin() as connection:
+            create_search_index(connection)
         print("Database has been reset.")
 
 if __name__ == "__main__":
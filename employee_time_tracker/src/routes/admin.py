@@ -1,18 +1,35 @@
 
-from flask import Blueprint, request, jsonify, make_response, send_file
+from flask import Blueprint, request, jsonify, make_response, send_file, Response, stream_with_context
 from src.main import db # Import db from main app in src
 from src.models.employee import Employee
 from src.models.time_record import TimeRecord
-from sqlalchemy import and_
-from sqlalchemy.orm import joinedload
-from datetime import datetime, time, timedelta
+from src.models.daily_work_summary import DailyWorkSummary
+from src.models.supervisor_checkin import SupervisorCheckin
+from src.models.site import Site
+from sqlalchemy import and_, or_
+from sqlalchemy.orm import joinedload, load_only
+from datetime import datetime, timedelta
 import io
+import json
+import numpy as np
 import os # For logo path
+import threading
+from time import monotonic
 
-# Import PDF generation utility
-from src.utils.pdf_generator import generate_pdf_report
+# Import PDF report job utilities (rendering happens in a separate process)
+from src.utils.report_jobs import submit_pdf_job, get_job
+from src.utils.report_cache import report_cache, data_versions
 # Import calculation utilities
-from src.utils.hours_calculator import calculate_worked_hours, determine_absences
+from src.utils.hours_calculator import weekly_summaries_from_daily, determine_absences
+from src.utils.hours_batch import calculate_worked_hours_batch, encode_record_types
+from src.utils.pagination import encode_cursor, decode_cursor, parse_page_size
+from src.utils.presence import presence_index, PRESENCE_STATES
+from src.utils.event_bus import event_bus
+from src.utils.delta_sync import build_delta, full_load_cursor, SYNC_CURSOR_HEADER, JournalCursorExpired
+from src.utils.photo_store import thumbnail_url
+from src.utils.punches import OPEN_SHIFT_TIMEOUT
+from src.utils.business_time import business_today, local_day_bounds, to_local
+from src.utils.coverage import punch_intervals, match_visits, summarize_coverage
 
 # Define the Blueprint
 admin_bp = Blueprint("admin", __name__)
@@ -88,63 +105,106 @@ def add_employee():
         print(f"Error adding employee: {e}")
         return jsonify({"error": f"Erro ao adicionar funcionário: {e}"}), 500
 
+def _iso(value):
+    return value.isoformat() if value else None
+
+def _full_address(emp):
+    # Construct full address string
+    address_parts = [
+        emp.address_street,
+        emp.address_number,
+        emp.address_complement,
+        emp.address_neighborhood,
+        emp.address_city,
+        emp.address_state,
+        emp.address_zip
+    ]
+    return ", ".join(part for part in address_parts if part) # Join non-empty parts
+
+ADDRESS_COLUMNS = [
+    "address_street", "address_number", "address_complement", "address_neighborhood",
+    "address_city", "address_state", "address_zip"
+]
+
+# Output field -> (Employee columns it reads, serializer)
+EMPLOYEE_LIST_FIELDS = {
+    "id": (["id"], lambda emp: emp.id),
+    "name": (["name"], lambda emp: emp.name),
+    "email": (["email"], lambda emp: emp.email),
+    "phone_number": (["phone_number"], lambda emp: emp.phone_number),
+    "role": (["role"], lambda emp: emp.role),
+    "cpf": (["cpf"], lambda emp: emp.cpf),
+    "rg": (["rg"], lambda emp: emp.rg),
+    "birth_date": (["birth_date"], lambda emp: _iso(emp.birth_date)),
+    "address": (ADDRESS_COLUMNS, _full_address), # Use the constructed full address
+    **{column: ([column], lambda emp, column=column: getattr(emp, column)) for column in ADDRESS_COLUMNS},
+    "marital_status": (["marital_status"], lambda emp: emp.marital_status),
+    "dependents_info": (["dependents_info"], lambda emp: emp.dependents_info),
+    "admission_date": (["admission_date"], lambda emp: _iso(emp.admission_date)),
+    "base_salary": (["base_salary"], lambda emp: emp.base_salary),
+    "work_schedule": (["work_schedule"], lambda emp: emp.work_schedule),
+    "contract_type": (["contract_type"], lambda emp: emp.contract_type),
+    "hiring_regime": (["hiring_regime"], lambda emp: emp.hiring_regime),
+    "expected_arrival_time": (["expected_arrival_time"], lambda emp: emp.expected_arrival_time.strftime("%H:%M") if emp.expected_arrival_time else None),
+    "expected_departure_time": (["expected_departure_time"], lambda emp: emp.expected_departure_time.strftime("%H:%M") if emp.expected_departure_time else None),
+    "vacation_acquisition_start": (["vacation_acquisition_start"], lambda emp: _iso(emp.vacation_acquisition_start)),
+    "vacation_balance_days": (["vacation_balance_days"], lambda emp: emp.vacation_balance_days),
+    "thirteenth_salary_notes": (["thirteenth_salary_notes"], lambda emp: emp.thirteenth_salary_notes),
+    "benefits_info": (["benefits_info"], lambda emp: emp.benefits_info),
+    "legal_docs_references": (["legal_docs_references"], lambda emp: emp.legal_docs_references),
+    "evaluation_training_history": (["evaluation_training_history"], lambda emp: emp.evaluation_training_history),
+    "legal_obligations_info": (["legal_obligations_info"], lambda emp: emp.legal_obligations_info),
+    "created_at": (["created_at"], lambda emp: _iso(emp.created_at)),
+    "updated_at": (["updated_at"], lambda emp: _iso(emp.updated_at))
+    # Removed fields not present in the final Employee model: job_title, department, work_shift, hourly_rate, bank_details, emergency_contact_name, emergency_contact_phone, status
+}
+
+def serialize_employee(emp, fields):
+    return {field: EMPLOYEE_LIST_FIELDS[field][1](emp) for field in fields}
+
 @admin_bp.route("/employees", methods=["GET"])
 def list_employees():
-    """Lists all employees."""
+    """Lists all employees.
+    Query Parameters:
+        fields (str, optional): Comma-separated output fields (e.g. 'id,name,email,cpf,role').
+                                Only the columns behind those fields are read from the database.
+                                Defaults to every field.
+        since (str, optional): Sync cursor (X-Sync-Cursor header of a full list, or `cursor` of a
+                               previous delta). Returns only employees changed after it:
+                               {"changes": [...], "deleted": [ids], "cursor": str, "has_more": bool}.
+                               410 if the cursor has expired (reload the full list).
+    """
+    fields_param = request.args.get("fields")
+    if fields_param:
+        fields = [field.strip() for field in fields_param.split(",") if field.strip()]
+        unknown_fields = [field for field in fields if field not in EMPLOYEE_LIST_FIELDS]
+        if unknown_fields:
+            return jsonify({"error": f"Campos inválidos: {', '.join(unknown_fields)}"}), 400
+    else:
+        fields = list(EMPLOYEE_LIST_FIELDS)
+
+    columns = {"id", "name"} # Always needed (primary key and ordering)
+    for field in fields:
+        columns.update(EMPLOYEE_LIST_FIELDS[field][0])
+
+    def load_employees(employee_ids=None):
+        query = Employee.query.options(load_only(*[getattr(Employee, column) for column in columns]))
+        if employee_ids is not None:
+            query = query.filter(Employee.id.in_(employee_ids))
+        return [serialize_employee(emp, fields) for emp in query.order_by(Employee.name)]
+
     try:
-        employees = Employee.query.order_by(Employee.name).all()
-        employee_list = []
-        for emp in employees:
-            # Construct full address string
-            address_parts = [
-                emp.address_street,
-                emp.address_number,
-                emp.address_complement,
-                emp.address_neighborhood,
-                emp.address_city,
-                emp.address_state,
-                emp.address_zip
-            ]
-            full_address = ", ".join(part for part in address_parts if part) # Join non-empty parts
-
-            employee_list.append({
-                "id": emp.id,
-                "name": emp.name,
-                "email": emp.email,
-                "phone_number": emp.phone_number,
-                "role": emp.role,
-                "cpf": emp.cpf,
-                "rg": emp.rg,
-                "birth_date": emp.birth_date.isoformat() if emp.birth_date else None,
-                "address": full_address, # Use the constructed full address
-                "address_street": emp.address_street,
-                "address_number": emp.address_number,
-                "address_complement": emp.address_complement,
-                "address_neighborhood": emp.address_neighborhood,
-                "address_city": emp.address_city,
-                "address_state": emp.address_state,
-                "address_zip": emp.address_zip,
-                "marital_status": emp.marital_status,
-                "dependents_info": emp.dependents_info,
-                "admission_date": emp.admission_date.isoformat() if emp.admission_date else None,
-                "base_salary": emp.base_salary,
-                "work_schedule": emp.work_schedule,
-                "contract_type": emp.contract_type,
-                "hiring_regime": emp.hiring_regime,
-                "expected_arrival_time": emp.expected_arrival_time.strftime("%H:%M") if emp.expected_arrival_time else None,
-                "expected_departure_time": emp.expected_departure_time.strftime("%H:%M") if emp.expected_departure_time else None,
-                "vacation_acquisition_start": emp.vacation_acquisition_start.isoformat() if emp.vacation_acquisition_start else None,
-                "vacation_balance_days": emp.vacation_balance_days,
-                "thirteenth_salary_notes": emp.thirteenth_salary_notes,
-                "benefits_info": emp.benefits_info,
-                "legal_docs_references": emp.legal_docs_references,
-                "evaluation_training_history": emp.evaluation_training_history,
-                "legal_obligations_info": emp.legal_obligations_info,
-                "created_at": emp.created_at.isoformat() if emp.created_at else None,
-                "updated_at": emp.updated_at.isoformat() if emp.updated_at else None
-                # Removed fields not present in the final Employee model: job_title, department, work_shift, hourly_rate, bank_details, emergency_contact_name, emergency_contact_phone, status
-            })
-        return jsonify(employee_list), 200
+        since = request.args.get("since")
+        if since:
+            return jsonify(build_delta(db.session, "employee", since, load_employees)), 200
+        cursor = full_load_cursor(db.session)
+        response = jsonify(load_employees())
+        response.headers[SYNC_CURSOR_HEADER] = cursor
+        return response, 200
+    except JournalCursorExpired:
+        return jsonify({"error": "Cursor de sincronização (since) expirado. Recarregue a lista completa"}), 410
+    except ValueError:
+        return jsonify({"error": "Cursor de sincronização (since) inválido"}), 400
     except Exception as e:
         print(f"Error listing employees: {e}")
         return jsonify({"error": f"Erro ao listar funcionários: {e}"}), 500
@@ -153,14 +213,62 @@ def list_employees():
 
 # --- Time Record Viewing --- #
 
+TIME_RECORDS_PAGE_SIZE = 100
+TIME_RECORDS_MAX_PAGE_SIZE = 500
+
+PRESENCE_DEFAULT_RADIUS_METERS = 200
+# Last punches older than this can't affect today's presence (open shifts expire, departures are per day)
+PRESENCE_LOOKBACK = max(OPEN_SHIFT_TIMEOUT, timedelta(days=1))
+
+def serialize_time_record_row(row):
+    return {
+        "id": row.id,
+        "employee_id": row.employee_id,
+        "employee_name": row.employee_name,
+        "timestamp": row.timestamp.isoformat(),
+        "record_type": row.record_type,
+        "work_date": row.work_date.isoformat() if row.work_date else None,
+        "latitude": row.latitude,
+        "longitude": row.longitude,
+        "photo_url": row.photo_url,
+        "photo_thumbnail_url": thumbnail_url(row.photo_url), # Lists show thumbnails, not full-size photos
+        "site_id": row.site_id,
+        "outside_geofence": row.outside_geofence
+    }
+
 @admin_bp.route("/time-records", methods=["GET"])
 def get_time_records():
-    """Fetches time records, optionally filtered by employee and date range."""
+    """Fetches time records, newest first, optionally filtered by employee and date range.
+    Query Parameters:
+        employee_id (int, optional): Filter by employee ID.
+        site_id (int, optional): Filter by the site punches were tagged with.
+        outside_geofence (str, optional): 'true' for punches outside every site's geofence.
+        start_date / end_date (str, optional, YYYY-MM-DD): Filter by work day (business timezone, shift start day).
+        limit (int, optional): Page size (default 100, max 500).
+        cursor (str, optional): `next_cursor` from the previous page.
+        format (str, optional): 'ndjson' streams every matching row, one JSON object per line.
+    Returns {"records": [...], "next_cursor": str or null} unless streaming.
+    """
     employee_id = request.args.get("employee_id")
     start_date_str = request.args.get("start_date")
     end_date_str = request.args.get("end_date")
+    cursor = request.args.get("cursor")
+    report_format = request.args.get("format")
 
-    query = TimeRecord.query.options(joinedload(TimeRecord.employee))
+    # Only the employee name is needed, not the whole (wide) Employee row
+    query = db.session.query(
+        TimeRecord.id,
+        TimeRecord.employee_id,
+        TimeRecord.timestamp,
+        TimeRecord.record_type,
+        TimeRecord.work_date,
+        TimeRecord.latitude,
+        TimeRecord.longitude,
+        TimeRecord.photo_url,
+        TimeRecord.site_id,
+        TimeRecord.outside_geofence,
+        Employee.name.label("employee_name")
+    ).join(Employee, Employee.id == TimeRecord.employee_id)
 
     if employee_id:
         try:
@@ -168,73 +276,300 @@ def get_time_records():
         except ValueError:
             return jsonify({"error": "employee_id inválido"}), 400
 
+    if request.args.get("site_id"):
+        try:
+            # Uses ix_time_record_site_timestamp
+            query = query.filter(TimeRecord.site_id == int(request.args["site_id"]))
+        except ValueError:
+            return jsonify({"error": "site_id inválido"}), 400
+    if request.args.get("outside_geofence", "").lower() == "true":
+        query = query.filter(TimeRecord.outside_geofence.is_(True))
+
     try:
         if start_date_str:
             start_date = datetime.strptime(start_date_str, "%Y-%m-%d").date()
-            query = query.filter(TimeRecord.timestamp >= datetime.combine(start_date, time.min))
+            query = query.filter(TimeRecord.work_date >= start_date)
+            # Punches of a work day start at its local midnight: lets the timestamp index narrow the scan too
+            query = query.filter(TimeRecord.timestamp >= local_day_bounds(start_date)[0])
         if end_date_str:
             end_date = datetime.strptime(end_date_str, "%Y-%m-%d").date()
-            query = query.filter(TimeRecord.timestamp <= datetime.combine(end_date, time.max))
+            query = query.filter(TimeRecord.work_date <= end_date)
+            # ...and end before the next day's local midnight plus the longest open shift
+            query = query.filter(TimeRecord.timestamp < local_day_bounds(end_date)[1] + OPEN_SHIFT_TIMEOUT)
     except ValueError:
         return jsonify({"error": "Formato de data inválido. Use YYYY-MM-DD"}), 400
 
     try:
-        records = query.order_by(TimeRecord.timestamp.desc()).all()
-        return jsonify([{
-            "id": record.id,
-            "employee_id": record.employee_id,
-            "employee_name": record.employee.name, # Requires loading relationship
-            "timestamp": record.timestamp.isoformat(),
-            "record_type": record.record_type,
-            "latitude": record.latitude,
-            "longitude": record.longitude,
-            "photo_url": record.photo_url
-        } for record in records]), 200
+        page_size = parse_page_size(request.args.get("limit"), TIME_RECORDS_PAGE_SIZE, TIME_RECORDS_MAX_PAGE_SIZE)
+        if cursor:
+            # Keyset: continue strictly after the last (timestamp, id) returned
+            cursor_timestamp, cursor_id = decode_cursor(cursor)
+            query = query.filter(or_(
+                TimeRecord.timestamp < cursor_timestamp,
+                and_(TimeRecord.timestamp == cursor_timestamp, TimeRecord.id < cursor_id)
+            ))
+    except ValueError:
+        return jsonify({"error": "Parâmetros de paginação inválidos (limit/cursor)"}), 400
+
+    query = query.order_by(TimeRecord.timestamp.desc(), TimeRecord.id.desc())
+
+    if report_format and report_format.lower() == "ndjson":
+        def generate():
+            # Server-side cursor: rows are fetched in chunks instead of all at once
+            for row in query.execution_options(stream_results=True, yield_per=500):
+                yield json.dumps(serialize_time_record_row(row)) + "\n"
+        return Response(stream_with_context(generate()), mimetype="application/x-ndjson")
+
+    try:
+        rows = query.limit(page_size + 1).all()
+        has_more = len(rows) > page_size
+        rows = rows[:page_size]
+        next_cursor = encode_cursor(rows[-1].timestamp, rows[-1].id) if has_more else None
+        return jsonify({
+            "records": [serialize_time_record_row(row) for row in rows],
+            "next_cursor": next_cursor
+        }), 200
     except Exception as e:
         print(f"Error fetching time records: {e}")
         return jsonify({"error": f"Erro ao buscar registros de ponto: {e}"}), 500
 
+# --- Live Presence --- #
+
+@admin_bp.route("/presence", methods=["GET"])
+def get_presence():
+    """Who is on site now, from the in-memory presence index (no database query once loaded).
+    Query Parameters:
+        state (str, optional): Comma-separated states to return: working, at_lunch, clocked_out, not_arrived.
+        near (str, optional): 'latitude,longitude'; only employees whose last punch was near it.
+        radius_m (float, optional): Radius for `near`, in meters (default 200).
+        site_id (int, optional): Only employees whose last punch was tagged with this site.
+    Returns {"generated_at", "counts": {state: n}, "employees": [...]}; counts ignore the filters.
+    """
+    states = None
+    state_param = request.args.get("state")
+    if state_param:
+        states = {state.strip() for state in state_param.split(",") if state.strip()}
+        unknown = states - set(PRESENCE_STATES)
+        if unknown:
+            return jsonify({"error": f"Estado(s) inválido(s): {', '.join(sorted(unknown))}. Use: {', '.join(PRESENCE_STATES)}"}), 400
+
+    near = None
+    radius_meters = None
+    if request.args.get("near"):
+        try:
+            latitude, longitude = (float(value) for value in request.args["near"].split(","))
+            radius_meters = float(request.args.get("radius_m", PRESENCE_DEFAULT_RADIUS_METERS))
+        except ValueError:
+            return jsonify({"error": "Parâmetros de localização inválidos. Use near=latitude,longitude e radius_m em metros"}), 400
+        near = (latitude, longitude)
+
+    site_id = request.args.get("site_id", type=int)
+
+    try:
+        now = datetime.utcnow()
+        employees, counts = presence_index.snapshot(
+            db.session, PRESENCE_LOOKBACK, OPEN_SHIFT_TIMEOUT,
+            states=states, near=near, radius_meters=radius_meters, site_id=site_id, now=now
+        )
+        return jsonify({"generated_at": now.isoformat(), "counts": counts, "employees": employees}), 200
+    except Exception as e:
+        print(f"Error building presence board: {e}")
+        return jsonify({"error": f"Erro ao consultar presença: {e}"}), 500
+
+# --- Live Event Feed --- #
+
+EVENT_TYPES = ("time_record", "supervisor_checkin", "correction_request")
+# Idle connections get a comment line this often, so proxies don't close them
+EVENTS_KEEPALIVE_SECONDS = 15
+# Streams end after this long and the browser reconnects (with Last-Event-ID), freeing the worker
+EVENTS_MAX_STREAM_SECONDS = int(os.getenv("EVENTS_MAX_STREAM_SECONDS", "300"))
+
+# Streams held open at once by this process. Each one occupies a gunicorn thread for up to
+# EVENTS_MAX_STREAM_SECONDS, so keep this well below --threads (8 in the Dockerfile): the rest
+# must stay free for punches and the other admin requests.
+EVENTS_MAX_STREAMS = int(os.getenv("EVENTS_MAX_STREAMS", "2"))
+# Sent with the 503 when every stream slot is taken
+EVENTS_RETRY_AFTER_SECONDS = int(os.getenv("EVENTS_RETRY_AFTER_SECONDS", "30"))
+event_stream_slots = threading.BoundedSemaphore(EVENTS_MAX_STREAMS)
+
+def format_sse(event_id, event_type, data):
+    return f"id: {event_id}\nevent: {event_type}\ndata: {json.dumps(data)}\n\n"
+
+@admin_bp.route("/events", methods=["GET"])
+def stream_events():
+    """Server-sent events feed of committed punches, supervisor check-ins and correction requests.
+    Query Parameters:
+        types (str, optional): Comma-separated event types (time_record, supervisor_checkin, correction_request).
+        last_event_id (str, optional): Resume cursor, for clients that can't send the Last-Event-ID header.
+    Events are `event: <type>` with the row as JSON `data`. A `resync` event means events were
+    missed (server restart, another worker, or too far behind): reload lists, then keep listening.
+    Answers 503 with Retry-After when EVENTS_MAX_STREAMS streams are already open.
+    """
+    types = set(EVENT_TYPES)
+    if request.args.get("types"):
+        types = {event_type.strip() for event_type in request.args["types"].split(",") if event_type.strip()}
+        unknown = types - set(EVENT_TYPES)
+        if unknown:
+            return jsonify({"error": f"Tipo(s) de evento inválido(s): {', '.join(sorted(unknown))}. Use: {', '.join(EVENT_TYPES)}"}), 400
+
+    last_event_id = request.headers.get("Last-Event-ID") or request.args.get("last_event_id")
+    after_sequence = event_bus.parse_event_id(last_event_id) if last_event_id else None
+    resync = last_event_id is not None and after_sequence is None
+    if after_sequence is None:
+        after_sequence = event_bus.last_sequence # New (or unresumable) clients start from now
+
+    def generate():
+        nonlocal after_sequence
+        yield "retry: 3000\n\n"
+        if resync:
+            yield format_sse(event_bus.event_id(after_sequence), "resync", {})
+        deadline = monotonic() + EVENTS_MAX_STREAM_SECONDS
+        while monotonic() < deadline:
+            events, missed = event_bus.wait_for_events(after_sequence, EVENTS_KEEPALIVE_SECONDS)
+            if missed:
+                yield format_sse(event_bus.event_id(events[0][0] - 1), "resync", {})
+            if not events:
+                yield ": keepalive\n\n"
+                continue
+            for sequence, event_type, data in events:
+                if event_type in types:
+                    yield format_sse(event_bus.event_id(sequence), event_type, data)
+            after_sequence = events[-1][0]
+
+    if not event_stream_slots.acquire(blocking=False):
+        response = jsonify({"error": "Limite de conexões de eventos atingido. Tente novamente em instantes."})
+        response.headers["Retry-After"] = str(EVENTS_RETRY_AFTER_SECONDS)
+        return response, 503
+    response = Response(generate(), mimetype="text/event-stream")
+    # Frees the slot when the stream ends, the client disconnects or the generator never starts
+    response.call_on_close(event_stream_slots.release)
+    response.headers["Cache-Control"] = "no-cache"
+    response.headers["X-Accel-Buffering"] = "no" # Don't let nginx buffer the stream
+    return response
+
+# --- Report PDF Jobs --- #
+
+def get_cached_report(cache_key, fingerprint, compute):
+    """Returns the report data for cache_key, computing and caching it if stale or missing."""
+    data = report_cache.get(cache_key + ("json",), fingerprint)
+    if data is None:
+        data = compute()
+        report_cache.put(cache_key + ("json",), fingerprint, data)
+    return data
+
+def week_chunks(start_date, end_date):
+    """Splits [start_date, end_date] at Mondays: (start, end) pairs each within one week."""
+    chunk_start = start_date
+    while chunk_start <= end_date:
+        chunk_end = min(chunk_start + timedelta(days=6 - chunk_start.weekday()), end_date)
+        yield chunk_start, chunk_end
+        chunk_start = chunk_end + timedelta(days=1)
+
+def get_cached_by_week(kind, start_date, end_date, employee_id, compute_chunk):
+    """Concatenates per-week results, each cached with its own week's fingerprint, so a
+    correction or late punch only recomputes the employee-weeks it changed.
+    """
+    data = []
+    for chunk_start, chunk_end in week_chunks(start_date, end_date):
+        cache_key = (kind, chunk_start.isoformat(), chunk_end.isoformat(), employee_id)
+        fingerprint = data_versions.fingerprint(chunk_start, chunk_end, employee_id)
+        data.extend(get_cached_report(cache_key, fingerprint, lambda: compute_chunk(chunk_start, chunk_end)))
+    return data
+
+def enqueue_pdf_report(template_name, pdf_data, filename, logo_path, cache_key=None, fingerprint=None):
+    """Serves the PDF straight from the report cache if it was already rendered for this data;
+    otherwise queues it and answers 202 with the job id and where to poll for it.
+    """
+    if cache_key is not None:
+        pdf_key = cache_key + ("pdf",)
+        pdf_bytes = report_cache.get(pdf_key, fingerprint)
+        if pdf_bytes is not None:
+            response = make_response(pdf_bytes)
+            response.headers["Content-Type"] = "application/pdf"
+            response.headers["Content-Disposition"] = f"attachment; filename={filename}"
+            return response
+
+        def cache_rendered_pdf(job):
+            with open(job.output_path, "rb") as pdf_file:
+                report_cache.put(pdf_key, fingerprint, pdf_file.read())
+    else:
+        cache_rendered_pdf = None
+
+    job = submit_pdf_job(template_name, pdf_data, filename, logo_path=logo_path, on_success=cache_rendered_pdf)
+    return jsonify({
+        "message": "Relatório PDF em geração",
+        "job_id": job.id,
+        "status": job.status,
+        "status_url": f"/admin/reports/jobs/{job.id}",
+        "download_url": f"/admin/reports/jobs/{job.id}/download"
+    }), 202
+
+@admin_bp.route("/reports/cache-stats", methods=["GET"])
+def report_cache_stats():
+    """Returns report cache hit/miss counters and current size."""
+    return jsonify(report_cache.stats()), 200
+
+@admin_bp.route("/reports/jobs/<job_id>", methods=["GET"])
+def report_job_status(job_id):
+    """Returns the status of a PDF report job (queued, running, done or failed)."""
+    job = get_job(job_id)
+    if not job:
+        return jsonify({"error": "Tarefa de relatório não encontrada"}), 404
+    job_data = job.to_dict()
+    if job.status == "done":
+        job_data["download_url"] = f"/admin/reports/jobs/{job.id}/download"
+    return jsonify(job_data), 200
+
+@admin_bp.route("/reports/jobs/<job_id>/download", methods=["GET"])
+def download_report_job(job_id):
+    """Downloads the PDF rendered by a finished report job."""
+    job = get_job(job_id)
+    if not job:
+        return jsonify({"error": "Tarefa de relatório não encontrada"}), 404
+    if job.status == "failed":
+        return jsonify({"error": f"Falha ao gerar relatório PDF: {job.future.exception()}"}), 500
+    if job.status != "done" or not os.path.exists(job.output_path):
+        return jsonify({"error": "Relatório ainda em geração", "status": job.status}), 409
+    return send_file(job.output_path, mimetype="application/pdf", as_attachment=True, download_name=job.filename)
+
 # --- Lateness Report --- #
 
 # Helper function (can be moved to utils)
 def get_lateness_data(start_date, end_date, employee_id=None):
-    # Fetch employees to get their specific expected arrival times
-    employee_query = Employee.query
-    if employee_id:
-        employee_query = employee_query.filter(Employee.id == employee_id)
-    employees = employee_query.all()
-    employee_arrival_times = {emp.id: emp.expected_arrival_time for emp in employees if emp.expected_arrival_time}
-
     # Allow a grace period (e.g., 5 minutes)
     grace_period = timedelta(minutes=5)
 
-    query = TimeRecord.query.filter(
-        TimeRecord.record_type == "arrival",
-        TimeRecord.timestamp >= datetime.combine(start_date, time.min),
-        TimeRecord.timestamp <= datetime.combine(end_date, time.max)
-    ).options(joinedload(TimeRecord.employee))
+    # One summary row per employee-day, joined to the few Employee columns needed
+    query = db.session.query(
+        DailyWorkSummary.work_date,
+        DailyWorkSummary.first_arrival,
+        Employee.name,
+        Employee.expected_arrival_time
+    ).join(Employee, Employee.id == DailyWorkSummary.employee_id).filter(
+        DailyWorkSummary.work_date >= start_date,
+        DailyWorkSummary.work_date <= end_date,
+        DailyWorkSummary.first_arrival.isnot(None),
+        Employee.expected_arrival_time.isnot(None) # Skip employees without an expected arrival time
+    )
 
     if employee_id:
-        query = query.filter(TimeRecord.employee_id == employee_id)
+        query = query.filter(DailyWorkSummary.employee_id == employee_id)
 
-    all_arrivals = query.order_by(TimeRecord.timestamp).all()
+    first_arrivals = query.order_by(DailyWorkSummary.first_arrival).all()
 
     report_data = []
-    for record in all_arrivals:
-        expected_arrival_time = employee_arrival_times.get(record.employee_id)
-        if not expected_arrival_time:
-            continue # Skip if employee has no expected arrival time set
-
+    for work_date, first_arrival, employee_name, expected_arrival_time in first_arrivals:
+        # Expected arrival times are business-timezone wall clock times
+        arrival_dt = to_local(first_arrival)
         expected_arrival_with_grace = (datetime.combine(datetime.min, expected_arrival_time) + grace_period).time()
-        arrival_dt = record.timestamp
 
         # Check if arrival time is actually later than grace period time
         if arrival_dt.time() > expected_arrival_with_grace:
-            expected_dt_today = datetime.combine(arrival_dt.date(), expected_arrival_time)
+            expected_dt_today = datetime.combine(work_date, expected_arrival_time)
             lateness = arrival_dt - expected_dt_today
             if lateness > timedelta(0):
                 report_data.append({
-                    "employee_name": record.employee.name,
+                    "employee_name": employee_name,
                     "date": arrival_dt.strftime("%Y-%m-%d"),
                     "arrival_time": arrival_dt.strftime("%H:%M:%S"),
                     "lateness_minutes": int(lateness.total_seconds() / 60),
@@ -245,7 +580,7 @@ def get_lateness_data(start_date, end_date, employee_id=None):
 @admin_bp.route("/reports/lateness", methods=["GET"])
 def report_lateness():
     """Generates a lateness report, optionally filtered by date and employee.
-       Accepts 'format=pdf' query parameter for PDF download.
+       'format=pdf' queues a PDF rendering job and answers 202 with its job id.
     """
     start_date_str = request.args.get("start_date")
     end_date_str = request.args.get("end_date")
@@ -253,7 +588,7 @@ def report_lateness():
     report_format = request.args.get("format") # Check for pdf format request
 
     # Default to the current month if dates are not provided
-    today = datetime.utcnow().date()
+    today = business_today()
     if not start_date_str:
         start_date = today.replace(day=1)
     else:
@@ -279,7 +614,12 @@ def report_lateness():
             return jsonify({"error": "employee_id inválido"}), 400
 
     try:
-        lateness_records = get_lateness_data(start_date, end_date, employee_id)
+        cache_key = ("lateness", start_date.isoformat(), end_date.isoformat(), employee_id or None)
+        fingerprint = data_versions.fingerprint(start_date, end_date, employee_id or None)
+        lateness_records = get_cached_report(cache_key, fingerprint, lambda: get_cached_by_week(
+            "lateness-week", start_date, end_date, employee_id or None,
+            lambda chunk_start, chunk_end: get_lateness_data(chunk_start, chunk_end, employee_id)
+        ))
 
         # If PDF format is requested
         if report_format and report_format.lower() == "pdf":
@@ -289,15 +629,8 @@ def report_lateness():
                 "start_date": start_date.strftime("%d/%m/%Y"),
                 "end_date": end_date.strftime("%d/%m/%Y")
             }
-            pdf_bytes = generate_pdf_report("report_lateness.html", pdf_data, logo_path=logo_file_path)
-
-            if pdf_bytes:
-                response = make_response(pdf_bytes)
-                response.headers["Content-Type"] = "application/pdf"
-                response.headers["Content-Disposition"] = f"attachment; filename=relatorio_atrasos_{start_date.strftime('%Y%m%d')}_{end_date.strftime('%Y%m%d')}.pdf"
-                return response
-            else:
-                return jsonify({"error": "Falha ao gerar relatório PDF"}), 500
+            # Rendered in a separate process; the client polls the job and downloads the file
+            return enqueue_pdf_report("report_lateness.html", pdf_data, f"relatorio_atrasos_{start_date.strftime('%Y%m%d')}_{end_date.strftime('%Y%m%d')}.pdf", logo_file_path, cache_key, fingerprint)
         else:
             # Return JSON data for web display
             return jsonify(lateness_records), 200
@@ -311,7 +644,8 @@ def report_lateness():
 @admin_bp.route("/reports/hours-worked", methods=["GET"])
 def report_hours_worked():
     """Generates a worked hours report for a specific employee and date range.
-       Accepts 'format=pdf' query parameter for PDF download.
+       Pass 'employee_id=all' to get weekly totals for every employee in one call.
+       'format=pdf' queues a PDF rendering job and answers 202 with its job id.
     """
     employee_id = request.args.get("employee_id")
     start_date_str = request.args.get("start_date")
@@ -321,16 +655,18 @@ def report_hours_worked():
     if not employee_id:
         return jsonify({"error": "employee_id é obrigatório para este relatório"}), 400
 
-    try:
-        employee_id = int(employee_id)
-        employee = Employee.query.get(employee_id)
-        if not employee:
-            return jsonify({"error": "Funcionário não encontrado"}), 404
-    except ValueError:
-        return jsonify({"error": "employee_id inválido"}), 400
+    all_employees = employee_id.lower() == "all"
+    if not all_employees:
+        try:
+            employee_id = int(employee_id)
+            employee = Employee.query.get(employee_id)
+            if not employee:
+                return jsonify({"error": "Funcionário não encontrado"}), 404
+        except ValueError:
+            return jsonify({"error": "employee_id inválido"}), 400
 
     # Default to the current month if dates are not provided
-    today = datetime.utcnow().date()
+    today = business_today()
     if not start_date_str:
         start_date = today.replace(day=1)
     else:
@@ -348,15 +684,25 @@ def report_hours_worked():
         except ValueError:
             return jsonify({"error": "Formato inválido para end_date. Use YYYY-MM-DD"}), 400
 
-    try:
-        # Fetch records for the employee in the date range
-        records = TimeRecord.query.filter(
-            TimeRecord.employee_id == employee_id,
-            TimeRecord.timestamp >= datetime.combine(start_date, time.min),
-            TimeRecord.timestamp <= datetime.combine(end_date, time.max)
-        ).order_by(TimeRecord.timestamp).all()
+    if all_employees:
+        return report_hours_worked_all(start_date, end_date, report_format)
 
-        weekly_summaries = calculate_worked_hours(records)
+    try:
+        def compute_week(chunk_start, chunk_end):
+            # Fetch the employee's daily summaries in one week of the date range
+            daily_rows = DailyWorkSummary.query.filter(
+                DailyWorkSummary.employee_id == employee_id,
+                DailyWorkSummary.work_date >= chunk_start,
+                DailyWorkSummary.work_date <= chunk_end
+            ).order_by(DailyWorkSummary.work_date).all()
+            return weekly_summaries_from_daily(daily_rows)
+
+        def compute_weekly_summaries():
+            return get_cached_by_week("hours-worked-week", start_date, end_date, employee_id, compute_week)
+
+        cache_key = ("hours-worked", start_date.isoformat(), end_date.isoformat(), employee_id)
+        fingerprint = data_versions.fingerprint(start_date, end_date, employee_id)
+        weekly_summaries = get_cached_report(cache_key, fingerprint, compute_weekly_summaries)
 
         if report_format and report_format.lower() == "pdf":
             logo_file_path = "/home/ubuntu/upload/logo_refinada_1.png" # Use refined logo
@@ -366,15 +712,8 @@ def report_hours_worked():
                 "start_date": start_date.strftime("%d/%m/%Y"),
                 "end_date": end_date.strftime("%d/%m/%Y")
             }
-            pdf_bytes = generate_pdf_report("report_hours_worked.html", pdf_data, logo_path=logo_file_path)
-
-            if pdf_bytes:
-                response = make_response(pdf_bytes)
-                response.headers["Content-Type"] = "application/pdf"
-                response.headers["Content-Disposition"] = f"attachment; filename=relatorio_horas_{employee.name.replace(' ','_')}_{start_date.strftime('%Y%m%d')}_{end_date.strftime('%Y%m%d')}.pdf"
-                return response
-            else:
-                return jsonify({"error": "Falha ao gerar relatório PDF"}), 500
+            # Rendered in a separate process; the client polls the job and downloads the file
+            return enqueue_pdf_report("report_hours_worked.html", pdf_data, f"relatorio_horas_{employee.name.replace(' ','_')}_{start_date.strftime('%Y%m%d')}_{end_date.strftime('%Y%m%d')}.pdf", logo_file_path, cache_key, fingerprint)
         else:
             return jsonify(weekly_summaries), 200
 
@@ -382,12 +721,66 @@ def report_hours_worked():
         print(f"Error generating hours worked report: {e}")
         return jsonify({"error": f"Erro ao gerar relatório de horas trabalhadas: {e}"}), 500
 
+def report_hours_worked_all(start_date, end_date, report_format):
+    """Weekly worked hours for every employee, from one query and one vectorized pass."""
+    try:
+        def compute_report():
+            start_utc, end_utc = local_day_bounds(start_date, end_date)
+            rows = db.session.query(
+                TimeRecord.employee_id,
+                TimeRecord.timestamp,
+                TimeRecord.record_type,
+                TimeRecord.work_date
+            ).filter(
+                TimeRecord.work_date >= start_date,
+                TimeRecord.work_date <= end_date,
+                TimeRecord.timestamp >= start_utc, # Same work-day window as /time-records
+                TimeRecord.timestamp < end_utc + OPEN_SHIFT_TIMEOUT
+            ).all()
+
+            employee_ids = np.fromiter((row.employee_id for row in rows), dtype=np.int64, count=len(rows))
+            # Local wall clock time: weeks, days and the night shift window are business-timezone ones
+            timestamps = np.array([to_local(row.timestamp) for row in rows], dtype="datetime64[s]").astype(np.int64)
+            record_type_codes = encode_record_types(row.record_type for row in rows)
+            work_days = np.array([row.work_date for row in rows], dtype="datetime64[D]").astype(np.int64)
+            summaries_by_employee = calculate_worked_hours_batch(employee_ids, timestamps, record_type_codes, work_days)
+
+            employee_names = dict(
+                db.session.query(Employee.id, Employee.name).filter(Employee.id.in_(list(summaries_by_employee))).all()
+            ) if summaries_by_employee else {}
+            report_data = [{
+                "employee_id": emp_id,
+                "employee_name": employee_names.get(emp_id),
+                "weekly_summaries": summaries
+            } for emp_id, summaries in sorted(summaries_by_employee.items(), key=lambda item: employee_names.get(item[0]) or "")]
+            return report_data
+
+        cache_key = ("hours-worked", start_date.isoformat(), end_date.isoformat(), None)
+        fingerprint = data_versions.fingerprint(start_date, end_date)
+        report_data = get_cached_report(cache_key, fingerprint, compute_report)
+
+        if report_format and report_format.lower() == "pdf":
+            logo_file_path = "/home/ubuntu/upload/logo_refinada_1.png" # Use refined logo
+            pdf_data = {
+                "employees": report_data,
+                "start_date": start_date.strftime("%d/%m/%Y"),
+                "end_date": end_date.strftime("%d/%m/%Y")
+            }
+            # Rendered in a separate process; the client polls the job and downloads the file
+            return enqueue_pdf_report("report_hours_worked_all.html", pdf_data, f"relatorio_horas_todos_{start_date.strftime('%Y%m%d')}_{end_date.strftime('%Y%m%d')}.pdf", logo_file_path, cache_key, fingerprint)
+        else:
+            return jsonify(report_data), 200
+
+    except Exception as e:
+        print(f"Error generating all-employees hours worked report: {e}")
+        return jsonify({"error": f"Erro ao gerar relatório de horas trabalhadas: {e}"}), 500
+
 # --- Absences Report --- #
 
 @admin_bp.route("/reports/absences", methods=["GET"])
 def report_absences():
     """Generates an absences report, optionally filtered by date and employee.
-       Accepts 'format=pdf' query parameter for PDF download.
+       'format=pdf' queues a PDF rendering job and answers 202 with its job id.
     """
     start_date_str = request.args.get("start_date")
     end_date_str = request.args.get("end_date")
@@ -395,7 +788,7 @@ def report_absences():
     report_format = request.args.get("format")
 
     # Default to the current month if dates are not provided
-    today = datetime.utcnow().date()
+    today = business_today()
     if not start_date_str:
         start_date = today.replace(day=1)
     else:
@@ -414,23 +807,35 @@ def report_absences():
             return jsonify({"error": "Formato inválido para end_date. Use YYYY-MM-DD"}), 400
 
     try:
-        # Fetch relevant employees (active)
-        # Assuming Employee model has a status field, otherwise adjust filter
-        employee_query = Employee.query # .filter(Employee.status == 'active')
         if employee_id:
             try:
-                employee_query = employee_query.filter(Employee.id == int(employee_id))
+                employee_id = int(employee_id)
             except ValueError:
                 return jsonify({"error": "employee_id inválido"}), 400
-        employees = employee_query.all()
-
-        # Fetch all records within the date range (potentially optimize later)
-        records = TimeRecord.query.filter(
-            TimeRecord.timestamp >= datetime.combine(start_date, time.min),
-            TimeRecord.timestamp <= datetime.combine(end_date, time.max)
-        ).all()
 
-        absences_data = determine_absences(start_date, end_date, employees, records)
+        def compute_absences():
+            # Only the columns the absence check needs, not whole Employee rows
+            employee_query = db.session.query(Employee.id, Employee.name, Employee.admission_date)
+            worked_days_query = db.session.query(
+                DailyWorkSummary.employee_id,
+                DailyWorkSummary.work_date
+            ).filter(
+                DailyWorkSummary.work_date >= start_date,
+                DailyWorkSummary.work_date <= end_date
+            )
+            if employee_id:
+                employee_query = employee_query.filter(Employee.id == employee_id)
+                worked_days_query = worked_days_query.filter(DailyWorkSummary.employee_id == employee_id)
+            employees = employee_query.all()
+
+            # Distinct (employee_id, work_date) pairs with punches; one summary row per pair
+            worked_days = worked_days_query.all()
+
+            return determine_absences(start_date, end_date, employees, worked_days)
+
+        cache_key = ("absences", start_date.isoformat(), end_date.isoformat(), employee_id or None)
+        fingerprint = data_versions.fingerprint(start_date, end_date, employee_id or None)
+        absences_data = get_cached_report(cache_key, fingerprint, compute_absences)
 
         if report_format and report_format.lower() == "pdf":
             logo_file_path = "/home/ubuntu/upload/logo_refinada_1.png" # Use refined logo
@@ -439,15 +844,8 @@ def report_absences():
                 "start_date": start_date.strftime("%d/%m/%Y"),
                 "end_date": end_date.strftime("%d/%m/%Y")
             }
-            pdf_bytes = generate_pdf_report("report_absences.html", pdf_data, logo_path=logo_file_path)
-
-            if pdf_bytes:
-                response = make_response(pdf_bytes)
-                response.headers["Content-Type"] = "application/pdf"
-                response.headers["Content-Disposition"] = f"attachment; filename=relatorio_ausencias_{start_date.strftime('%Y%m%d')}_{end_date.strftime('%Y%m%d')}.pdf"
-                return response
-            else:
-                return jsonify({"error": "Falha ao gerar relatório PDF"}), 500
+            # Rendered in a separate process; the client polls the job and downloads the file
+            return enqueue_pdf_report("report_absences.html", pdf_data, f"relatorio_ausencias_{start_date.strftime('%Y%m%d')}_{end_date.strftime('%Y%m%d')}.pdf", logo_file_path, cache_key, fingerprint)
         else:
             return jsonify(absences_data), 200
 
@@ -455,3 +853,94 @@ def report_absences():
         print(f"Error generating absences report: {e}")
         return jsonify({"error": f"Erro ao gerar relatório de ausências: {e}"}), 500
 
+
+# --- Supervisor Visit Coverage Report --- #
+
+def get_supervisor_coverage_data(start_date, end_date, supervisor_id=None, site_id=None):
+    """Coverage of supervisor visits by clocked-in staff, per supervisor and site (see utils/coverage.py)."""
+    period_start, period_end = local_day_bounds(start_date, end_date)
+
+    visit_query = db.session.query(
+        SupervisorCheckin.supervisor_id, SupervisorCheckin.site_id, SupervisorCheckin.timestamp
+    ).filter(
+        SupervisorCheckin.timestamp >= period_start,
+        SupervisorCheckin.timestamp < period_end
+    )
+    if supervisor_id:
+        visit_query = visit_query.filter(SupervisorCheckin.supervisor_id == supervisor_id)
+    if site_id:
+        visit_query = visit_query.filter(SupervisorCheckin.site_id == site_id)
+    unsited_visits = visit_query.filter(SupervisorCheckin.site_id.is_(None)).count()
+    # Both sides of the merge come sorted by (site, time); check-ins straight from their site index
+    visits = visit_query.filter(SupervisorCheckin.site_id.isnot(None)).order_by(
+        SupervisorCheckin.site_id, SupervisorCheckin.timestamp
+    ).all()
+
+    intervals = []
+    if visits:
+        # Shifts opened up to OPEN_SHIFT_TIMEOUT before the period can still cover its first visits
+        punches = db.session.query(
+            TimeRecord.employee_id, TimeRecord.timestamp, TimeRecord.record_type, TimeRecord.site_id
+        ).filter(
+            TimeRecord.timestamp >= period_start - OPEN_SHIFT_TIMEOUT,
+            TimeRecord.timestamp < period_end
+        ).order_by(TimeRecord.employee_id, TimeRecord.timestamp, TimeRecord.id).all()
+        intervals = punch_intervals(punches, OPEN_SHIFT_TIMEOUT, period_end)
+
+    by_supervisor_site, by_site = summarize_coverage(match_visits(visits, intervals))
+
+    names = dict(db.session.query(Employee.id, Employee.name).filter(
+        Employee.id.in_({row["supervisor_id"] for row in by_supervisor_site})
+    ).all()) if by_supervisor_site else {}
+    site_names = dict(db.session.query(Site.id, Site.name).filter(
+        Site.id.in_({row["site_id"] for row in by_site})
+    ).all()) if by_site else {}
+    for row in by_supervisor_site:
+        row["supervisor_name"] = names.get(row["supervisor_id"])
+        row["site_name"] = site_names.get(row["site_id"])
+    for row in by_site:
+        row["site_name"] = site_names.get(row["site_id"])
+
+    return {
+        "start_date": start_date.isoformat(),
+        "end_date": end_date.isoformat(),
+        "by_supervisor_site": by_supervisor_site,
+        "by_site": by_site,
+        "unsited_visits": unsited_visits
+    }
+
+@admin_bp.route("/reports/supervisor-coverage", methods=["GET"])
+def report_supervisor_coverage():
+    """Share of supervisor visits (check-ins) made while staff were clocked in at the visited site.
+       Optional filters: start_date/end_date (default: current month), supervisor_id, site_id.
+       Check-ins without a site are only counted in 'unsited_visits'.
+    """
+    start_date_str = request.args.get("start_date")
+    end_date_str = request.args.get("end_date")
+
+    # Default to the current month if dates are not provided
+    today = business_today()
+    try:
+        start_date = datetime.strptime(start_date_str, "%Y-%m-%d").date() if start_date_str else today.replace(day=1)
+    except ValueError:
+        return jsonify({"error": "Formato inválido para start_date. Use YYYY-MM-DD"}), 400
+    if not end_date_str:
+        next_month = start_date.replace(day=28) + timedelta(days=4)
+        end_date = next_month - timedelta(days=next_month.day)
+    else:
+        try:
+            end_date = datetime.strptime(end_date_str, "%Y-%m-%d").date()
+        except ValueError:
+            return jsonify({"error": "Formato inválido para end_date. Use YYYY-MM-DD"}), 400
+
+    try:
+        supervisor_id = int(request.args["supervisor_id"]) if request.args.get("supervisor_id") else None
+        site_id = int(request.args["site_id"]) if request.args.get("site_id") else None
+    except ValueError:
+        return jsonify({"error": "supervisor_id ou site_id inválido"}), 400
+
+    try:
+        return jsonify(get_supervisor_coverage_data(start_date, end_date, supervisor_id, site_id)), 200
+    except Exception as e:
+        print(f"Error generating supervisor coverage report: {e}")
+        return jsonify({"error": f"Erro ao gerar relatório de cobertura de supervisão: {e}"}), 500
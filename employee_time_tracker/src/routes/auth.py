@@ -4,7 +4,12 @@ from werkzeug.security import generate_password_hash, check_password_hash
 import jwt # PyJWT for token generation
 import datetime
 from functools import wraps
+from collections import OrderedDict
 import os
+import threading
+import time
+from sqlalchemy import event
+from sqlalchemy.orm import Session, object_session
 
 # Import db and models from main - assuming db is defined in main.py
 from src.main import db
@@ -15,8 +20,101 @@ auth_bp = Blueprint("auth", __name__)
 # Secret key for JWT - should be in config
 SECRET_KEY = os.getenv("SECRET_KEY", "your_very_secret_key_here")
 
+# --- Authenticated principal cache --- #
+
+# How long a looked-up principal is reused before the database is checked again
+PRINCIPAL_CACHE_TTL_SECONDS = int(os.getenv("PRINCIPAL_CACHE_TTL_SECONDS", "60"))
+PRINCIPAL_CACHE_MAX_ENTRIES = int(os.getenv("PRINCIPAL_CACHE_MAX_ENTRIES", "2048"))
+
+class Principal:
+    """The slim view of an Employee that authenticated routes receive as `current_user`."""
+    __slots__ = ("id", "name", "email", "role", "token_version")
+
+    def __init__(self, id, name, email, role, token_version=0):
+        self.id = id
+        self.name = name
+        self.email = email
+        self.role = role
+        self.token_version = token_version
+
+    def __repr__(self):
+        return f"<Principal {self.id}: {self.name} ({self.role})>"
+
+class PrincipalCache:
+    """Bounded, thread-safe TTL cache of Principal objects keyed by employee id."""
+
+    def __init__(self, ttl_seconds=PRINCIPAL_CACHE_TTL_SECONDS, max_entries=PRINCIPAL_CACHE_MAX_ENTRIES):
+        self.ttl_seconds = ttl_seconds
+        self.max_entries = max_entries
+        self._entries = OrderedDict() # employee_id -> (expires_at, principal)
+        self._lock = threading.Lock()
+
+    def get(self, employee_id):
+        with self._lock:
+            entry = self._entries.get(employee_id)
+            if entry is None:
+                return None
+            if entry[0] < time.monotonic():
+                del self._entries[employee_id]
+                return None
+            self._entries.move_to_end(employee_id)
+            return entry[1]
+
+    def put(self, principal):
+        with self._lock:
+            self._entries[principal.id] = (time.monotonic() + self.ttl_seconds, principal)
+            self._entries.move_to_end(principal.id)
+            while len(self._entries) > self.max_entries:
+                self._entries.popitem(last=False)
+
+    def invalidate(self, employee_id):
+        with self._lock:
+            self._entries.pop(employee_id, None)
+
+principal_cache = PrincipalCache()
+
+def load_principal(employee_id):
+    """Returns the cached Principal for an employee, reading only the slim columns on a miss."""
+    principal = principal_cache.get(employee_id)
+    if principal is None:
+        row = db.session.query(
+            Employee.id, Employee.name, Employee.email, Employee.role, Employee.token_version
+        ).filter(Employee.id == employee_id).first()
+        if not row:
+            return None
+        principal = Principal(row.id, row.name, row.email, row.role, row.token_version or 0)
+        principal_cache.put(principal)
+    return principal
+
+# Evict cached principals once changes to their employee are committed
+CHANGED_PRINCIPALS_KEY = "changed_principal_ids"
+
+@event.listens_for(Employee, "after_update")
+@event.listens_for(Employee, "after_delete")
+def track_changed_principal(mapper, connection, target):
+    object_session(target).info.setdefault(CHANGED_PRINCIPALS_KEY, set()).add(target.id)
+
+@event.listens_for(Session, "after_commit")
+def evict_changed_principals(session):
+    for employee_id in session.info.pop(CHANGED_PRINCIPALS_KEY, ()):
+        principal_cache.invalidate(employee_id)
+
+@event.listens_for(Session, "after_rollback")
+def discard_changed_principals(session):
+    session.info.pop(CHANGED_PRINCIPALS_KEY, None)
+
 # Decorator for verifying the JWT
-def token_required(f):
+def token_required(f=None, trust_claims=False):
+    """
+    Verifies the JWT and passes the authenticated Principal to the route as `current_user`.
+
+    Usable as `@token_required` or `@token_required(trust_claims=True)`. With trust_claims,
+    meant for read-only routes, the principal is built from the signed token claims alone,
+    so a revoked token (bumped token_version) stays usable there until it expires.
+    """
+    if f is None:
+        return lambda func: token_required(func, trust_claims=trust_claims)
+
     @wraps(f)
     def decorated(*args, **kwargs):
         token = None
@@ -34,14 +132,20 @@ def token_required(f):
         try:
             # decoding the payload to fetch the stored details
             data = jwt.decode(token, SECRET_KEY, algorithms=["HS256"])
-            current_user = Employee.query.filter_by(id=data["user_id"]).first()
-            if not current_user:
-                 return jsonify({"message": "User not found!"}), 401
         except jwt.ExpiredSignatureError:
             return jsonify({"message": "Token has expired!"}), 401
         except jwt.InvalidTokenError:
             return jsonify({"message": "Token is invalid!"}), 401
 
+        if trust_claims and "name" in data and "role" in data:
+            current_user = Principal(data["user_id"], data["name"], data.get("email"), data["role"], data.get("tv", 0))
+        else:
+            current_user = load_principal(data["user_id"])
+            if not current_user:
+                return jsonify({"message": "User not found!"}), 401
+            if current_user.token_version != data.get("tv", 0):
+                return jsonify({"message": "Token has been revoked!"}), 401
+
         # returns the current logged in users contex to the routes
         return f(current_user, *args, **kwargs)
 
@@ -71,7 +175,10 @@ def login():
         token = jwt.encode(
             {
                 "user_id": user.id,
+                "name": user.name,
+                "email": user.email,
                 "role": user.role,
+                "tv": user.token_version or 0, # Bumping Employee.token_version revokes issued tokens
                 "exp": datetime.datetime.utcnow() + datetime.timedelta(hours=24), # Token expires in 24 hours
             },
             SECRET_KEY,
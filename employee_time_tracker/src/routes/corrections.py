@@ -0,0 +1,175 @@
+from flask import Blueprint, request, jsonify
+from sqlalchemy import and_, or_
+from sqlalchemy.orm import aliased
+from datetime import datetime
+
+from src.main import db # Import db from main app in src
+from src.models.employee import Employee
+from src.models.time_record import TimeRecord
+from src.models.supervisor_correction_request import SupervisorCorrectionRequest
+from src.utils.corrections import review_corrections, CorrectionError, STATUS_PENDING, STATUS_APPROVED, STATUS_REJECTED
+from src.utils.pagination import encode_cursor, decode_cursor, parse_page_size
+
+# Define the Blueprint
+corrections_bp = Blueprint("corrections", __name__)
+
+# TODO: Add authentication/authorization (e.g., only Admin role)
+
+CORRECTION_STATUSES = (STATUS_PENDING, STATUS_APPROVED, STATUS_REJECTED)
+CORRECTIONS_PAGE_SIZE = 50
+CORRECTIONS_MAX_PAGE_SIZE = 200
+# Requests reviewed per bulk call (all in one transaction)
+CORRECTION_REVIEW_MAX_ITEMS = 500
+
+def _iso(value):
+    return value.isoformat() if value else None
+
+def serialize_correction_row(row):
+    return {
+        "id": row.id,
+        "supervisor_id": row.supervisor_id,
+        "supervisor_name": row.supervisor_name,
+        "employee_id": row.employee_id,
+        "employee_name": row.employee_name,
+        "time_record_id": row.time_record_id,
+        "checkin_id": row.checkin_id,
+        "current_record_type": row.current_record_type,
+        "current_timestamp": _iso(row.current_timestamp),
+        "request_timestamp": _iso(row.request_timestamp),
+        "requested_change_type": row.requested_change_type,
+        "original_value": row.original_value,
+        "requested_value": row.requested_value,
+        "reason": row.reason,
+        "status": row.status,
+        "admin_notes": row.admin_notes,
+        "reviewed_at": _iso(row.reviewed_at),
+        "reviewed_by_admin_id": row.reviewed_by_admin_id
+    }
+
+@corrections_bp.route("", methods=["GET"])
+def get_correction_requests():
+    """Correction requests in review order (oldest first), from the (status, request_timestamp) index.
+    Query Parameters:
+        status (str, optional): pending (default), approved or rejected.
+        limit (int, optional): Page size (default 50, max 200).
+        cursor (str, optional): `next_cursor` from the previous page.
+    Returns {"requests": [...], "next_cursor": str or null}.
+    """
+    status = request.args.get("status", STATUS_PENDING)
+    if status not in CORRECTION_STATUSES:
+        return jsonify({"error": f"Status inválido. Use: {', '.join(CORRECTION_STATUSES)}"}), 400
+
+    supervisor = aliased(Employee)
+    employee = aliased(Employee)
+    query = db.session.query(
+        SupervisorCorrectionRequest.id,
+        SupervisorCorrectionRequest.supervisor_id,
+        supervisor.name.label("supervisor_name"),
+        SupervisorCorrectionRequest.employee_id,
+        employee.name.label("employee_name"),
+        SupervisorCorrectionRequest.time_record_id,
+        SupervisorCorrectionRequest.checkin_id,
+        TimeRecord.record_type.label("current_record_type"),
+        TimeRecord.timestamp.label("current_timestamp"),
+        SupervisorCorrectionRequest.request_timestamp,
+        SupervisorCorrectionRequest.requested_change_type,
+        SupervisorCorrectionRequest.original_value,
+        SupervisorCorrectionRequest.requested_value,
+        SupervisorCorrectionRequest.reason,
+        SupervisorCorrectionRequest.status,
+        SupervisorCorrectionRequest.admin_notes,
+        SupervisorCorrectionRequest.reviewed_at,
+        SupervisorCorrectionRequest.reviewed_by_admin_id
+    ).join(supervisor, supervisor.id == SupervisorCorrectionRequest.supervisor_id).join(
+        employee, employee.id == SupervisorCorrectionRequest.employee_id
+    ).outerjoin(TimeRecord, TimeRecord.id == SupervisorCorrectionRequest.time_record_id).filter(
+        SupervisorCorrectionRequest.status == status
+    )
+
+    try:
+        page_size = parse_page_size(request.args.get("limit"), CORRECTIONS_PAGE_SIZE, CORRECTIONS_MAX_PAGE_SIZE)
+        if request.args.get("cursor"):
+            # Keyset: continue strictly after the last (request_timestamp, id) returned
+            cursor_timestamp, cursor_id = decode_cursor(request.args["cursor"])
+            if not isinstance(cursor_timestamp, datetime) or not isinstance(cursor_id, int):
+                raise ValueError("Invalid cursor")
+            query = query.filter(or_(
+                SupervisorCorrectionRequest.request_timestamp > cursor_timestamp,
+                and_(SupervisorCorrectionRequest.request_timestamp == cursor_timestamp, SupervisorCorrectionRequest.id > cursor_id)
+            ))
+    except ValueError:
+        return jsonify({"error": "Parâmetros de paginação inválidos (limit/cursor)"}), 400
+
+    try:
+        rows = query.order_by(
+            SupervisorCorrectionRequest.request_timestamp, SupervisorCorrectionRequest.id
+        ).limit(page_size + 1).all()
+        has_more = len(rows) > page_size
+        rows = rows[:page_size]
+        return jsonify({
+            "requests": [serialize_correction_row(row) for row in rows],
+            "next_cursor": encode_cursor(rows[-1].request_timestamp, rows[-1].id) if has_more else None
+        }), 200
+    except Exception as e:
+        print(f"Error fetching correction requests: {e}")
+        return jsonify({"error": f"Erro ao buscar solicitações de correção: {e}"}), 500
+
+def _parse_ids(value):
+    if value is None:
+        return []
+    if not isinstance(value, list) or not all(isinstance(item, int) and not isinstance(item, bool) for item in value):
+        raise ValueError("approve e reject devem ser listas de IDs")
+    return value
+
+@corrections_bp.route("/review", methods=["POST"])
+def review_correction_requests():
+    """
+    Approves and/or rejects pending correction requests in one transaction.
+    JSON Body:
+        approve (list[int], optional): Requests to approve; their changes are applied to the
+            punch (or the missing punch is created). Times are business-timezone
+            "YYYY-MM-DD HH:MM", or "HH:MM" for an existing punch.
+        reject (list[int], optional): Requests to reject.
+        admin_notes (str, optional): Notes stored on every reviewed request.
+        reviewed_by_admin_id (int, optional): Reviewing admin.
+    If any request can't be reviewed nothing is applied, and the reasons are returned per id.
+    Returns the employee-weeks whose hours and lateness figures changed.
+    """
+    data = request.get_json(silent=True) or {}
+    try:
+        approve_ids = _parse_ids(data.get("approve"))
+        reject_ids = _parse_ids(data.get("reject"))
+    except ValueError as e:
+        return jsonify({"error": str(e)}), 400
+    if not approve_ids and not reject_ids:
+        return jsonify({"error": "Informe as solicitações em approve e/ou reject"}), 400
+    if len(approve_ids) + len(reject_ids) > CORRECTION_REVIEW_MAX_ITEMS:
+        return jsonify({"error": f"Máximo de {CORRECTION_REVIEW_MAX_ITEMS} solicitações por revisão"}), 400
+
+    admin_id = data.get("reviewed_by_admin_id")
+    if admin_id is not None and not db.session.get(Employee, admin_id):
+        return jsonify({"error": "Administrador não encontrado"}), 404
+
+    try:
+        affected_weeks = review_corrections(
+            db.session, approve_ids, reject_ids, admin_id=admin_id, admin_notes=data.get("admin_notes")
+        )
+    except CorrectionError as e:
+        return jsonify({
+            "error": "Nenhuma solicitação foi revisada",
+            "errors": {str(request_id): reason for request_id, reason in e.errors.items()}
+        }), 409
+    except Exception as e:
+        db.session.rollback()
+        print(f"Error reviewing correction requests: {e}")
+        return jsonify({"error": f"Erro ao revisar solicitações de correção: {e}"}), 500
+
+    return jsonify({
+        "message": "Solicitações revisadas com sucesso",
+        "approved": len(set(approve_ids)),
+        "rejected": len(set(reject_ids)),
+        "affected_weeks": [
+            {"employee_id": employee_id, "week_start": week_start.isoformat()}
+            for employee_id, week_start in affected_weeks
+        ]
+    }), 200
@@ -2,9 +2,14 @@
 from flask import Blueprint, request, jsonify
 from src.main import db # Import db from main app in src
 from src.models.material import MaterialType # Corrected import
-from src.models.material_log import MaterialLog
+from src.models.material_log import MaterialLog, expected_replacement_date
+from src.models.change_journal import journal_changes, OPERATION_UPSERT
 from src.models.employee import Employee # To verify employee exists
 from datetime import datetime, timedelta # Added timedelta
+from sqlalchemy import insert
+import os
+from src.utils.delta_sync import build_delta, full_load_cursor, SYNC_CURSOR_HEADER, JournalCursorExpired
+from src.utils.photo_store import thumbnail_url
 
 # Define the Blueprint
 materials_bp = Blueprint("materials", __name__)
@@ -88,18 +93,39 @@ def delete_material_type(type_id):
         return jsonify({"error": f"Erro ao excluir tipo de material: {e}"}), 500
 
 
+def serialize_material_type(mat):
+    return {
+        "id": mat.id,
+        "name": mat.name,
+        "description": mat.description,
+        "expected_duration_days": mat.expected_duration_days, # Corrected field name
+        "category": mat.category
+    }
+
 @materials_bp.route("/types", methods=["GET"])
 def list_material_types():
-    """Lists all available material types."""
+    """Lists all available material types.
+    Query Parameters:
+        since (str, optional): Sync cursor; returns only types changed after it (see build_delta).
+    """
+    def load_material_types(type_ids=None):
+        query = MaterialType.query
+        if type_ids is not None:
+            query = query.filter(MaterialType.id.in_(type_ids))
+        return [serialize_material_type(mat) for mat in query.order_by(MaterialType.name)]
+
     try:
-        material_types = MaterialType.query.order_by(MaterialType.name).all()
-        return jsonify([{
-            "id": mat.id,
-            "name": mat.name,
-            "description": mat.description,
-            "expected_duration_days": mat.expected_duration_days, # Corrected field name
-            "category": mat.category
-        } for mat in material_types]), 200
+        since = request.args.get("since")
+        if since:
+            return jsonify(build_delta(db.session, "material_type", since, load_material_types)), 200
+        cursor = full_load_cursor(db.session)
+        response = jsonify(load_material_types())
+        response.headers[SYNC_CURSOR_HEADER] = cursor
+        return response, 200
+    except JournalCursorExpired:
+        return jsonify({"error": "Cursor de sincronização (since) expirado. Recarregue a lista completa"}), 410
+    except ValueError:
+        return jsonify({"error": "Cursor de sincronização (since) inválido"}), 400
     except Exception as e:
         print(f"Error listing material types: {e}")
         return jsonify({"error": f"Erro ao listar tipos de material: {e}"}), 500
@@ -163,6 +189,132 @@ def log_material_delivery():
         print(f"Error logging material delivery: {e}")
         return jsonify({"error": f"Erro ao registrar entrega de material: {e}"}), 500
 
+# Deliveries accepted in one bulk call (all in one transaction)
+MATERIAL_BULK_MAX_ITEMS = int(os.getenv("MATERIAL_BULK_MAX_ITEMS", "1000"))
+
+def _is_id(value):
+    return isinstance(value, int) and not isinstance(value, bool)
+
+@materials_bp.route("/logs/bulk", methods=["POST"])
+def log_material_deliveries_bulk():
+    """
+    Logs the delivery of one material type to many employees (e.g., uniforms or EPI for a whole site).
+    JSON Body:
+        material_type_id (int, required): ID of the material type delivered.
+        deliveries (list, required): Items with employee_id (int, required), quantity (int, optional,
+            default=1) and notes (str, optional, overrides the shared notes).
+        notes (str, optional): Notes for every delivery.
+        photo_url (str, optional): URL of a photo confirming the distribution.
+        delivery_date (str, optional, format YYYY-MM-DD): Defaults to today.
+    Ids are validated with one query per table and all logs are inserted in one transaction;
+    if any delivery is invalid nothing is stored and the problems are returned per item.
+    Returns the new log id of each delivery as {"employee_id", "log_id"} pairs, in request order.
+    """
+    data = request.get_json(silent=True)
+    if not isinstance(data, dict) or not _is_id(data.get("material_type_id")) or not isinstance(data.get("deliveries"), list) or not data["deliveries"]:
+        return jsonify({"error": "material_type_id (inteiro) e deliveries são obrigatórios"}), 400
+    deliveries = data["deliveries"]
+    if len(deliveries) > MATERIAL_BULK_MAX_ITEMS:
+        return jsonify({"error": f"Máximo de {MATERIAL_BULK_MAX_ITEMS} entregas por envio"}), 400
+
+    delivery_date = datetime.utcnow().date() # Use date part only by default
+    if data.get("delivery_date"):
+        try:
+            delivery_date = datetime.strptime(data["delivery_date"], "%Y-%m-%d").date()
+        except ValueError:
+            return jsonify({"error": "Formato inválido para delivery_date. Use YYYY-MM-DD"}), 400
+    delivery_datetime = datetime.combine(delivery_date, datetime.min.time())
+
+    errors = {}
+    seen_employee_ids = set()
+    for index, item in enumerate(deliveries):
+        field = f"deliveries[{index}]"
+        if not isinstance(item, dict) or not _is_id(item.get("employee_id")):
+            errors[f"{field}.employee_id"] = "employee_id é obrigatório"
+            continue
+        quantity = item.get("quantity", 1)
+        if not _is_id(quantity) or quantity < 1:
+            errors[f"{field}.quantity"] = "quantity deve ser um inteiro positivo"
+        if item["employee_id"] in seen_employee_ids:
+            errors[f"{field}.employee_id"] = "Funcionário repetido na entrega"
+        seen_employee_ids.add(item["employee_id"])
+
+    try:
+        # One query per referenced table, whatever the number of deliveries
+        material_type = db.session.query(MaterialType.id, MaterialType.expected_duration_days).filter(
+            MaterialType.id == data["material_type_id"]
+        ).first()
+        known_employees = {row.id for row in db.session.query(Employee.id).filter(Employee.id.in_(seen_employee_ids))}
+    except Exception as e:
+        db.session.rollback()
+        print(f"Error validating bulk material delivery: {e}")
+        return jsonify({"error": f"Erro ao registrar entregas de material: {e}"}), 500
+
+    if not material_type:
+        return jsonify({"error": "Tipo de material não encontrado"}), 404
+    for index, item in enumerate(deliveries):
+        if isinstance(item, dict) and _is_id(item.get("employee_id")) and item["employee_id"] not in known_employees:
+            errors[f"deliveries[{index}].employee_id"] = "Funcionário não encontrado"
+    if errors:
+        return jsonify({"error": "Entregas inválidas", "errors": errors}), 400
+
+    # Same type and day for every row: the replacement date is computed once
+    replacement_date = expected_replacement_date(delivery_datetime, material_type.expected_duration_days)
+    rows = [{
+        "material_type_id": material_type.id,
+        "employee_id": item["employee_id"],
+        "quantity": item.get("quantity", 1),
+        "photo_url": data.get("photo_url"),
+        "notes": item.get("notes", data.get("notes")),
+        "delivery_date": delivery_datetime,
+        "expected_replacement_date": replacement_date
+    } for item in deliveries]
+
+    try:
+        if db.session.get_bind().dialect.insert_executemany_returning:
+            # Single executemany (multi-row VALUES batches) that also reports the new ids
+            inserted = db.session.execute(
+                insert(MaterialLog).returning(MaterialLog.id, MaterialLog.employee_id, sort_by_parameter_order=True), rows
+            ).all()
+        else:
+            # No RETURNING from an executemany (MySQL): insert row by row to read each lastrowid,
+            # still in the one transaction (reading ids back by max(id) races with other writers)
+            inserted = [
+                (db.session.execute(insert(MaterialLog).values(**row)).inserted_primary_key[0], row["employee_id"])
+                for row in rows
+            ]
+        log_ids = {employee_id: log_id for log_id, employee_id in inserted}
+        # Core insert: the ORM journal listener doesn't see these rows
+        journal_changes(db.session.connection(), "material_log", sorted(log_ids.values()), OPERATION_UPSERT)
+        db.session.commit()
+        return jsonify({
+            "message": "Entregas de material registradas com sucesso",
+            "logs": [
+                {"employee_id": item["employee_id"], "log_id": log_ids[item["employee_id"]]}
+                for item in deliveries
+            ],
+            "expected_replacement_date": replacement_date.isoformat() if replacement_date else None
+        }), 201
+    except Exception as e:
+        db.session.rollback()
+        print(f"Error logging bulk material delivery: {e}")
+        return jsonify({"error": f"Erro ao registrar entregas de material: {e}"}), 500
+
+def serialize_material_log(log):
+    return {
+        "id": log.id,
+        "material_type_id": log.material_type_id,
+        "material_type_name": log.material_type.name, # Include name via relationship
+        "employee_id": log.employee_id,
+        "employee_name": log.employee.name, # Include name via relationship
+        "delivery_date": log.delivery_date.isoformat(),
+        "quantity": log.quantity,
+        "photo_url": log.photo_url,
+        "photo_thumbnail_url": thumbnail_url(log.photo_url),
+        "notes": log.notes,
+        "expected_replacement_date": log.expected_replacement_date.isoformat() if log.expected_replacement_date else None
+    }
+
 @materials_bp.route("/logs", methods=["GET"])
 def list_material_logs():
     """
@@ -172,6 +324,7 @@ def list_material_logs():
         material_type_id (int, optional): Filter by material type ID.
         start_date (str, optional, YYYY-MM-DD): Filter by delivery start date.
         end_date (str, optional, YYYY-MM-DD): Filter by delivery end date.
+        since (str, optional): Sync cursor; returns only logs changed after it (see build_delta).
     """
     query = MaterialLog.query.join(MaterialType).join(Employee) # Join for easy access to names
 
@@ -208,23 +361,26 @@ def list_material_logs():
         except ValueError:
             return jsonify({"error": "Formato inválido para end_date. Use YYYY-MM-DD"}), 400
 
+    def load_material_logs(log_ids=None):
+        log_query = query
+        if log_ids is not None:
+            log_query = log_query.filter(MaterialLog.id.in_(log_ids))
+        return [serialize_material_log(log) for log in log_query.order_by(MaterialLog.delivery_date.desc())]
+
     try:
-        logs = query.order_by(MaterialLog.delivery_date.desc()).all()
-        return jsonify([{
-            "id": log.id,
-            "material_type_id": log.material_type_id,
-            "material_type_name": log.material_type.name, # Include name via relationship
-            "employee_id": log.employee_id,
-            "employee_name": log.employee.name, # Include name via relationship
-            "delivery_date": log.delivery_date.isoformat(),
-            "quantity": log.quantity,
-            "photo_url": log.photo_url,
-            "notes": log.notes,
-            "expected_replacement_date": log.expected_replacement_date.isoformat() if log.expected_replacement_date else None
-        } for log in logs]), 200
+        since = request.args.get("since")
+        if since:
+            # Filters apply to changed rows; deletions are always reported
+            return jsonify(build_delta(db.session, "material_log", since, load_material_logs)), 200
+        cursor = full_load_cursor(db.session)
+        response = jsonify(load_material_logs())
+        response.headers[SYNC_CURSOR_HEADER] = cursor
+        return response, 200
+    except JournalCursorExpired:
+        return jsonify({"error": "Cursor de sincronização (since) expirado. Recarregue a lista completa"}), 410
+    except ValueError:
+        return jsonify({"error": "Cursor de sincronização (since) inválido"}), 400
     except Exception as e:
         db.session.rollback() # Rollback in case of error during serialization
         print(f"Error listing material logs: {e}")
         return jsonify({"error": f"Erro ao listar registros de material: {e}"}), 500
-
-
@@ -0,0 +1,107 @@
+
+from flask import Blueprint, request, jsonify, send_file
+from werkzeug.exceptions import RequestEntityTooLarge
+import os
+
+from src.utils.photo_store import (
+    save_photo_stream, queue_variants, photo_path, photo_url, thumbnail_url, sniff_content_type,
+    MultipartFileReader, PhotoTooLarge, UnsupportedPhotoType, MissingPhotoField, PHOTO_VARIANTS, PHOTO_MAX_BYTES
+)
+from src.routes.auth import token_required
+
+photos_bp = Blueprint("photos", __name__)
+
+# Stored photos never change (the URL is their content hash)
+IMMUTABLE_CACHE_CONTROL = "public, max-age=31536000, immutable"
+
+@photos_bp.route("", methods=["POST"])
+@token_required
+def upload_photo(current_user):
+    """
+    Uploads a photo to the content-addressed store.
+
+    Send either the raw image as the request body (Content-Type: image/jpeg, image/png or
+    image/webp) or a multipart form with the image in the `photo` field. Either way the upload
+    is hashed and written to disk as it is received (the form isn't spooled first); uploading
+    the same photo again returns the same URL.
+    Use the returned `url` as the photo_url of punches, check-ins and material logs.
+    """
+    if request.content_length and request.content_length > PHOTO_MAX_BYTES + 64 * 1024:
+        return jsonify({"error": f"Foto maior que o limite de {PHOTO_MAX_BYTES // (1024 * 1024)} MB"}), 413
+
+    if request.mimetype == "multipart/form-data":
+        boundary = request.mimetype_params.get("boundary")
+        if not boundary:
+            return jsonify({"error": "Envie a foto no campo 'photo'"}), 400
+        stream = MultipartFileReader(request.stream, boundary, "photo")
+    elif request.mimetype.startswith("image/"):
+        stream = request.stream
+    else:
+        return jsonify({"error": "Envie a foto como image/* ou multipart/form-data"}), 415
+
+    try:
+        sha256, size, content_type, created = save_photo_stream(stream)
+    except (PhotoTooLarge, RequestEntityTooLarge): # The latter for oversized multipart part headers
+        return jsonify({"error": f"Foto maior que o limite de {PHOTO_MAX_BYTES // (1024 * 1024)} MB"}), 413
+    except UnsupportedPhotoType:
+        return jsonify({"error": "Formato de foto não suportado. Use JPEG, PNG ou WebP"}), 415
+    except MissingPhotoField:
+        return jsonify({"error": "Envie a foto no campo 'photo'"}), 400
+    except ValueError:
+        return jsonify({"error": "Formulário multipart inválido"}), 400
+    except Exception as e:
+        print(f"Error storing photo uploaded by {current_user.id}: {e}")
+        return jsonify({"error": "Erro ao salvar foto"}), 500
+
+    try:
+        queue_variants(sha256)
+    except Exception as e:
+        # The original is stored; variants are generated again when first requested
+        print(f"Error queueing variants of photo {sha256}: {e}")
+
+    url = photo_url(sha256)
+    return jsonify({
+        "sha256": sha256,
+        "url": url,
+        "thumbnail_url": thumbnail_url(url),
+        "size": size,
+        "content_type": content_type,
+        "deduplicated": not created
+    }), 201 if created else 200
+
+@photos_bp.route("/<sha256>", methods=["GET"])
+def get_photo(sha256):
+    """
+    Serves a stored photo, or one of its variants with ?variant=thumb|medium.
+
+    Not authenticated, so <img> tags can load it: the URL is the SHA-256 of the content and
+    can't be guessed. A variant still being generated (or whose generation failed) is
+    replaced by the original, with a short cache lifetime.
+    """
+    if len(sha256) != 64 or any(char not in "0123456789abcdef" for char in sha256):
+        return jsonify({"error": "Foto não encontrada"}), 404
+    original_path = photo_path(sha256)
+    if not os.path.exists(original_path):
+        return jsonify({"error": "Foto não encontrada"}), 404
+
+    variant = request.args.get("variant")
+    if variant:
+        if variant not in PHOTO_VARIANTS:
+            return jsonify({"error": f"Variante inválida. Use: {', '.join(PHOTO_VARIANTS)}"}), 400
+        variant_path = photo_path(sha256, variant)
+        if os.path.exists(variant_path):
+            response = send_file(variant_path, mimetype="image/jpeg", etag=f"{sha256}-{variant}", conditional=True)
+            response.headers["Cache-Control"] = IMMUTABLE_CACHE_CONTROL
+            return response
+        queue_variants(sha256)
+        response = send_file(original_path, mimetype=_original_mimetype(original_path), etag=sha256, conditional=True)
+        response.headers["Cache-Control"] = "public, max-age=60"
+        return response
+
+    response = send_file(original_path, mimetype=_original_mimetype(original_path), etag=sha256, conditional=True)
+    response.headers["Cache-Control"] = IMMUTABLE_CACHE_CONTROL
+    return response
+
+def _original_mimetype(path):
+    with open(path, "rb") as photo_file:
+        return sniff_content_type(photo_file.read(16)) or "application/octet-stream"
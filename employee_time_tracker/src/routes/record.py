@@ -1,128 +1,369 @@
 
 from flask import Blueprint, request, jsonify
-from datetime import datetime
+from datetime import datetime, date, timedelta, timezone
+from collections import defaultdict
+from sqlalchemy import select, func, case
+import os
 
 # Import db and models from main
 from src.main import db
 from src.models.time_record import TimeRecord
 from src.models.employee import Employee
+from src.models.daily_work_summary import DailyWorkSummary
+from src.utils.punches import (
+    record_punch, last_punch, describe_rejection, ingest_punch_batch, PunchItem,
+    ALLOWED_PREVIOUS_RECORD_TYPES, PUNCH_LABELS, PUNCH_CREATED, PUNCH_REPLAYED, PUNCH_REJECTED, OPEN_SHIFT_TIMEOUT
+)
+from src.utils import punch_writer
+from src.utils.pagination import encode_cursor, decode_cursor, parse_page_size
+from src.utils.report_cache import report_cache, data_versions
+from src.utils.business_time import business_today
+from src.utils.geo import parse_coordinates
 
 # Import the token_required decorator from auth blueprint
 from src.routes.auth import token_required
 
 record_bp = Blueprint("record", __name__)
 
-# Helper function to get or create today's record for an employee
-def get_or_create_today_record(employee_id):
-    today_date = datetime.utcnow().date()
-    record = TimeRecord.query.filter_by(employee_id=employee_id, date=today_date).first()
-    if not record:
-        record = TimeRecord(employee_id=employee_id, date=today_date)
-        db.session.add(record)
-        # No commit here, commit after update
-    return record
+def handle_punch(current_user, record_type, success_message, success_status):
+    """
+    Stores one punch for the authenticated employee.
 
-@record_bp.route("/checkin", methods=["POST"])
-@token_required
-def check_in(current_user):
-    record = get_or_create_today_record(current_user.id)
-    if record.check_in:
-        return jsonify({"message": "Check-in já realizado hoje."}), 400
+    An optional idempotency key (`Idempotency-Key` header or `idempotency_key` in the JSON
+    body) makes retries safe: repeating a request returns the original punch with 200.
+    """
+    data = request.get_json(silent=True) or {}
+    idempotency_key = request.headers.get("Idempotency-Key") or data.get("idempotency_key")
+    if idempotency_key is not None and (not isinstance(idempotency_key, str) or len(idempotency_key) > 64):
+        return jsonify({"message": "Chave de idempotência inválida (máximo 64 caracteres)."}), 400
+    try:
+        latitude, longitude = parse_coordinates(data.get("latitude"), data.get("longitude"))
+    except ValueError as e:
+        return jsonify({"message": f"Localização inválida: {e}."}), 400
 
-    record.check_in = datetime.utcnow()
     try:
-        db.session.commit()
-        return jsonify({"message": "Check-in registrado com sucesso", "time": record.check_in.isoformat()}), 201
+        if punch_writer.GROUP_COMMIT_ENABLED:
+            # Committed together with other requests' punches by the writer thread
+            item = PunchItem(
+                current_user.id, record_type, datetime.utcnow(),
+                latitude=latitude,
+                longitude=longitude,
+                photo_url=data.get("photo_url"),
+                idempotency_key=idempotency_key
+            )
+            result = punch_writer.get_punch_writer().submit(item).wait()
+        else:
+            result = record_punch(
+                db.session, current_user.id, record_type,
+                latitude=latitude,
+                longitude=longitude,
+                photo_url=data.get("photo_url"),
+                idempotency_key=idempotency_key
+            )
+    except TimeoutError:
+        return jsonify({"message": "Servidor ocupado, tente novamente com a mesma chave de idempotência."}), 503
     except Exception as e:
         db.session.rollback()
-        return jsonify({"message": "Erro ao registrar check-in", "error": str(e)}), 500
+        print(f"Error recording {record_type} for employee {current_user.id}: {e}")
+        return jsonify({"message": f"Erro ao registrar {PUNCH_LABELS[record_type].lower()}", "error": str(e)}), 500
+
+    if result.outcome == PUNCH_REJECTED:
+        return jsonify({
+            "message": describe_rejection(result),
+            "last_record_type": result.last_record_type
+        }), 400
+
+    response = {
+        "message": success_message,
+        "id": result.record_id,
+        "record_type": result.record_type,
+        "time": result.timestamp.isoformat(),
+        "replayed": result.outcome == PUNCH_REPLAYED
+    }
+    if result.outcome == PUNCH_CREATED:
+        response["site_id"] = result.site_id
+        response["outside_geofence"] = result.outside_geofence
+    return jsonify(response), success_status if result.outcome == PUNCH_CREATED else 200
+
+@record_bp.route("/checkin", methods=["POST"])
+@token_required
+def check_in(current_user):
+    return handle_punch(current_user, "arrival", "Check-in registrado com sucesso", 201)
 
 @record_bp.route("/lunch/start", methods=["POST"])
 @token_required
 def lunch_start(current_user):
-    record = get_or_create_today_record(current_user.id)
-    if not record.check_in:
-        return jsonify({"message": "Realize o check-in primeiro."}), 400
-    if record.lunch_start:
-        return jsonify({"message": "Início do almoço já registrado hoje."}), 400
-    if record.check_out:
-         return jsonify({"message": "Expediente já encerrado."}), 400
-
-    record.lunch_start = datetime.utcnow()
-    try:
-        db.session.commit()
-        return jsonify({"message": "Início do almoço registrado com sucesso", "time": record.lunch_start.isoformat()}), 200
-    except Exception as e:
-        db.session.rollback()
-        return jsonify({"message": "Erro ao registrar início do almoço", "error": str(e)}), 500
+    return handle_punch(current_user, "lunch_start", "Início do almoço registrado com sucesso", 200)
 
 @record_bp.route("/lunch/end", methods=["POST"])
 @token_required
 def lunch_end(current_user):
-    record = get_or_create_today_record(current_user.id)
-    if not record.lunch_start:
-        return jsonify({"message": "Registre o início do almoço primeiro."}), 400
-    if record.lunch_end:
-        return jsonify({"message": "Fim do almoço já registrado hoje."}), 400
-    if record.check_out:
-         return jsonify({"message": "Expediente já encerrado."}), 400
-
-    record.lunch_end = datetime.utcnow()
-    try:
-        db.session.commit()
-        return jsonify({"message": "Fim do almoço registrado com sucesso", "time": record.lunch_end.isoformat()}), 200
-    except Exception as e:
-        db.session.rollback()
-        return jsonify({"message": "Erro ao registrar fim do almoço", "error": str(e)}), 500
+    return handle_punch(current_user, "lunch_end", "Fim do almoço registrado com sucesso", 200)
 
 @record_bp.route("/checkout", methods=["POST"])
 @token_required
 def check_out(current_user):
-    record = get_or_create_today_record(current_user.id)
-    if not record.check_in:
-        return jsonify({"message": "Realize o check-in primeiro."}), 400
-    # Allow checkout even if lunch wasn't fully recorded, but maybe flag it?
-    # if record.lunch_start and not record.lunch_end:
-    #     return jsonify({"message": "Registre o fim do almoço primeiro."}), 400
-    if record.check_out:
-        return jsonify({"message": "Check-out já realizado hoje."}), 400
-
-    record.check_out = datetime.utcnow()
+    # Allowed after arrival, lunch start or lunch end (a lunch left open doesn't block leaving)
+    return handle_punch(current_user, "departure", "Check-out registrado com sucesso", 200)
+
+# --- Offline sync --- #
+
+# Largest batch accepted by /record/sync
+SYNC_MAX_ITEMS = int(os.getenv("SYNC_MAX_ITEMS", "1000"))
+# Roles allowed to sync punches of other employees (shared tablets)
+SYNC_ON_BEHALF_ROLES = ("admin", "supervisor")
+# Device clocks may run a little ahead of the server
+SYNC_MAX_CLOCK_SKEW = timedelta(minutes=5)
+
+def parse_sync_item(raw, current_user, now):
+    """Parses one /record/sync item into a PunchItem; returns (item, error message)."""
+    if not isinstance(raw, dict):
+        return None, "Item inválido."
+    employee_id = raw.get("employee_id", current_user.id)
+    if not isinstance(employee_id, int) or isinstance(employee_id, bool):
+        return None, "employee_id inválido."
+    if employee_id != current_user.id and current_user.role not in SYNC_ON_BEHALF_ROLES:
+        return None, "Sem permissão para registrar ponto de outro funcionário."
+    record_type = raw.get("record_type")
+    if record_type not in ALLOWED_PREVIOUS_RECORD_TYPES:
+        return None, f"record_type inválido. Use um de: {', '.join(ALLOWED_PREVIOUS_RECORD_TYPES)}."
+    try:
+        timestamp = datetime.fromisoformat(raw["timestamp"])
+    except (KeyError, TypeError, ValueError):
+        return None, "timestamp inválido. Use o formato ISO 8601."
+    if timestamp.tzinfo is not None:
+        timestamp = timestamp.astimezone(timezone.utc).replace(tzinfo=None) # Stored as naive UTC
+    if timestamp > now + SYNC_MAX_CLOCK_SKEW:
+        return None, "timestamp no futuro."
+    idempotency_key = raw.get("idempotency_key")
+    if idempotency_key is not None and (not isinstance(idempotency_key, str) or len(idempotency_key) > 64):
+        return None, "Chave de idempotência inválida (máximo 64 caracteres)."
     try:
-        db.session.commit()
-        return jsonify({"message": "Check-out registrado com sucesso", "time": record.check_out.isoformat()}), 200
+        latitude, longitude = parse_coordinates(raw.get("latitude"), raw.get("longitude"))
+    except ValueError as e:
+        return None, f"Localização inválida: {e}."
+    return PunchItem(
+        employee_id, record_type, timestamp,
+        latitude=latitude,
+        longitude=longitude,
+        photo_url=raw.get("photo_url"),
+        idempotency_key=idempotency_key
+    ), None
+
+@record_bp.route("/sync", methods=["POST"])
+@token_required
+def sync_punches(current_user):
+    """
+    Stores a batch of punches queued offline by a device, in one transaction.
+
+    JSON Body:
+        punches (list, required): Items with record_type, timestamp (ISO 8601, device time)
+            and optionally employee_id (defaults to the caller; other employees need an
+            admin or supervisor token), latitude, longitude, photo_url and idempotency_key.
+
+    Each employee's punches are validated in timestamp order against their last stored punch.
+    Returns one result per item, in request order, with status "created", "replayed",
+    "rejected" or "invalid".
+    """
+    data = request.get_json(silent=True) or {}
+    raw_items = data.get("punches")
+    if not isinstance(raw_items, list) or not raw_items:
+        return jsonify({"error": "punches deve ser uma lista não vazia"}), 400
+    if len(raw_items) > SYNC_MAX_ITEMS:
+        return jsonify({"error": f"Máximo de {SYNC_MAX_ITEMS} registros por sincronização"}), 400
+
+    now = datetime.utcnow()
+    results = [None] * len(raw_items)
+    parsed = [] # (request index, PunchItem)
+    for index, raw in enumerate(raw_items):
+        item, error = parse_sync_item(raw, current_user, now)
+        if error:
+            results[index] = {"index": index, "status": "invalid", "error": error}
+        else:
+            parsed.append((index, item))
+
+    try:
+        # Items for unknown employees are invalid rather than failing the whole batch
+        employee_ids = {item.employee_id for _, item in parsed}
+        known_ids = {employee_id for (employee_id,) in db.session.query(Employee.id).filter(Employee.id.in_(employee_ids))} if employee_ids else set()
+        for index, item in parsed:
+            if item.employee_id not in known_ids:
+                results[index] = {"index": index, "status": "invalid", "error": "Funcionário não encontrado."}
+        parsed = [(index, item) for index, item in parsed if item.employee_id in known_ids]
+
+        punch_results = ingest_punch_batch(db.session, [item for _, item in parsed])
     except Exception as e:
         db.session.rollback()
-        return jsonify({"message": "Erro ao registrar check-out", "error": str(e)}), 500
+        print(f"Error syncing punches for {current_user.id}: {e}")
+        return jsonify({"error": "Erro ao sincronizar registros"}), 500
+
+    for (index, item), result in zip(parsed, punch_results):
+        entry = {
+            "index": index,
+            "status": result.outcome,
+            "employee_id": item.employee_id,
+            "record_type": item.record_type,
+            "idempotency_key": item.idempotency_key,
+        }
+        if result.outcome == PUNCH_REJECTED:
+            entry["error"] = describe_rejection(result)
+            entry["last_record_type"] = result.last_record_type
+        else:
+            entry["id"] = result.record_id
+            entry["time"] = result.timestamp.isoformat()
+        if result.outcome == PUNCH_CREATED:
+            entry["site_id"] = result.site_id
+            entry["outside_geofence"] = result.outside_geofence
+        results[index] = entry
+
+    counts = defaultdict(int)
+    for entry in results:
+        counts[entry["status"]] += 1
+    return jsonify({"results": results, "summary": dict(counts)}), 200
+
+# Employee state after each kind of last punch
+STATE_AFTER_RECORD_TYPE = {
+    None: "not_arrived",
+    "arrival": "working",
+    "lunch_start": "at_lunch",
+    "lunch_end": "working",
+    "departure": "clocked_out",
+}
+
+def first_punches_by_type(records):
+    """Maps each record type to the ISO time of its first punch among `records` (or None)."""
+    first = {record_type: None for record_type in PUNCH_LABELS}
+    for record in records:
+        if first.get(record.record_type, "") is None:
+            first[record.record_type] = record.timestamp.isoformat()
+    return first
 
 @record_bp.route("/status", methods=["GET"])
-@token_required
+@token_required(trust_claims=True) # Read-only: no lookup needed
 def get_status(current_user):
-    record = get_or_create_today_record(current_user.id)
+    previous = last_punch(db.session, current_user.id)
+    # An open shift (e.g. a night shift past midnight) is still shown under the day it started
+    work_date = business_today()
+    if previous and previous.record_type != "departure" and previous.work_date and previous.timestamp >= datetime.utcnow() - OPEN_SHIFT_TIMEOUT:
+        work_date = previous.work_date
+    today_records = db.session.execute(
+        select(TimeRecord.timestamp, TimeRecord.record_type).where(
+            TimeRecord.employee_id == current_user.id,
+            TimeRecord.work_date == work_date # Equality lookup on ix_time_record_employee_work_date
+        ).order_by(TimeRecord.timestamp, TimeRecord.id)
+    ).all()
+    first = first_punches_by_type(today_records)
     return jsonify({
         "employee_id": current_user.id,
-        "date": record.date.isoformat(),
-        "check_in": record.check_in.isoformat() if record.check_in else None,
-        "lunch_start": record.lunch_start.isoformat() if record.lunch_start else None,
-        "lunch_end": record.lunch_end.isoformat() if record.lunch_end else None,
-        "check_out": record.check_out.isoformat() if record.check_out else None,
+        "date": work_date.isoformat(),
+        "state": STATE_AFTER_RECORD_TYPE.get(previous.record_type if previous else None, "working"),
+        "last_record_type": previous.record_type if previous else None,
+        "last_record_time": previous.timestamp.isoformat() if previous else None,
+        "check_in": first["arrival"],
+        "lunch_start": first["lunch_start"],
+        "lunch_end": first["lunch_end"],
+        "check_out": first["departure"],
     })
 
+HISTORY_PAGE_SIZE = 30
+HISTORY_MAX_PAGE_SIZE = 100
+
+def _iso(value):
+    return value.isoformat() if value else None
+
+def serialize_history_day(row):
+    return {
+        "date": row.work_date.isoformat(),
+        "check_in": _iso(row.first_arrival),
+        "lunch_start": _iso(row.first_lunch_start),
+        "lunch_end": _iso(row.last_lunch_end),
+        "check_out": _iso(row.last_departure),
+        "worked_seconds": row.worked_seconds,
+        "lunch_seconds": row.lunch_seconds,
+        "night_seconds": row.night_seconds,
+    }
+
 @record_bp.route("/history", methods=["GET"])
-@token_required
+@token_required(trust_claims=True)
 def get_history(current_user):
-    # Add pagination later if needed
-    records = TimeRecord.query.filter_by(employee_id=current_user.id).order_by(TimeRecord.date.desc()).limit(30).all()
-    history = [
-        {
-            "id": r.id,
-            "date": r.date.isoformat(),
-            "check_in": r.check_in.isoformat() if r.check_in else None,
-            "lunch_start": r.lunch_start.isoformat() if r.lunch_start else None,
-            "lunch_end": r.lunch_end.isoformat() if r.lunch_end else None,
-            "check_out": r.check_out.isoformat() if r.check_out else None,
-        } for r in records
-    ]
-    return jsonify(history)
+    """The employee's work days, newest first, one entry per day from DailyWorkSummary.
+    Query Parameters:
+        limit (int, optional): Days per page (default 30, max 100).
+        cursor (str, optional): `next_cursor` from the previous page.
+    Returns {"days": [...], "next_cursor": str or null}.
+    """
+    try:
+        page_size = parse_page_size(request.args.get("limit"), HISTORY_PAGE_SIZE, HISTORY_MAX_PAGE_SIZE)
+        cursor_date = None
+        if request.args.get("cursor"):
+            (cursor_date,) = decode_cursor(request.args["cursor"])
+            if not isinstance(cursor_date, date):
+                raise ValueError("Invalid cursor")
+    except ValueError:
+        return jsonify({"message": "Parâmetros de paginação inválidos (limit/cursor)"}), 400
+
+    # Keyset over the (employee_id, work_date) primary key: one index range per page
+    query = db.session.query(
+        DailyWorkSummary.work_date,
+        DailyWorkSummary.first_arrival,
+        DailyWorkSummary.first_lunch_start,
+        DailyWorkSummary.last_lunch_end,
+        DailyWorkSummary.last_departure,
+        DailyWorkSummary.worked_seconds,
+        DailyWorkSummary.lunch_seconds,
+        DailyWorkSummary.night_seconds
+    ).filter(DailyWorkSummary.employee_id == current_user.id)
+    if cursor_date is not None:
+        query = query.filter(DailyWorkSummary.work_date < cursor_date)
+    rows = query.order_by(DailyWorkSummary.work_date.desc()).limit(page_size + 1).all()
+
+    has_more = len(rows) > page_size
+    rows = rows[:page_size]
+    return jsonify({
+        "days": [serialize_history_day(row) for row in rows],
+        "next_cursor": encode_cursor(rows[-1].work_date) if has_more else None
+    })
 
+def compute_month_totals(employee_id, first_day, last_day):
+    totals = db.session.query(
+        func.coalesce(func.sum(DailyWorkSummary.worked_seconds), 0.0),
+        func.coalesce(func.sum(DailyWorkSummary.night_seconds), 0.0),
+        func.coalesce(func.sum(DailyWorkSummary.lunch_seconds), 0.0),
+        func.coalesce(func.sum(case((DailyWorkSummary.worked_seconds > 0, 1), else_=0)), 0) # No FILTER (WHERE ...) on MySQL
+    ).filter(
+        DailyWorkSummary.employee_id == employee_id,
+        DailyWorkSummary.work_date >= first_day,
+        DailyWorkSummary.work_date <= last_day
+    ).one()
+    return {
+        "worked_seconds": totals[0],
+        "night_seconds": totals[1],
+        "lunch_seconds": totals[2],
+        "days_worked": int(totals[3]), # MySQL sums integers as DECIMAL
+    }
 
+@record_bp.route("/history/month", methods=["GET"])
+@token_required(trust_claims=True)
+def get_month_totals(current_user):
+    """Running totals of the employee's month (worked, night shift and lunch seconds, days worked).
+    Query Parameters:
+        month (str, optional, YYYY-MM): Defaults to the current month.
+    Computed once per employee-month and cached until one of its days changes.
+    """
+    try:
+        month_start = datetime.strptime(request.args["month"], "%Y-%m").date() if request.args.get("month") else business_today().replace(day=1)
+    except ValueError:
+        return jsonify({"message": "Formato de mês inválido. Use YYYY-MM"}), 400
+    month_end = (month_start + timedelta(days=32)).replace(day=1) - timedelta(days=1)
+
+    cache_key = ("month_totals", current_user.id, month_start.isoformat())
+    fingerprint = data_versions.fingerprint(month_start, month_end, current_user.id)
+    totals = report_cache.get(cache_key, fingerprint)
+    if totals is None:
+        totals = compute_month_totals(current_user.id, month_start, month_end)
+        report_cache.put(cache_key, fingerprint, totals)
+    return jsonify({
+        "employee_id": current_user.id,
+        "month": month_start.strftime("%Y-%m"),
+        **totals
+    })
@@ -0,0 +1,138 @@
+from flask import Blueprint, request, jsonify
+from src.main import db # Import db from main app in src
+from src.models.site import Site
+from src.utils.site_index import site_index, resolve_site
+from src.utils.geo import parse_coordinates
+
+# Define the Blueprint
+sites_bp = Blueprint("sites", __name__)
+
+# TODO: Add authentication/authorization (e.g., only Admin can manage)
+
+def serialize_site(site):
+    return {
+        "id": site.id,
+        "name": site.name,
+        "address": site.address,
+        "latitude": site.latitude,
+        "longitude": site.longitude,
+        "radius_meters": site.radius_meters,
+        "active": site.active
+    }
+
+def parse_site_location(data, site=None):
+    """Returns (latitude, longitude, radius_meters) from the JSON body, falling back to the site's values."""
+    latitude, longitude = parse_coordinates(data.get("latitude"), data.get("longitude"))
+    if latitude is None:
+        latitude = site.latitude if site else None
+    if longitude is None:
+        longitude = site.longitude if site else None
+    radius_meters = float(data["radius_meters"]) if data.get("radius_meters") is not None else (site.radius_meters if site else 150.0)
+    if latitude is None or longitude is None:
+        raise ValueError("latitude e longitude são obrigatórias")
+    if radius_meters <= 0:
+        raise ValueError("radius_meters deve ser positivo")
+    return latitude, longitude, radius_meters
+
+@sites_bp.route("", methods=["POST"])
+def add_site():
+    """
+    Registers a work site and its geofence.
+    JSON Body:
+        name (str, required): Site name (e.g., Condominium Name).
+        latitude / longitude (float, required): Center of the geofence.
+        radius_meters (float, optional): Geofence radius (default 150).
+        address (str, optional): Street address.
+    """
+    data = request.get_json()
+    if not data or not data.get("name"):
+        return jsonify({"error": "O nome do local é obrigatório"}), 400
+    if Site.query.filter_by(name=data["name"]).first():
+        return jsonify({"error": "Local já cadastrado"}), 409
+    try:
+        latitude, longitude, radius_meters = parse_site_location(data)
+    except (TypeError, ValueError) as e:
+        return jsonify({"error": f"Localização inválida: {e}"}), 400
+
+    try:
+        new_site = Site(
+            name=data["name"],
+            address=data.get("address"),
+            latitude=latitude,
+            longitude=longitude,
+            radius_meters=radius_meters
+        )
+        db.session.add(new_site)
+        db.session.commit() # The site index is rebuilt on the next lookup
+        return jsonify({"message": "Local adicionado com sucesso", "site_id": new_site.id}), 201
+    except Exception as e:
+        db.session.rollback()
+        print(f"Error adding site: {e}")
+        return jsonify({"error": f"Erro ao adicionar local: {e}"}), 500
+
+@sites_bp.route("", methods=["GET"])
+def get_sites():
+    """Lists the sites. Query Parameters: include_inactive (str, optional): 'true' to include deactivated sites."""
+    try:
+        query = Site.query
+        if request.args.get("include_inactive", "").lower() != "true":
+            query = query.filter(Site.active.is_(True))
+        return jsonify([serialize_site(site) for site in query.order_by(Site.name).all()]), 200
+    except Exception as e:
+        print(f"Error fetching sites: {e}")
+        return jsonify({"error": f"Erro ao buscar locais: {e}"}), 500
+
+@sites_bp.route("/<int:site_id>", methods=["PUT"])
+def update_site(site_id):
+    """Updates a site. Existing punches keep the site_id they were tagged with."""
+    site = Site.query.get_or_404(site_id)
+    data = request.get_json()
+    if not data:
+        return jsonify({"error": "Dados não fornecidos"}), 400
+    try:
+        latitude, longitude, radius_meters = parse_site_location(data, site)
+    except (TypeError, ValueError) as e:
+        return jsonify({"error": f"Localização inválida: {e}"}), 400
+
+    try:
+        site.name = data.get("name", site.name)
+        site.address = data.get("address", site.address)
+        site.latitude = latitude
+        site.longitude = longitude
+        site.radius_meters = radius_meters
+        site.active = bool(data.get("active", site.active))
+        db.session.commit()
+        return jsonify({"message": "Local atualizado com sucesso"}), 200
+    except Exception as e:
+        db.session.rollback()
+        print(f"Error updating site: {e}")
+        return jsonify({"error": f"Erro ao atualizar local: {e}"}), 500
+
+@sites_bp.route("/<int:site_id>", methods=["DELETE"])
+def delete_site(site_id):
+    """Deactivates a site: it stops tagging new punches, but tagged punches still reference it."""
+    site = Site.query.get_or_404(site_id)
+    try:
+        site.active = False
+        db.session.commit()
+        return jsonify({"message": "Local desativado com sucesso"}), 200
+    except Exception as e:
+        db.session.rollback()
+        print(f"Error deactivating site: {e}")
+        return jsonify({"error": f"Erro ao desativar local: {e}"}), 500
+
+@sites_bp.route("/resolve", methods=["GET"])
+def resolve_location():
+    """Shows which site a location would be tagged with. Query Parameters: lat, lng (float, required)."""
+    if not request.args.get("lat") or not request.args.get("lng"):
+        return jsonify({"error": "Informe lat e lng"}), 400
+    try:
+        latitude, longitude = parse_coordinates(request.args["lat"], request.args["lng"])
+    except ValueError as e:
+        return jsonify({"error": f"Localização inválida: {e}"}), 400
+    site_id, outside_geofence = resolve_site(db.session, latitude, longitude)
+    return jsonify({
+        "site_id": site_id,
+        "site_name": site_index.site_name(db.session, site_id) if site_id is not None else None,
+        "outside_geofence": outside_geofence
+    }), 200
@@ -6,6 +6,11 @@ from src.models.supervisor_checkin import SupervisorCheckin
 from src.models.supervisor_questionnaire import SupervisorQuestionnaireResponse
 from src.models.supervisor_correction_request import SupervisorCorrectionRequest
 from src.models.time_record import TimeRecord # Needed for correction requests
+from src.utils.site_index import resolve_site, site_index
+from src.utils.geo import parse_coordinates
+from src.utils.questionnaire_search import search_questionnaire_responses
+from src.utils.business_time import local_day_bounds
+from src.utils.pagination import parse_page_size
 from datetime import datetime
 import os # For potential file handling
 
@@ -17,6 +22,22 @@ supervisor_bp = Blueprint("supervisor", __name__)
 
 # --- Supervisor Check-in --- #
 
+def build_checkin(supervisor_id, photo_url, latitude, longitude, location_name, timestamp):
+    """New SupervisorCheckin tagged with the nearest site (in-memory grid lookup); not added to the session."""
+    site_id, outside_geofence = resolve_site(db.session, latitude, longitude)
+    if site_id is not None and not location_name:
+        location_name = site_index.site_name(db.session, site_id)
+    return SupervisorCheckin(
+        supervisor_id=supervisor_id,
+        photo_url=photo_url,
+        latitude=latitude,
+        longitude=longitude,
+        site_id=site_id,
+        outside_geofence=outside_geofence,
+        location_name=location_name,
+        timestamp=timestamp # Record time on server
+    )
+
 @supervisor_bp.route("/checkin", methods=["POST"])
 def supervisor_checkin():
     """
@@ -28,6 +49,9 @@ def supervisor_checkin():
         latitude (float, optional): Latitude of check-in location.
         longitude (float, optional): Longitude of check-in location.
         location_name (str, optional): Name of the location (e.g., Condominium Name).
+            Defaults to the name of the site resolved from the coordinates.
+    The check-in is tagged with the nearest registered site (site_id) and flagged with
+    outside_geofence when the location isn't inside any site's geofence.
     """
     data = request.get_json()
 
@@ -36,8 +60,10 @@ def supervisor_checkin():
 
     supervisor_id = data["supervisor_id"]
     photo_url = data["photo_url"]
-    latitude = data.get("latitude")
-    longitude = data.get("longitude")
+    try:
+        latitude, longitude = parse_coordinates(data.get("latitude"), data.get("longitude"))
+    except ValueError as e:
+        return jsonify({"error": f"Localização inválida: {e}"}), 400
     location_name = data.get("location_name")
 
     # Verify supervisor exists and IS a supervisor
@@ -49,17 +75,15 @@ def supervisor_checkin():
     #     return jsonify({"error": "Funcionário não é um supervisor"}), 403
 
     try:
-        new_checkin = SupervisorCheckin(
-            supervisor_id=supervisor_id,
-            photo_url=photo_url,
-            latitude=latitude,
-            longitude=longitude,
-            location_name=location_name,
-            timestamp=datetime.utcnow() # Record time on server
-        )
+        new_checkin = build_checkin(supervisor_id, photo_url, latitude, longitude, location_name, datetime.utcnow())
         db.session.add(new_checkin)
         db.session.commit()
-        return jsonify({"message": "Check-in do supervisor registrado com sucesso", "checkin_id": new_checkin.id}), 201
+        return jsonify({
+            "message": "Check-in do supervisor registrado com sucesso",
+            "checkin_id": new_checkin.id,
+            "site_id": new_checkin.site_id,
+            "outside_geofence": new_checkin.outside_geofence
+        }), 201
 
     except Exception as e:
         db.session.rollback()
@@ -121,6 +145,67 @@ def submit_questionnaire():
         print(f"Error submitting questionnaire: {e}")
         return jsonify({"error": f"Erro ao registrar resposta do questionário: {e}"}), 500
 
+QUESTIONNAIRE_SEARCH_PAGE_SIZE = 20
+QUESTIONNAIRE_SEARCH_MAX_PAGE_SIZE = 100
+
+@supervisor_bp.route("/questionnaire/search", methods=["GET"])
+def search_questionnaires():
+    """
+    Full-text search over questionnaire answers (strengths, improvements, wellbeing, observations).
+    Matching ignores case and accents; results come best match first.
+    Query Parameters:
+        q (str, required): Words to find (all must match); "quoted text" for a phrase, word* for a prefix.
+        supervisor_id (int, optional): Only this supervisor's responses.
+        start_date (str, optional): First day (YYYY-MM-DD, business timezone).
+        end_date (str, optional): Last day (YYYY-MM-DD, business timezone).
+        limit (int, optional): Page size (default 20, max 100).
+        offset (int, optional): Results to skip.
+    """
+    query = request.args.get("q", "").strip()
+    if not query:
+        return jsonify({"error": "Parâmetro q é obrigatório"}), 400
+
+    try:
+        supervisor_id = int(request.args["supervisor_id"]) if request.args.get("supervisor_id") else None
+        limit = parse_page_size(request.args.get("limit"), QUESTIONNAIRE_SEARCH_PAGE_SIZE, QUESTIONNAIRE_SEARCH_MAX_PAGE_SIZE)
+        offset = int(request.args.get("offset") or 0)
+        if offset < 0:
+            raise ValueError("offset must not be negative")
+    except ValueError:
+        return jsonify({"error": "Parâmetros inválidos (supervisor_id/limit/offset)"}), 400
+
+    try:
+        start = end = None
+        if request.args.get("start_date"):
+            start = local_day_bounds(datetime.strptime(request.args["start_date"], "%Y-%m-%d").date())[0]
+        if request.args.get("end_date"):
+            end = local_day_bounds(datetime.strptime(request.args["end_date"], "%Y-%m-%d").date())[1]
+    except ValueError:
+        return jsonify({"error": "Formato de data inválido. Use YYYY-MM-DD"}), 400
+
+    try:
+        results = search_questionnaire_responses(
+            db.session, query, supervisor_id=supervisor_id, start=start, end=end, limit=limit, offset=offset
+        )
+        return jsonify({
+            "results": [{
+                "id": response.id,
+                "supervisor_id": response.supervisor_id,
+                "checkin_id": response.checkin_id,
+                "timestamp": response.timestamp.isoformat(),
+                "strengths_text": response.strengths_text,
+                "strengths_photo_url": response.strengths_photo_url,
+                "improvements_text": response.improvements_text,
+                "employee_wellbeing_text": response.employee_wellbeing_text,
+                "observations_text": response.observations_text,
+                "score": score
+            } for response, score in results],
+            "next_offset": offset + limit if len(results) == limit else None
+        }), 200
+    except Exception as e:
+        print(f"Error searching questionnaires: {e}")
+        return jsonify({"error": f"Erro ao buscar questionários: {e}"}), 500
+
 # --- Supervisor Correction Requests --- #
 
 @supervisor_bp.route("/correction-requests", methods=["POST"])
@@ -184,6 +269,141 @@ def submit_correction_request():
         print(f"Error submitting correction request: {e}")
         return jsonify({"error": f"Erro ao enviar solicitação de correção: {e}"}), 500
 
+# --- Supervisor Visit Bundles --- #
+
+QUESTIONNAIRE_FIELDS = ("strengths_text", "strengths_photo_url", "improvements_text", "employee_wellbeing_text", "observations_text")
+CORRECTION_REQUIRED_FIELDS = ("employee_id", "requested_change_type", "requested_value", "reason")
+# Correction requests accepted in one visit bundle
+VISIT_MAX_CORRECTION_REQUESTS = int(os.getenv("VISIT_MAX_CORRECTION_REQUESTS", "100"))
+
+def _is_id(value):
+    return isinstance(value, int) and not isinstance(value, bool)
+
+@supervisor_bp.route("/visits", methods=["POST"])
+def submit_visit():
+    """
+    Submits a whole supervisor visit in one round trip: the check-in, the questionnaire and
+    any number of correction requests, stored in a single transaction and linked to the check-in.
+    JSON Body:
+        supervisor_id (int, required): ID of the supervising employee.
+        checkin (dict, required): photo_url (required), latitude, longitude, location_name (as in /checkin).
+        questionnaire (dict, optional): strengths_text, strengths_photo_url, improvements_text,
+            employee_wellbeing_text, observations_text (as in /questionnaire).
+        correction_requests (list, optional): Items with employee_id, time_record_id (optional),
+            requested_change_type, original_value (optional), requested_value and reason.
+    Every referenced employee and time record is validated up front; if anything is invalid
+    nothing is stored and the problems are returned per field ("correction_requests[1].employee_id").
+    """
+    data = request.get_json(silent=True)
+    if not isinstance(data, dict):
+        return jsonify({"error": "Corpo JSON inválido"}), 400
+
+    errors = {}
+    supervisor_id = data.get("supervisor_id")
+    if not _is_id(supervisor_id):
+        errors["supervisor_id"] = "supervisor_id é obrigatório"
+    checkin_data = data.get("checkin")
+    if not isinstance(checkin_data, dict) or not checkin_data.get("photo_url"):
+        errors["checkin"] = "checkin.photo_url é obrigatório"
+    else:
+        try:
+            checkin_latitude, checkin_longitude = parse_coordinates(checkin_data.get("latitude"), checkin_data.get("longitude"))
+        except ValueError as e:
+            errors["checkin.location"] = f"Localização inválida: {e}"
+    questionnaire_data = data.get("questionnaire")
+    if questionnaire_data is not None and not isinstance(questionnaire_data, dict):
+        errors["questionnaire"] = "questionnaire deve ser um objeto"
+    correction_items = data.get("correction_requests") or []
+    if not isinstance(correction_items, list):
+        errors["correction_requests"] = "correction_requests deve ser uma lista"
+        correction_items = []
+    elif len(correction_items) > VISIT_MAX_CORRECTION_REQUESTS:
+        return jsonify({"error": f"Máximo de {VISIT_MAX_CORRECTION_REQUESTS} solicitações de correção por visita"}), 400
+
+    for index, item in enumerate(correction_items):
+        field = f"correction_requests[{index}]"
+        if not isinstance(item, dict) or not all(item.get(name) not in (None, "") for name in CORRECTION_REQUIRED_FIELDS):
+            errors[field] = f"Campos obrigatórios ausentes: {', '.join(CORRECTION_REQUIRED_FIELDS)}"
+        elif not _is_id(item["employee_id"]):
+            errors[f"{field}.employee_id"] = "employee_id inválido"
+        elif item.get("time_record_id") is not None and not _is_id(item["time_record_id"]):
+            errors[f"{field}.time_record_id"] = "time_record_id inválido"
+    if errors:
+        return jsonify({"error": "Visita inválida", "errors": errors}), 400
+
+    try:
+        # One IN (...) lookup per referenced table instead of a query per id
+        employee_ids = {supervisor_id} | {item["employee_id"] for item in correction_items}
+        known_employees = {row.id for row in db.session.query(Employee.id).filter(Employee.id.in_(employee_ids))}
+        record_ids = {item["time_record_id"] for item in correction_items if item.get("time_record_id") is not None}
+        record_owners = dict(db.session.query(TimeRecord.id, TimeRecord.employee_id).filter(
+            TimeRecord.id.in_(record_ids)
+        ).all()) if record_ids else {}
+    except Exception as e:
+        print(f"Error validating supervisor visit: {e}")
+        return jsonify({"error": f"Erro ao registrar visita: {e}"}), 500
+
+    if supervisor_id not in known_employees:
+        return jsonify({"error": "Supervisor não encontrado"}), 404
+    for index, item in enumerate(correction_items):
+        field = f"correction_requests[{index}]"
+        record_id = item.get("time_record_id")
+        if item["employee_id"] not in known_employees:
+            errors[f"{field}.employee_id"] = "Funcionário alvo não encontrado"
+        elif record_id is not None and record_id not in record_owners:
+            errors[f"{field}.time_record_id"] = "Registro de ponto ID inválido"
+        elif record_id is not None and record_owners[record_id] != item["employee_id"]:
+            errors[f"{field}.time_record_id"] = "Registro de ponto pertence a outro funcionário"
+    if errors:
+        return jsonify({"error": "Visita inválida", "errors": errors}), 400
+
+    try:
+        now = datetime.utcnow()
+        new_checkin = build_checkin(
+            supervisor_id, checkin_data["photo_url"], checkin_latitude, checkin_longitude,
+            checkin_data.get("location_name"), now
+        )
+        db.session.add(new_checkin)
+        new_response = None
+        if questionnaire_data is not None:
+            new_response = SupervisorQuestionnaireResponse(
+                supervisor_id=supervisor_id,
+                checkin=new_checkin,
+                timestamp=now,
+                **{name: questionnaire_data.get(name) for name in QUESTIONNAIRE_FIELDS}
+            )
+            db.session.add(new_response)
+        new_requests = [
+            SupervisorCorrectionRequest(
+                supervisor_id=supervisor_id,
+                employee_id=item["employee_id"],
+                time_record_id=item.get("time_record_id"),
+                checkin=new_checkin,
+                requested_change_type=item["requested_change_type"],
+                original_value=item.get("original_value"),
+                requested_value=item["requested_value"],
+                reason=item["reason"],
+                request_timestamp=now,
+                status="pending" # Default status
+            )
+            for item in correction_items
+        ]
+        db.session.add_all(new_requests)
+        db.session.commit()
+        return jsonify({
+            "message": "Visita do supervisor registrada com sucesso",
+            "checkin_id": new_checkin.id,
+            "site_id": new_checkin.site_id,
+            "outside_geofence": new_checkin.outside_geofence,
+            "response_id": new_response.id if new_response else None,
+            "request_ids": [new_request.id for new_request in new_requests]
+        }), 201
+
+    except Exception as e:
+        db.session.rollback()
+        print(f"Error recording supervisor visit: {e}")
+        return jsonify({"error": f"Erro ao registrar visita: {e}"}), 500
+
 # TODO: Add GET routes for supervisors to view their own requests/responses?
-# TODO: Add routes for Admins to view/approve/reject correction requests.
+# Admins review correction requests through /admin/correction-requests (routes/corrections.py)
 
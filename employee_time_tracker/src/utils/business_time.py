@@ -0,0 +1,30 @@
+import os
+from datetime import datetime, timedelta, time, timezone
+from zoneinfo import ZoneInfo
+
+# Timestamps are stored as naive UTC; calendar days (work_date, reports, "today") are
+# those of the business timezone
+BUSINESS_TIMEZONE = ZoneInfo(os.getenv("BUSINESS_TIMEZONE", "America/Sao_Paulo"))
+
+def to_local(timestamp):
+    """Converts a naive UTC datetime to naive business-timezone time."""
+    return timestamp.replace(tzinfo=timezone.utc).astimezone(BUSINESS_TIMEZONE).replace(tzinfo=None)
+
+def to_utc(local_timestamp):
+    """Converts a naive business-timezone datetime to naive UTC."""
+    return local_timestamp.replace(tzinfo=BUSINESS_TIMEZONE).astimezone(timezone.utc).replace(tzinfo=None)
+
+def local_date(timestamp):
+    """Business-timezone calendar day of a naive UTC datetime."""
+    return to_local(timestamp).date()
+
+def business_today(now=None):
+    return local_date(now or datetime.utcnow())
+
+def local_day_bounds(start_date, end_date=None):
+    """Naive UTC [start, end) covering the business-timezone days start_date..end_date."""
+    end_date = end_date or start_date
+    return (
+        to_utc(datetime.combine(start_date, time.min)),
+        to_utc(datetime.combine(end_date + timedelta(days=1), time.min))
+    )
@@ -0,0 +1,249 @@
+from collections import defaultdict
+from datetime import datetime, timedelta, timezone
+from sqlalchemy import select
+
+from src.models.time_record import TimeRecord, shift_work_date
+from src.models.supervisor_correction_request import SupervisorCorrectionRequest
+from src.utils.business_time import to_local, to_utc, local_day_bounds
+from src.utils.punches import transition_allowed, rejection_message, OPEN_SHIFT_TIMEOUT
+
+# Review states of a correction request
+STATUS_PENDING = "pending"
+STATUS_APPROVED = "approved"
+STATUS_REJECTED = "rejected"
+
+# requested_change_type -> punch type it corrects (other types, e.g. absence_justification,
+# are approved without touching punches)
+CORRECTION_RECORD_TYPES = {
+    "arrival_time": "arrival",
+    "arrival": "arrival",
+    "lunch_start_time": "lunch_start",
+    "lunch_start": "lunch_start",
+    "lunch_end_time": "lunch_end",
+    "lunch_end": "lunch_end",
+    "departure_time": "departure",
+    "departure": "departure",
+}
+
+class CorrectionError(ValueError):
+    """A review that can't be applied; `errors` maps request id -> reason (Portuguese)."""
+
+    def __init__(self, errors):
+        super().__init__("; ".join(f"{request_id}: {reason}" for request_id, reason in errors.items()))
+        self.errors = errors
+
+def corrected_timestamp(requested_value, record=None):
+    """
+    Parses the requested punch time into naive UTC.
+
+    Accepts a business-timezone "YYYY-MM-DD HH:MM" (or ISO 8601, with or without offset),
+    or just "HH:MM" when correcting an existing punch, which keeps that punch's local day.
+
+    Raises:
+        ValueError: If the value can't be parsed (or has no day and there's no punch).
+    """
+    value = requested_value.strip()
+    try:
+        clock = datetime.strptime(value, "%H:%M").time()
+    except ValueError:
+        clock = None
+    if clock is not None:
+        if record is None:
+            raise ValueError("Informe data e hora (YYYY-MM-DD HH:MM) para criar o registro")
+        return to_utc(datetime.combine(to_local(record.timestamp).date(), clock))
+
+    try:
+        parsed = datetime.fromisoformat(value)
+    except ValueError:
+        raise ValueError(f"Horário inválido '{requested_value}'. Use YYYY-MM-DD HH:MM ou HH:MM")
+    if parsed.tzinfo is not None:
+        return parsed.astimezone(timezone.utc).replace(tzinfo=None)
+    return to_utc(parsed)
+
+def _week_start(day):
+    return day - timedelta(days=day.weekday())
+
+def _punch_before(session, employee_id, timestamp):
+    """The employee's last (record_type, timestamp, work_date) row before `timestamp`, or None."""
+    return session.execute(
+        select(TimeRecord.record_type, TimeRecord.timestamp, TimeRecord.work_date).where(
+            TimeRecord.employee_id == employee_id,
+            TimeRecord.timestamp < timestamp
+        ).order_by(TimeRecord.timestamp.desc(), TimeRecord.id.desc()).limit(1)
+    ).first()
+
+def reattribute_shift(session, employee_id, since, until):
+    """
+    Re-derives work_date for the employee's punches from `since` up to the first check-in after `until`.
+
+    A moved or created punch can open, close or split a shift, which changes the day of the
+    punches that follow it (see shift_work_date); punches after the next check-in keep theirs.
+    Returns the (employee_id, work_date) pairs, old and new, of every punch it moved.
+    """
+    next_arrival = session.execute(
+        select(TimeRecord.timestamp).where(
+            TimeRecord.employee_id == employee_id,
+            TimeRecord.record_type == "arrival",
+            TimeRecord.timestamp > until
+        ).order_by(TimeRecord.timestamp, TimeRecord.id).limit(1)
+    ).scalar()
+    query = session.query(TimeRecord).filter(TimeRecord.employee_id == employee_id, TimeRecord.timestamp >= since)
+    if next_arrival is not None:
+        query = query.filter(TimeRecord.timestamp <= next_arrival)
+
+    touched = set()
+    previous = _punch_before(session, employee_id, since)
+    last_type, last_work_date = (previous.record_type, previous.work_date) if previous else (None, None)
+    for record in query.order_by(TimeRecord.timestamp, TimeRecord.id):
+        work_date = shift_work_date(record.record_type, record.timestamp, last_type, last_work_date)
+        if work_date != record.work_date:
+            touched.add((employee_id, record.work_date))
+            touched.add((employee_id, work_date))
+            record.work_date = work_date
+        last_type, last_work_date = record.record_type, work_date
+    session.flush()
+    return touched
+
+def check_punch_sequence(session, employee_id, start, end):
+    """
+    Checks that every punch of the employee in [start, end) may follow the one before it.
+
+    Returns:
+        str: Why the first invalid punch isn't allowed (Portuguese), or None if the sequence is valid.
+    """
+    previous = _punch_before(session, employee_id, start)
+    last_type, last_timestamp = (previous.record_type, previous.timestamp) if previous else (None, None)
+    records = session.execute(
+        select(TimeRecord.record_type, TimeRecord.timestamp).where(
+            TimeRecord.employee_id == employee_id,
+            TimeRecord.timestamp >= start,
+            TimeRecord.timestamp < end
+        ).order_by(TimeRecord.timestamp, TimeRecord.id)
+    )
+    for record in records:
+        if not transition_allowed(record.record_type, record.timestamp, last_type, last_timestamp):
+            return (f"Sequência de pontos inválida em {to_local(record.timestamp):%Y-%m-%d %H:%M}: "
+                    f"{rejection_message(record.record_type, last_type)}")
+        last_type, last_timestamp = record.record_type, record.timestamp
+    return None
+
+def apply_correction(session, correction):
+    """
+    Applies an approved correction to its TimeRecord, or creates the missing punch.
+
+    The punches following it up to the next check-in are re-attributed to their (new) shift
+    day. Flushes, so later corrections in the same review see this one (work_date attribution
+    looks at the previous punch). Returns the (employee_id, work_date) pairs it changed; the
+    resulting punch sequence is checked by review_corrections once every change is applied.
+
+    Raises:
+        ValueError: If the correction can't be applied.
+    """
+    record_type = CORRECTION_RECORD_TYPES.get(correction.requested_change_type)
+    if record_type is None:
+        return set() # Justifications only change the request's status
+
+    record = None
+    if correction.time_record_id is not None:
+        record = session.get(TimeRecord, correction.time_record_id)
+        if record is None:
+            raise ValueError("Registro de ponto não encontrado")
+        if record.employee_id != correction.employee_id:
+            raise ValueError("Registro de ponto pertence a outro funcionário")
+    timestamp = corrected_timestamp(correction.requested_value, record)
+
+    touched = set()
+    if record is None:
+        since = until = timestamp
+        record = TimeRecord(employee_id=correction.employee_id, record_type=record_type, timestamp=timestamp)
+        session.add(record)
+        correction.time_record = record
+    else:
+        touched.add((record.employee_id, record.work_date))
+        since, until = min(record.timestamp, timestamp), max(record.timestamp, timestamp)
+        record.timestamp = timestamp
+        record.record_type = record_type
+    session.flush() # Assigns the (new) work_date
+    touched.add((record.employee_id, record.work_date))
+    touched |= reattribute_shift(session, record.employee_id, since, until)
+    return touched
+
+def review_corrections(session, approve_ids=(), reject_ids=(), admin_id=None, admin_notes=None, now=None):
+    """
+    Approves and rejects correction requests in one transaction and commits.
+
+    Every approved change is applied to its TimeRecord (or creates the missing punch); if
+    any request isn't pending, any change can't be applied or the employee's punches end up
+    out of sequence (e.g. a check-in after the check-out), nothing is written. The
+    DailyWorkSummary refresh and report cache invalidation then only touch the days changed.
+
+    Args:
+        session: SQLAlchemy session (db.session).
+        approve_ids, reject_ids (iterable[int]): Requests to approve / reject.
+        admin_id (int, optional): Reviewing admin.
+        admin_notes (str, optional): Notes stored on every reviewed request.
+
+    Returns:
+        list[tuple]: Sorted (employee_id, week_start) pairs whose figures changed.
+
+    Raises:
+        CorrectionError: Nothing was applied; `errors` says why, per request.
+    """
+    approve_ids, reject_ids = set(approve_ids), set(reject_ids)
+    now = now or datetime.utcnow()
+    errors = {request_id: "Solicitação aprovada e rejeitada ao mesmo tempo" for request_id in approve_ids & reject_ids}
+
+    requests = {
+        correction.id: correction for correction in session.query(SupervisorCorrectionRequest).filter(
+            SupervisorCorrectionRequest.id.in_(approve_ids | reject_ids)
+        ).with_for_update() # Concurrent reviews of the same requests wait here
+    }
+    for request_id in sorted(approve_ids | reject_ids):
+        correction = requests.get(request_id)
+        if correction is None:
+            errors[request_id] = "Solicitação não encontrada"
+        elif correction.status != STATUS_PENDING:
+            errors[request_id] = f"Solicitação já revisada ({correction.status})"
+    if errors:
+        session.rollback()
+        raise CorrectionError(errors)
+
+    touched = set()
+    try:
+        # Oldest requests first, so a later correction of the same punch wins
+        for correction in sorted(requests.values(), key=lambda correction: (correction.request_timestamp, correction.id)):
+            if correction.id in approve_ids:
+                try:
+                    touched |= apply_correction(session, correction)
+                except ValueError as e:
+                    errors[correction.id] = str(e)
+                    continue
+                correction.status = STATUS_APPROVED
+            else:
+                correction.status = STATUS_REJECTED
+            correction.reviewed_at = now
+            correction.reviewed_by_admin_id = admin_id
+            if admin_notes is not None:
+                correction.admin_notes = admin_notes
+        if not errors:
+            # Checked once every change is applied: corrections of the same shift may only be valid together
+            days_by_employee = defaultdict(list)
+            for employee_id, work_date in touched:
+                if work_date is not None:
+                    days_by_employee[employee_id].append(work_date)
+            for employee_id, days in days_by_employee.items():
+                start, end = local_day_bounds(min(days), max(days))
+                reason = check_punch_sequence(session, employee_id, start, end + OPEN_SHIFT_TIMEOUT)
+                if reason is not None:
+                    for correction in requests.values():
+                        if (correction.id in approve_ids and correction.employee_id == employee_id
+                                and correction.requested_change_type in CORRECTION_RECORD_TYPES):
+                            errors[correction.id] = reason
+        if errors:
+            raise CorrectionError(errors)
+        session.commit()
+    except Exception:
+        session.rollback()
+        raise
+
+    return sorted({(employee_id, _week_start(work_date)) for employee_id, work_date in touched if work_date is not None})
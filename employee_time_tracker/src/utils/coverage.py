@@ -0,0 +1,129 @@
+from heapq import heappush, heappop
+
+from src.utils.business_time import local_date
+
+OPENING_TYPES = ("arrival", "lunch_end")
+CLOSING_TYPES = ("lunch_start", "departure")
+
+def punch_intervals(punches, open_shift_timeout, period_end):
+    """
+    Turns punches into clocked-in intervals (arrival/lunch_end up to lunch_start/departure).
+
+    An interval belongs to the site of its opening punch (or of its closing punch if the
+    opening one has none); intervals at no site are dropped. One still open at the end of the
+    data is closed after `open_shift_timeout`, but not past `period_end`.
+
+    Args:
+        punches (iterable): (employee_id, timestamp, record_type, site_id) rows, ordered by
+                            employee_id, timestamp.
+        open_shift_timeout (timedelta): Longest an unclosed interval is assumed to last.
+        period_end (datetime): End of the reported period (naive UTC).
+
+    Returns:
+        list[tuple]: (site_id, start, end, employee_id) intervals sorted by (site_id, start),
+                     ready for match_visits.
+    """
+    intervals = []
+    append = intervals.append
+    last_employee_id = None
+    open_start = open_site_id = None # Start and site of the employee's open interval
+
+    for employee_id, timestamp, record_type, site_id in punches:
+        if employee_id != last_employee_id:
+            if open_start is not None and open_site_id is not None:
+                append((open_site_id, open_start, min(open_start + open_shift_timeout, period_end), last_employee_id))
+            open_start = None
+            last_employee_id = employee_id
+        if record_type in OPENING_TYPES:
+            if open_start is not None and open_site_id is not None: # Never closed: cap it like an open shift
+                append((open_site_id, open_start, min(open_start + open_shift_timeout, timestamp), employee_id))
+            open_start, open_site_id = timestamp, site_id
+        elif record_type in CLOSING_TYPES and open_start is not None:
+            interval_site_id = open_site_id if open_site_id is not None else site_id
+            if interval_site_id is not None and timestamp > open_start:
+                append((interval_site_id, open_start, min(timestamp, open_start + open_shift_timeout), employee_id))
+            open_start = None
+    if open_start is not None and open_site_id is not None:
+        append((open_site_id, open_start, min(open_start + open_shift_timeout, period_end), last_employee_id))
+
+    intervals.sort()
+    return intervals
+
+def match_visits(visits, intervals):
+    """
+    Counts the staff clocked in at each visit's site at the time of the visit.
+
+    A sort-merge join: both inputs are sorted by (site_id, time) and walked once,
+    keeping a heap with the end times of the intervals that have already started at the
+    current site. The cost is O((visits + intervals) log intervals), with no per-visit scan.
+
+    Args:
+        visits (iterable): Rows with site_id and timestamp (e.g. SupervisorCheckin), ordered by
+                           site_id, timestamp; none without a site.
+        intervals (list[tuple]): (site_id, start, end, ...) sorted by (site_id, start) (see punch_intervals).
+
+    Yields:
+        tuple: (visit, staff_on_duty)
+    """
+    position = 0
+    interval_count = len(intervals)
+    current_site_id = None
+    active_ends = []
+    for visit in visits:
+        if visit.site_id != current_site_id:
+            current_site_id, active_ends = visit.site_id, []
+            while position < interval_count and intervals[position][0] < current_site_id:
+                position += 1
+        while (position < interval_count and intervals[position][0] == current_site_id
+               and intervals[position][1] <= visit.timestamp):
+            heappush(active_ends, intervals[position][2])
+            position += 1
+        while active_ends and active_ends[0] <= visit.timestamp:
+            heappop(active_ends)
+        yield visit, len(active_ends)
+
+def summarize_coverage(matches):
+    """
+    Rolls matched visits up into coverage rates per (supervisor, site) and per site.
+
+    A visit is covered if at least one employee was clocked in at the site when it happened;
+    a day is covered if any of that day's visits (business-timezone days) was.
+
+    Args:
+        matches (iterable): (visit, staff_on_duty) pairs from match_visits; visits need
+                            supervisor_id, site_id and timestamp.
+
+    Returns:
+        tuple: (by_supervisor_site, by_site) lists of dicts, keyed by the ids.
+    """
+    def empty(**keys):
+        return {**keys, "visits": 0, "covered_visits": 0, "staff_on_duty_total": 0, "days": {}}
+
+    by_supervisor_site = {}
+    by_site = {}
+    for visit, staff_on_duty in matches:
+        day = local_date(visit.timestamp)
+        for summary in (
+            by_supervisor_site.setdefault((visit.supervisor_id, visit.site_id), empty(supervisor_id=visit.supervisor_id, site_id=visit.site_id)),
+            by_site.setdefault(visit.site_id, empty(site_id=visit.site_id))
+        ):
+            summary["visits"] += 1
+            summary["staff_on_duty_total"] += staff_on_duty
+            if staff_on_duty:
+                summary["covered_visits"] += 1
+            summary["days"][day] = summary["days"].get(day, False) or staff_on_duty > 0
+
+    def finish(summary):
+        days = summary.pop("days")
+        staff_on_duty_total = summary.pop("staff_on_duty_total")
+        summary["coverage_rate"] = round(summary["covered_visits"] / summary["visits"], 4)
+        summary["average_staff_on_duty"] = round(staff_on_duty_total / summary["visits"], 2)
+        summary["days_visited"] = len(days)
+        summary["days_covered"] = sum(1 for covered in days.values() if covered)
+        summary["uncovered_dates"] = sorted(day.isoformat() for day, covered in days.items() if not covered)
+        return summary
+
+    return (
+        [finish(by_supervisor_site[key]) for key in sorted(by_supervisor_site)],
+        [finish(by_site[key]) for key in sorted(by_site)]
+    )
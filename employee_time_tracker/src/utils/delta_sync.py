@@ -0,0 +1,42 @@
+from src.models.change_journal import read_changes, latest_settled_journal_id, JournalCursorExpired
+from src.utils.pagination import encode_cursor, decode_cursor
+
+# Journal entries read per delta response; clients call again while has_more is true
+DELTA_SYNC_MAX_CHANGES = 1000
+
+# Response header carrying the sync cursor of a full (non-delta) list response
+SYNC_CURSOR_HEADER = "X-Sync-Cursor"
+
+def full_load_cursor(session):
+    """Cursor to return with a full list; take it *before* reading the rows."""
+    return encode_cursor(latest_settled_journal_id(session))
+
+def build_delta(session, collection, since, load_rows, limit=DELTA_SYNC_MAX_CHANGES):
+    """
+    Builds a delta sync response for `collection` after the `since` cursor.
+
+    Args:
+        session: SQLAlchemy session (db.session).
+        collection (str): ChangeJournal collection name.
+        since (str): Cursor from a previous response (or the X-Sync-Cursor header).
+        load_rows (callable): Takes a list of row ids, returns the serialized current rows
+            (rows filtered out by the caller's query parameters may be omitted).
+
+    Returns:
+        dict: {"changes": [...], "deleted": [ids], "cursor": str, "has_more": bool}
+
+    Raises:
+        ValueError: If the cursor is malformed.
+        JournalCursorExpired: If the cursor predates the retained journal; the client must
+            reload the full list (and take the new X-Sync-Cursor).
+    """
+    (since_id,) = decode_cursor(since)
+    if not isinstance(since_id, int):
+        raise ValueError("Invalid cursor")
+    upserted, deleted, cursor_id, has_more = read_changes(session, collection, since_id, limit)
+    return {
+        "changes": load_rows(upserted) if upserted else [],
+        "deleted": deleted,
+        "cursor": encode_cursor(cursor_id),
+        "has_more": has_more
+    }
@@ -0,0 +1,144 @@
+import os
+import threading
+import uuid
+from collections import deque
+
+# How many recent events are kept for clients resuming with Last-Event-ID
+EVENT_BUS_BUFFER_SIZE = int(os.getenv("EVENT_BUS_BUFFER_SIZE", "2000"))
+
+class EventBus:
+    """
+    In-process publish/subscribe of committed changes, for the server-sent events feed.
+
+    Events get increasing sequence numbers and are kept in a ring buffer, so a client that
+    reconnects can resume after the last event it saw. Event ids are "<bus id>-<sequence>";
+    the bus id changes on every process start, which tells resuming clients when events
+    may have been missed (e.g. after a restart, or when connected to another worker).
+    """
+
+    def __init__(self, buffer_size=EVENT_BUS_BUFFER_SIZE):
+        self.bus_id = uuid.uuid4().hex[:8]
+        self._events = deque(maxlen=buffer_size) # (sequence, event_type, data)
+        self._sequence = 0
+        self._condition = threading.Condition()
+
+    def event_id(self, sequence):
+        return f"{self.bus_id}-{sequence}"
+
+    def parse_event_id(self, event_id):
+        """Returns the sequence number of one of this bus's event ids, or None."""
+        bus_id, _, sequence = (event_id or "").partition("-")
+        if bus_id != self.bus_id or not sequence.isdigit():
+            return None
+        return int(sequence)
+
+    @property
+    def last_sequence(self):
+        with self._condition:
+            return self._sequence
+
+    def publish(self, events):
+        """Appends [(event_type, data)] and wakes up waiting subscribers."""
+        with self._condition:
+            for event_type, data in events:
+                self._sequence += 1
+                self._events.append((self._sequence, event_type, data))
+            self._condition.notify_all()
+
+    def wait_for_events(self, after_sequence, timeout):
+        """
+        Returns (events after `after_sequence`, missed), waiting up to `timeout` seconds.
+
+        `missed` is True when some of those events already left the ring buffer.
+        """
+        with self._condition:
+            if self._sequence <= after_sequence:
+                self._condition.wait(timeout)
+            if not self._events or self._events[-1][0] <= after_sequence:
+                return [], False
+            missed = self._events[0][0] > after_sequence + 1
+            return [event for event in self._events if event[0] > after_sequence], missed
+
+event_bus = EventBus()
+
+# --- Publish committed inserts --- #
+from sqlalchemy import event
+from sqlalchemy.orm import Session, object_session
+from src.models.time_record import TimeRecord
+from src.models.supervisor_checkin import SupervisorCheckin
+from src.models.supervisor_correction_request import SupervisorCorrectionRequest
+
+# Key in session.info holding events to publish once the transaction commits
+BUS_EVENTS_KEY = "bus_events"
+
+def _iso(value):
+    return value.isoformat() if value else None
+
+def queue_event(session, event_type, data):
+    """Queues an event for publication when the session commits.
+
+    ORM inserts of the models below are queued automatically; call this after writing
+    them with Core statements.
+    """
+    session.info.setdefault(BUS_EVENTS_KEY, []).append((event_type, data))
+
+def time_record_event_data(record_id, employee_id, record_type, timestamp, latitude=None, longitude=None, photo_url=None,
+                           site_id=None, outside_geofence=None, work_date=None):
+    return {
+        "id": record_id,
+        "employee_id": employee_id,
+        "record_type": record_type,
+        "timestamp": _iso(timestamp),
+        "work_date": work_date.isoformat() if work_date else None, # Business day of the shift (filters use it)
+        "latitude": latitude,
+        "longitude": longitude,
+        "photo_url": photo_url,
+        "site_id": site_id,
+        "outside_geofence": outside_geofence,
+    }
+
+@event.listens_for(TimeRecord, "after_insert")
+def queue_time_record_created(mapper, connection, target):
+    queue_event(object_session(target), "time_record", time_record_event_data(
+        target.id, target.employee_id, target.record_type, target.timestamp,
+        target.latitude, target.longitude, target.photo_url, target.site_id, target.outside_geofence, target.work_date
+    ))
+
+@event.listens_for(SupervisorCheckin, "after_insert")
+def queue_supervisor_checkin_created(mapper, connection, target):
+    queue_event(object_session(target), "supervisor_checkin", {
+        "id": target.id,
+        "supervisor_id": target.supervisor_id,
+        "timestamp": _iso(target.timestamp),
+        "latitude": target.latitude,
+        "longitude": target.longitude,
+        "photo_url": target.photo_url,
+        "location_name": target.location_name,
+        "site_id": target.site_id,
+        "outside_geofence": target.outside_geofence,
+    })
+
+@event.listens_for(SupervisorCorrectionRequest, "after_insert")
+@event.listens_for(SupervisorCorrectionRequest, "after_update")
+def queue_correction_request_changed(mapper, connection, target):
+    queue_event(object_session(target), "correction_request", {
+        "id": target.id,
+        "supervisor_id": target.supervisor_id,
+        "employee_id": target.employee_id,
+        "time_record_id": target.time_record_id,
+        "request_timestamp": _iso(target.request_timestamp),
+        "requested_change_type": target.requested_change_type,
+        "requested_value": target.requested_value,
+        "status": target.status,
+        "reviewed_at": _iso(target.reviewed_at),
+    })
+
+@event.listens_for(Session, "after_commit")
+def publish_committed_events(session):
+    events = session.info.pop(BUS_EVENTS_KEY, None)
+    if events:
+        event_bus.publish(events)
+
+@event.listens_for(Session, "after_rollback")
+def discard_uncommitted_events(session):
+    session.info.pop(BUS_EVENTS_KEY, None)
@@ -0,0 +1,37 @@
+import math
+
+EARTH_RADIUS_METERS = 6371000.0
+METERS_PER_DEGREE_LATITUDE = 111320.0
+
+def distance_meters(lat1, lon1, lat2, lon2):
+    """Great-circle (haversine) distance between two coordinates, in meters."""
+    phi1, phi2 = math.radians(lat1), math.radians(lat2)
+    d_phi = phi2 - phi1
+    d_lambda = math.radians(lon2 - lon1)
+    a = math.sin(d_phi / 2) ** 2 + math.cos(phi1) * math.cos(phi2) * math.sin(d_lambda / 2) ** 2
+    return 2 * EARTH_RADIUS_METERS * math.asin(math.sqrt(a))
+
+def parse_coordinates(latitude, longitude):
+    """
+    Coerces request coordinates (numbers or numeric strings) to floats.
+
+    Either value may be None (no location). Raises ValueError for anything else that isn't
+    a finite number in range, so routes can answer 400 instead of failing in the site lookup.
+
+    Returns:
+        tuple: (latitude, longitude), floats or None.
+    """
+    def coerce(value, limit, name):
+        if value is None:
+            return None
+        if isinstance(value, bool) or not isinstance(value, (int, float, str)):
+            raise ValueError(f"{name} deve ser um número")
+        try:
+            number = float(value)
+        except ValueError:
+            raise ValueError(f"{name} deve ser um número")
+        if not -limit <= number <= limit: # Also rejects nan and inf
+            raise ValueError(f"{name} deve estar entre {-limit} e {limit}")
+        return number
+
+    return coerce(latitude, 90, "latitude"), coerce(longitude, 180, "longitude")
@@ -0,0 +1,159 @@
+import numpy as np
+from datetime import date, timedelta
+
+from src.utils.hours_calculator import (
+    WEEKLY_HOURS_TARGET,
+    NIGHT_SHIFT_START,
+    NIGHT_SHIFT_END,
+    SECONDS_PER_DAY,
+    _time_to_seconds,
+)
+
+# Integer codes used for the record_type column in the columnar arrays
+RECORD_TYPE_CODES = {
+    "arrival": 0,
+    "lunch_start": 1,
+    "lunch_end": 2,
+    "departure": 3,
+}
+UNKNOWN_RECORD_TYPE_CODE = -1
+# Same pairing rules as summarize_work_days: arrival/lunch_end open a pair, lunch_start/departure close it
+PAIR_START_CODES = (RECORD_TYPE_CODES["arrival"], RECORD_TYPE_CODES["lunch_end"])
+PAIR_END_CODES = (RECORD_TYPE_CODES["lunch_start"], RECORD_TYPE_CODES["departure"])
+
+EPOCH = date(1970, 1, 1)
+
+def encode_record_types(record_types):
+    """Maps record_type strings to the int8 codes expected by calculate_worked_hours_batch."""
+    return np.array(
+        [RECORD_TYPE_CODES.get(record_type, UNKNOWN_RECORD_TYPE_CODE) for record_type in record_types],
+        dtype=np.int8,
+    )
+
+def _cumulative_night_seconds(timestamps):
+    """Vectorized night shift seconds elapsed from the epoch up to each timestamp."""
+    night_start = _time_to_seconds(NIGHT_SHIFT_START)
+    night_end = _time_to_seconds(NIGHT_SHIFT_END)
+    days, seconds_of_day = np.divmod(timestamps, SECONDS_PER_DAY)
+
+    if night_start <= night_end: # Window doesn't cross midnight
+        seconds_per_night = night_end - night_start
+        partial = np.clip(np.minimum(seconds_of_day, night_end) - night_start, 0, None)
+    else: # Window crosses midnight
+        seconds_per_night = night_end + (SECONDS_PER_DAY - night_start)
+        partial = np.minimum(seconds_of_day, night_end) + np.clip(seconds_of_day - night_start, 0, None)
+
+    return days * seconds_per_night + partial
+
+def _week_monday(timestamps):
+    """Epoch day number of the Monday starting the ISO week of each timestamp."""
+    days = timestamps // SECONDS_PER_DAY
+    # 1970-01-01 was a Thursday (weekday 3)
+    return days - (days + 3) % 7
+
+def calculate_worked_hours_batch(employee_ids, timestamps, record_type_codes, work_days=None):
+    """
+    Calculates weekly worked hours, overtime, and night shift hours for many employees at once.
+
+    Produces the same figures as the per-employee report (summarize_work_days rolled up by
+    weekly_summaries_from_daily), but over columnar arrays so that a whole payroll period for
+    every employee is paired and aggregated in one vectorized pass. Punches are paired within
+    each (employee, work day) only, and days and weeks are those of the work day, so a night
+    shift counts once, on the day it started.
+
+    Args:
+        employee_ids (array-like): Employee id of each punch (int64).
+        timestamps (array-like): Punch time as seconds since the Unix epoch (int64), in
+                                 business-timezone wall clock time.
+        record_type_codes (array-like): Punch type codes, see RECORD_TYPE_CODES / encode_record_types.
+        work_days (array-like, optional): work_date of each punch as days since the Unix epoch
+                                          (int64). Defaults to the day of the timestamp.
+
+    Returns:
+        dict: Employee id -> list of weekly summaries ordered by week.
+              Example: {
+                  42: [{
+                      'week_key': 'YYYY-WW', # ISO year and week number
+                      'week_start': 'YYYY-MM-DD',
+                      'week_end': 'YYYY-MM-DD',
+                      'total_worked_seconds': float,
+                      'total_overtime_seconds': float,
+                      'total_night_shift_seconds': float,
+                      'days_worked': int
+                  }]
+              }
+    """
+    employee_ids = np.asarray(employee_ids, dtype=np.int64)
+    timestamps = np.asarray(timestamps, dtype=np.int64)
+    codes = np.asarray(record_type_codes, dtype=np.int8)
+    if work_days is None:
+        work_days = timestamps // SECONDS_PER_DAY
+    work_days = np.asarray(work_days, dtype=np.int64)
+    if employee_ids.size == 0:
+        return {}
+
+    # Every (employee, week) with at least one punch gets a row, even without complete pairs
+    week_employee, week_monday = np.unique(
+        np.stack([employee_ids, _week_monday(work_days * SECONDS_PER_DAY)]), axis=1
+    )
+    week_count = week_employee.size
+
+    # Unknown punch types never open or close a pair, so they are left out of the pairing
+    known = codes != UNKNOWN_RECORD_TYPE_CODE
+    employee_ids, timestamps, codes, work_days = employee_ids[known], timestamps[known], codes[known], work_days[known]
+    order = np.lexsort((timestamps, work_days, employee_ids))
+    employee_ids, timestamps, codes, work_days = employee_ids[order], timestamps[order], codes[order], work_days[order]
+
+    # The pairing state after a punch depends only on its own type (open after a start,
+    # closed after an end), so "was a pair open?" is just "was the previous punch a start?".
+    # A shift left open doesn't carry over into the next work day (nor to another employee).
+    is_start = np.isin(codes, PAIR_START_CODES)
+    is_end = np.isin(codes, PAIR_END_CODES)
+    same_work_day = np.concatenate(([False], (employee_ids[1:] == employee_ids[:-1]) & (work_days[1:] == work_days[:-1])))
+    was_open = np.concatenate(([False], is_start[:-1])) & same_work_day
+    opens_pair = is_start & ~was_open
+    closes_pair = is_end & was_open
+
+    # Each closing punch pairs with the most recent punch that opened a pair
+    positions = np.arange(codes.size)
+    last_open = np.maximum.accumulate(np.where(opens_pair, positions, -1))
+    end_idx = np.nonzero(closes_pair)[0]
+    start_idx = last_open[end_idx]
+
+    pair_start = timestamps[start_idx]
+    pair_end = timestamps[end_idx]
+    worked = pair_end - pair_start
+    positive = worked > 0
+    pair_employee = employee_ids[end_idx][positive]
+    pair_day = work_days[end_idx][positive]
+    pair_start, pair_end, worked = pair_start[positive], pair_end[positive], worked[positive]
+    night = _cumulative_night_seconds(pair_end) - _cumulative_night_seconds(pair_start)
+
+    # Pairs are attributed to the week of their work day
+    pair_week = np.searchsorted(
+        week_employee * (1 << 32) + week_monday,
+        pair_employee * (1 << 32) + _week_monday(pair_day * SECONDS_PER_DAY),
+    )
+    total_worked = np.bincount(pair_week, weights=worked, minlength=week_count)
+    total_night = np.bincount(pair_week, weights=night, minlength=week_count)
+    total_overtime = np.clip(total_worked - WEEKLY_HOURS_TARGET * 3600, 0, None)
+
+    _, first_pair_of_day = np.unique(
+        np.stack([pair_employee, pair_day]), axis=1, return_index=True
+    )
+    days_worked = np.bincount(pair_week[first_pair_of_day], minlength=week_count)
+
+    report = {}
+    for i in range(week_count):
+        start_of_week = EPOCH + timedelta(days=int(week_monday[i]))
+        iso_year, iso_week, _ = start_of_week.isocalendar()
+        report.setdefault(int(week_employee[i]), []).append({
+            'week_key': f"{iso_year}-{iso_week:02d}",
+            'week_start': start_of_week.strftime('%Y-%m-%d'),
+            'week_end': (start_of_week + timedelta(days=6)).strftime('%Y-%m-%d'),
+            'total_worked_seconds': float(total_worked[i]),
+            'total_overtime_seconds': float(total_overtime[i]),
+            'total_night_shift_seconds': float(total_night[i]),
+            'days_worked': int(days_worked[i]),
+        })
+    return report
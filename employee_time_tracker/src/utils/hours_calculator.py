@@ -1,6 +1,9 @@
 
 from datetime import datetime, timedelta, time
 from collections import defaultdict
+from bisect import bisect_left
+
+from src.utils.business_time import to_local, local_date
 
 # Constants (can be made configurable later)
 WEEKLY_HOURS_TARGET = 44
@@ -9,10 +12,60 @@ SATURDAY_HOURS_TARGET = 4
 NIGHT_SHIFT_START = time(22, 0, 0)
 NIGHT_SHIFT_END = time(5, 0, 0)
 
+SECONDS_PER_DAY = 24 * 3600
+
+def _time_to_seconds(t):
+    return t.hour * 3600 + t.minute * 60 + t.second
+
+def _night_seconds_before(seconds_of_day, night_start, night_end):
+    """Night shift seconds between midnight and `seconds_of_day` on a single day."""
+    if night_start <= night_end: # Window doesn't cross midnight
+        return max(0, min(seconds_of_day, night_end) - night_start)
+    # Window crosses midnight: [00:00, end) and [start, 24:00)
+    return min(seconds_of_day, night_end) + max(0, seconds_of_day - night_start)
+
+def _cumulative_night_seconds(moment, night_start, night_end):
+    """Night shift seconds elapsed from a fixed origin (date.min) up to `moment`."""
+    seconds_per_night = _night_seconds_before(SECONDS_PER_DAY, night_start, night_end)
+    seconds_of_day = moment.hour * 3600 + moment.minute * 60 + moment.second + moment.microsecond / 1e6
+    return moment.toordinal() * seconds_per_night + _night_seconds_before(seconds_of_day, night_start, night_end)
+
+def night_shift_overlap_seconds(start, end, night_start=NIGHT_SHIFT_START, night_end=NIGHT_SHIFT_END):
+    """
+    Returns how many seconds of the interval [start, end) fall inside the night shift window.
+
+    The overlap is the difference of a cumulative "night seconds since origin" function
+    evaluated at both ends, so the cost is constant regardless of the interval length
+    (windows crossing midnight and intervals spanning several days are handled).
+
+    Args:
+        start (datetime): Start of the worked interval.
+        end (datetime): End of the worked interval.
+        night_start (time): Start of the night shift window.
+        night_end (time): End of the night shift window.
+
+    Returns:
+        float: Night shift seconds inside the interval (0.0 if end <= start).
+    """
+    if end <= start:
+        return 0.0
+    night_start_s = _time_to_seconds(night_start)
+    night_end_s = _time_to_seconds(night_end)
+    return float(_cumulative_night_seconds(end, night_start_s, night_end_s)
+                 - _cumulative_night_seconds(start, night_start_s, night_end_s))
+
+def record_work_date(record):
+    """The record's work_date, or its business-timezone day for records stored without one."""
+    return getattr(record, "work_date", None) or local_date(record.timestamp)
+
 def calculate_worked_hours(records):
     """
     Calculates worked hours, overtime, and night shift hours from time records.
 
+    Days and weeks are business-timezone work days, and the night shift window applies to
+    local time. Durations are measured between the UTC timestamps, so a shift spanning a DST
+    change counts its real length (as summarize_work_days does).
+
     Args:
         records (list): A list of TimeRecord objects for a specific period, ordered by timestamp.
 
@@ -39,7 +92,7 @@ def calculate_worked_hours(records):
 
     for record in records:
         record_time = record.timestamp
-        record_date = record_time.date()
+        record_date = record_work_date(record)
         week_key = f"{record_date.year}-{record_date.isocalendar()[1]:02d}"
 
         # Set week start/end dates (simplistic, assumes records are sorted)
@@ -59,24 +112,10 @@ def calculate_worked_hours(records):
                 weekly_summary[week_key]['total_worked_seconds'] += worked_seconds
                 weekly_summary[week_key]['days_worked'].add(record_date)
 
-                # Calculate night shift hours within this interval
-                current_time = pair_start
-                while current_time < record_time:
-                    next_time = current_time + timedelta(minutes=1)
-                    # Check if the *middle* of the minute interval falls within night shift
-                    check_time = (current_time + timedelta(seconds=30)).time()
-                    is_night = False
-                    if NIGHT_SHIFT_START <= NIGHT_SHIFT_END: # Shift doesn't cross midnight
-                        if NIGHT_SHIFT_START <= check_time < NIGHT_SHIFT_END:
-                            is_night = True
-                    else: # Shift crosses midnight
-                        if check_time >= NIGHT_SHIFT_START or check_time < NIGHT_SHIFT_END:
-                            is_night = True
-
-                    if is_night:
-                        weekly_summary[week_key]['total_night_shift_seconds'] += min(60, (record_time - current_time).total_seconds())
-
-                    current_time = next_time
+                # Night shift seconds come from a closed-form interval overlap
+                weekly_summary[week_key]['total_night_shift_seconds'] += night_shift_overlap_seconds(
+                    to_local(pair_start), to_local(record_time)
+                )
 
             pair_start = None # Reset for the next pair
 
@@ -94,44 +133,157 @@ def calculate_worked_hours(records):
 
     return report_list
 
-def determine_absences(start_date, end_date, employees, records):
+def summarize_work_days(records, work_dates=None):
+    """
+    Builds per-day summaries (first arrival, lunch start/end, last departure, worked, night shift
+    and lunch seconds).
+
+    Punches are grouped by their work_date (the day their shift started), so a night shift
+    is summarized on a single day and pairs never span two days. Night shift seconds are
+    measured in business-timezone time; the returned datetimes stay naive UTC.
+
+    Args:
+        records (list): TimeRecord objects of a single employee, ordered by timestamp.
+        work_dates (set, optional): Only summarize these days. Defaults to every day with punches.
+
+    Returns:
+        dict: date -> {'first_arrival': datetime or None, 'first_lunch_start': datetime or None,
+                       'last_lunch_end': datetime or None, 'last_departure': datetime or None,
+                       'worked_seconds': float, 'night_seconds': float, 'lunch_seconds': float}
+              Days without any punch are left out.
+    """
+    summaries = {}
+    pair_start = None
+    lunch_start = None
+    current_date = None
+
+    for record in records:
+        record_time = record.timestamp
+        record_date = record_work_date(record)
+        if record_date != current_date:
+            # A shift left open doesn't carry over into the next work day
+            pair_start = None
+            lunch_start = None
+            current_date = record_date
+        wanted = work_dates is None or record_date in work_dates
+        summary = None
+        if wanted:
+            summary = summaries.setdefault(record_date, {
+                'first_arrival': None,
+                'first_lunch_start': None,
+                'last_lunch_end': None,
+                'last_departure': None,
+                'worked_seconds': 0.0,
+                'night_seconds': 0.0,
+                'lunch_seconds': 0.0
+            })
+
+        if record.record_type in ["arrival", "lunch_end"] and pair_start is None:
+            pair_start = record_time
+        elif record.record_type in ["departure", "lunch_start"] and pair_start is not None:
+            worked_seconds = (record_time - pair_start).total_seconds()
+            if summary is not None and worked_seconds > 0:
+                summary['worked_seconds'] += worked_seconds
+                summary['night_seconds'] += night_shift_overlap_seconds(to_local(pair_start), to_local(record_time))
+            pair_start = None
+
+        if record.record_type == "lunch_start":
+            lunch_start = record_time
+        elif record.record_type == "lunch_end" and lunch_start is not None:
+            if summary is not None and record_time > lunch_start:
+                summary['lunch_seconds'] += (record_time - lunch_start).total_seconds()
+            lunch_start = None
+
+        if summary is not None:
+            if record.record_type == "arrival" and summary['first_arrival'] is None:
+                summary['first_arrival'] = record_time
+            elif record.record_type == "lunch_start" and summary['first_lunch_start'] is None:
+                summary['first_lunch_start'] = record_time
+            elif record.record_type == "lunch_end":
+                summary['last_lunch_end'] = record_time
+            elif record.record_type == "departure":
+                summary['last_departure'] = record_time
+
+    return summaries
+
+def weekly_summaries_from_daily(daily_rows):
+    """
+    Rolls per-day summaries up into the weekly report format of calculate_worked_hours.
+
+    Args:
+        daily_rows (list): Objects with work_date, worked_seconds and night_seconds
+                           (e.g. DailyWorkSummary rows) for a single employee.
+
+    Returns:
+        list: Weekly summaries ordered by week, with 'days_worked' as a day count.
+    """
+    weekly_summary = {}
+    for row in daily_rows:
+        start_of_week = row.work_date - timedelta(days=row.work_date.weekday())
+        iso_year, iso_week, _ = start_of_week.isocalendar()
+        week_key = f"{iso_year}-{iso_week:02d}"
+        summary = weekly_summary.setdefault(week_key, {
+            'week_key': week_key,
+            'week_start': start_of_week.strftime('%Y-%m-%d'),
+            'week_end': (start_of_week + timedelta(days=6)).strftime('%Y-%m-%d'),
+            'total_worked_seconds': 0.0,
+            'total_overtime_seconds': 0.0,
+            'total_night_shift_seconds': 0.0,
+            'days_worked': 0
+        })
+        summary['total_worked_seconds'] += row.worked_seconds or 0.0
+        summary['total_night_shift_seconds'] += row.night_seconds or 0.0
+        if row.worked_seconds:
+            summary['days_worked'] += 1
+
+    target_seconds = WEEKLY_HOURS_TARGET * 3600
+    for summary in weekly_summary.values():
+        if summary['total_worked_seconds'] > target_seconds:
+            summary['total_overtime_seconds'] = summary['total_worked_seconds'] - target_seconds
+
+    return [weekly_summary[key] for key in sorted(weekly_summary)]
+
+def determine_absences(start_date, end_date, employees, worked_days):
     """
     Determines potential absence days for employees within a date range.
     An absence is defined as a weekday (Mon-Fri) or Saturday where no time record exists
-    for an active employee, considering their admission date.
+    for an employee, considering their admission date.
+
+    Absences are found per employee as the set difference between the workday calendar
+    and the days that have punches, so the cost follows headcount rather than raw punches.
 
     Args:
         start_date (date): The start date of the period.
         end_date (date): The end date of the period.
-        employees (list): List of active Employee objects.
-        records (list): List of TimeRecord objects for the period.
+        employees (list): Objects with id, name and admission_date (Employee rows or tuples).
+        worked_days (iterable): Distinct (employee_id, date) pairs that have at least one time record.
 
     Returns:
-        list: A list of dictionaries, each representing an absence.
+        list: A list of dictionaries, each representing an absence, ordered by date.
               Example: [{'employee_name': str, 'absence_date': 'YYYY-MM-DD', 'justification': str or None}]
     """
+    # Calendar of workdays (Mon-Sat) in the period, sorted
+    workdays = [
+        start_date + timedelta(days=offset)
+        for offset in range((end_date - start_date).days + 1)
+        if (start_date + timedelta(days=offset)).weekday() < 6 # Monday is 0, Sunday is 6
+    ]
+
+    days_worked_by_employee = defaultdict(set)
+    for employee_id, work_date in worked_days:
+        days_worked_by_employee[employee_id].add(work_date)
+
     absences = []
-    records_by_employee_date = defaultdict(list)
-    for r in records:
-        records_by_employee_date[(r.employee_id, r.timestamp.date())].append(r)
-
-    current_date = start_date
-    while current_date <= end_date:
-        day_of_week = current_date.weekday() # Monday is 0, Sunday is 6
-
-        # Check only workdays (Mon-Sat)
-        if day_of_week < 6: # 0-5 are Mon-Sat
-            for emp in employees:
-                # Check if employee was active on this date
-                if emp.status == 'active' and (emp.admission_date is None or emp.admission_date <= current_date):
-                    # Check if there are any records for this employee on this date
-                    if not records_by_employee_date[(emp.id, current_date)]:
-                        absences.append({
-                            'employee_name': emp.name,
-                            'absence_date': current_date.strftime('%Y-%m-%d'),
-                            'justification': None # Placeholder - justification needs separate mechanism
-                        })
-        current_date += timedelta(days=1)
+    for emp in employees:
+        # Only days on or after the admission date count
+        first_index = bisect_left(workdays, emp.admission_date) if emp.admission_date else 0
+        missing_days = set(workdays[first_index:]) - days_worked_by_employee[emp.id]
+        for absence_date in missing_days:
+            absences.append({
+                'employee_name': emp.name,
+                'absence_date': absence_date.strftime('%Y-%m-%d'),
+                'justification': None # Placeholder - justification needs separate mechanism
+            })
 
+    absences.sort(key=lambda absence: (absence['absence_date'], absence['employee_name']))
     return absences
-
@@ -0,0 +1,40 @@
+import base64
+import json
+from datetime import datetime, date
+
+# Opaque keyset cursors: the last row's sort key, JSON-encoded and base64url'd
+
+def encode_cursor(*values):
+    """Encodes the sort key values of the last returned row (datetimes/dates allowed)."""
+    payload = [
+        {"dt": value.isoformat()} if isinstance(value, datetime)
+        else {"d": value.isoformat()} if isinstance(value, date)
+        else value
+        for value in values
+    ]
+    return base64.urlsafe_b64encode(json.dumps(payload, separators=(",", ":")).encode()).decode().rstrip("=")
+
+def decode_cursor(cursor):
+    """Decodes a cursor produced by encode_cursor. Raises ValueError if it is malformed."""
+    try:
+        padded = cursor + "=" * (-len(cursor) % 4)
+        payload = json.loads(base64.urlsafe_b64decode(padded.encode()))
+        values = []
+        for value in payload:
+            if isinstance(value, dict) and "dt" in value:
+                value = datetime.fromisoformat(value["dt"])
+            elif isinstance(value, dict) and "d" in value:
+                value = date.fromisoformat(value["d"])
+            values.append(value)
+        return values
+    except Exception as e:
+        raise ValueError(f"Invalid cursor: {e}")
+
+def parse_page_size(value, default, maximum):
+    """Parses a `limit` query parameter, capping it at `maximum`. Raises ValueError if invalid."""
+    if value is None or value == "":
+        return default
+    page_size = int(value)
+    if page_size < 1:
+        raise ValueError("limit must be positive")
+    return min(page_size, maximum)
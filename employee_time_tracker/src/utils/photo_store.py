@@ -0,0 +1,230 @@
+import os
+import re
+import time
+import hashlib
+import tempfile
+import threading
+import multiprocessing
+from concurrent.futures import ProcessPoolExecutor
+from werkzeug.sansio.multipart import MultipartDecoder, NeedData, Field, File, Data, Epilogue
+
+# Photos are stored once per content hash: <PHOTO_STORE_DIR>/<first 2 hex chars>/<sha256>[_<variant>.jpg]
+PHOTO_STORE_DIR = os.getenv("PHOTO_STORE_DIR", os.path.join(os.path.dirname(os.path.dirname(os.path.dirname(__file__))), "photo_store"))
+PHOTO_MAX_BYTES = int(os.getenv("PHOTO_MAX_BYTES", str(15 * 1024 * 1024)))
+# Processes generating thumbnails and compressed variants (Pillow runs there, not in web threads)
+PHOTO_VARIANT_WORKERS = int(os.getenv("PHOTO_VARIANT_WORKERS", "1"))
+CHUNK_SIZE = 64 * 1024
+# Most the multipart parser may buffer: one read chunk plus the part headers being parsed
+MULTIPART_MAX_BUFFER_BYTES = CHUNK_SIZE + 64 * 1024
+# After a failed render the original is served instead of retrying, for this long
+PHOTO_VARIANT_RETRY_SECONDS = float(os.getenv("PHOTO_VARIANT_RETRY_SECONDS", "3600"))
+
+# Variant name -> (longest side in pixels, JPEG quality)
+PHOTO_VARIANTS = {
+    "thumb": (256, 75),
+    "medium": (1280, 82),
+}
+
+# Magic bytes of the accepted image formats
+IMAGE_SIGNATURES = (
+    (b"\xff\xd8\xff", "image/jpeg"),
+    (b"\x89PNG\r\n\x1a\n", "image/png"),
+)
+
+PHOTO_URL_PATTERN = re.compile(r"^/photos/([0-9a-f]{64})$")
+
+class PhotoTooLarge(Exception):
+    pass
+
+class UnsupportedPhotoType(Exception):
+    pass
+
+class MissingPhotoField(Exception):
+    pass
+
+class MultipartFileReader:
+    """
+    File-like reader over one file field of a multipart/form-data body.
+
+    The body is parsed as it is read from `stream`, so the file reaches save_photo_stream
+    chunk by chunk instead of being spooled by the form parser first.
+
+    Raises (from read):
+        MissingPhotoField: If the body has no file in `field_name`.
+        ValueError: If the body ends before the multipart terminator.
+    """
+
+    def __init__(self, stream, boundary, field_name):
+        self._chunks = self._iter_file(stream, boundary, field_name)
+
+    def read(self, size=-1):
+        return next(self._chunks, b"")
+
+    @staticmethod
+    def _iter_file(stream, boundary, field_name):
+        decoder = MultipartDecoder(boundary.encode("latin-1"), max_form_memory_size=MULTIPART_MAX_BUFFER_BYTES)
+        in_file = False
+        ended = False
+        while True:
+            event = decoder.next_event()
+            if isinstance(event, NeedData):
+                if ended:
+                    raise ValueError("Truncated multipart body")
+                chunk = stream.read(CHUNK_SIZE)
+                ended = not chunk
+                decoder.receive_data(chunk or None)
+            elif isinstance(event, File):
+                in_file = event.name == field_name
+            elif isinstance(event, Field):
+                in_file = False
+            elif isinstance(event, Data) and in_file:
+                if event.data:
+                    yield event.data
+                if not event.more_data:
+                    return # The rest of the body isn't needed
+            elif isinstance(event, Epilogue):
+                raise MissingPhotoField(field_name)
+
+# Bytes sniff_content_type needs to tell every accepted type apart (WebP: "RIFF" size "WEBP")
+SNIFF_HEADER_BYTES = 12
+
+def sniff_content_type(head):
+    """Returns the image MIME type from the first bytes of a file, or None if not accepted."""
+    for signature, content_type in IMAGE_SIGNATURES:
+        if head.startswith(signature):
+            return content_type
+    if head[:4] == b"RIFF" and head[8:12] == b"WEBP":
+        return "image/webp"
+    return None
+
+def photo_path(sha256, variant=None):
+    name = sha256 if variant is None else f"{sha256}_{variant}.jpg"
+    return os.path.join(PHOTO_STORE_DIR, sha256[:2], name)
+
+def photo_url(sha256):
+    return f"/photos/{sha256}"
+
+def thumbnail_url(url):
+    """Thumbnail URL for a photo_url served by the photo store; other URLs are returned as is."""
+    if url and PHOTO_URL_PATTERN.match(url):
+        return f"{url}?variant=thumb"
+    return url
+
+def save_photo_stream(stream, max_bytes=PHOTO_MAX_BYTES):
+    """
+    Streams an uploaded photo into the store, hashing it on the way.
+
+    The upload is written in chunks to a temporary file and only moved into place under its
+    SHA-256 if that content isn't stored yet, so retried uploads are deduplicated.
+
+    Args:
+        stream: File-like object (request.stream or an uploaded file's stream).
+        max_bytes (int): Uploads larger than this raise PhotoTooLarge.
+
+    Returns:
+        tuple: (sha256 hex digest, size in bytes, content type, created) where created is
+               False if the same photo was already stored.
+
+    Raises:
+        PhotoTooLarge, UnsupportedPhotoType
+    """
+    os.makedirs(PHOTO_STORE_DIR, exist_ok=True)
+    digest = hashlib.sha256()
+    size = 0
+    content_type = None
+    temp_fd, temp_path = tempfile.mkstemp(dir=PHOTO_STORE_DIR, suffix=".upload")
+    try:
+        with os.fdopen(temp_fd, "wb") as temp_file:
+            head = b""
+            while True:
+                chunk = stream.read(CHUNK_SIZE)
+                if content_type is None and (len(head) >= SNIFF_HEADER_BYTES or (head and not chunk)):
+                    content_type = sniff_content_type(head)
+                    if content_type is None:
+                        raise UnsupportedPhotoType("Only JPEG, PNG and WebP photos are accepted")
+                if not chunk:
+                    break
+                if content_type is None:
+                    head += chunk[:SNIFF_HEADER_BYTES - len(head)] # Reads may be shorter than the signatures
+                size += len(chunk)
+                if size > max_bytes:
+                    raise PhotoTooLarge(f"Photo larger than {max_bytes} bytes")
+                digest.update(chunk)
+                temp_file.write(chunk)
+        if content_type is None:
+            raise UnsupportedPhotoType("Empty upload")
+
+        sha256 = digest.hexdigest()
+        final_path = photo_path(sha256)
+        if os.path.exists(final_path):
+            os.remove(temp_path)
+            return sha256, size, content_type, False
+        os.makedirs(os.path.dirname(final_path), exist_ok=True)
+        os.replace(temp_path, final_path)
+        return sha256, size, content_type, True
+    except BaseException:
+        if os.path.exists(temp_path):
+            os.remove(temp_path)
+        raise
+
+def _render_variants(original_path, variant_paths):
+    """Runs in a worker process: writes each (path, max side, quality) JPEG variant atomically."""
+    from PIL import Image, ImageOps
+
+    with Image.open(original_path) as image:
+        image = ImageOps.exif_transpose(image) # Phone photos are often stored rotated
+        image = image.convert("RGB")
+        for path, max_side, quality in variant_paths:
+            variant = image.copy()
+            variant.thumbnail((max_side, max_side))
+            temp_path = f"{path}.tmp"
+            variant.save(temp_path, "JPEG", quality=quality, optimize=True, progressive=True)
+            os.replace(temp_path, path)
+
+_executor = None
+_pending = set() # sha256 of photos whose variants are being generated
+_failed = {} # sha256 -> monotonic time until which a failed render isn't retried
+_lock = threading.Lock()
+
+def _get_executor():
+    global _executor
+    if _executor is None:
+        # "spawn" avoids forking a multi-threaded (gunicorn --threads) web process
+        _executor = ProcessPoolExecutor(
+            max_workers=PHOTO_VARIANT_WORKERS,
+            mp_context=multiprocessing.get_context("spawn")
+        )
+    return _executor
+
+def _on_variants_done(sha256, future):
+    failed = future.exception() is not None
+    with _lock:
+        _pending.discard(sha256)
+        if failed:
+            now = time.monotonic()
+            for expired in [key for key, retry_at in _failed.items() if retry_at <= now]:
+                del _failed[expired]
+            _failed[sha256] = now + PHOTO_VARIANT_RETRY_SECONDS
+    if failed:
+        print(f"Error generating variants of photo {sha256}: {future.exception()}")
+
+def queue_variants(sha256):
+    """
+    Generates the missing variants of a stored photo in the background (once at a time).
+
+    A photo whose render failed (e.g. a corrupt image) isn't queued again for
+    PHOTO_VARIANT_RETRY_SECONDS; the original is served in the meantime.
+    """
+    missing = [
+        (photo_path(sha256, variant), max_side, quality)
+        for variant, (max_side, quality) in PHOTO_VARIANTS.items()
+        if not os.path.exists(photo_path(sha256, variant))
+    ]
+    if not missing:
+        return
+    with _lock:
+        if sha256 in _pending or _failed.get(sha256, 0) > time.monotonic():
+            return
+        _pending.add(sha256)
+        future = _get_executor().submit(_render_variants, photo_path(sha256), missing)
+    future.add_done_callback(lambda done: _on_variants_done(sha256, done))
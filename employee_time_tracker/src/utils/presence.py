@@ -0,0 +1,255 @@
+import threading
+from datetime import datetime
+
+from src.utils.geo import distance_meters
+from src.utils.business_time import local_date
+
+# Presence states, from the employee's last punch
+STATE_WORKING = "working"
+STATE_AT_LUNCH = "at_lunch"
+STATE_CLOCKED_OUT = "clocked_out"
+STATE_NOT_ARRIVED = "not_arrived"
+PRESENCE_STATES = (STATE_WORKING, STATE_AT_LUNCH, STATE_CLOCKED_OUT, STATE_NOT_ARRIVED)
+
+class LastPunch:
+    """An employee's latest punch, as kept by the presence index."""
+    __slots__ = ("record_type", "timestamp", "latitude", "longitude", "site_id")
+
+    def __init__(self, record_type, timestamp, latitude=None, longitude=None, site_id=None):
+        self.record_type = record_type
+        self.timestamp = timestamp
+        self.latitude = latitude
+        self.longitude = longitude
+        self.site_id = site_id
+
+def presence_state(last, now, open_shift_timeout):
+    """State of an employee whose latest punch is `last` (or None)."""
+    if last is None:
+        return STATE_NOT_ARRIVED
+    if last.record_type == "departure":
+        return STATE_CLOCKED_OUT if local_date(last.timestamp) == local_date(now) else STATE_NOT_ARRIVED
+    if last.timestamp < now - open_shift_timeout:
+        return STATE_NOT_ARRIVED # Shift left open (no check-out) long ago
+    return STATE_AT_LUNCH if last.record_type == "lunch_start" else STATE_WORKING
+
+class PresenceIndex:
+    """
+    In-memory latest punch of every employee, for the live presence board.
+
+    Built lazily from the database on first use, then kept current from committed punches
+    (see the session listeners below), so reading it never queries the database.
+    """
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._build_lock = threading.Lock()
+        self._built = False
+        self._building = False
+        self._pending = [] # Updates committed while the index was being built
+        self._names = {} # employee_id -> name
+        self._last_punches = {} # employee_id -> LastPunch (only employees seen punching recently)
+        self._stale_employee_ids = set() # Punches changed or removed: reload from the database
+
+    def _apply(self, update):
+        kind, employee_id, payload = update
+        if kind == "punch":
+            current = self._last_punches.get(employee_id)
+            # Late (offline-synced) punches don't override a newer one
+            if current is None or payload.timestamp >= current.timestamp:
+                self._last_punches[employee_id] = payload
+        elif kind == "stale":
+            self._stale_employee_ids.add(employee_id)
+        elif kind == "employee":
+            self._names[employee_id] = payload
+        elif kind == "employee_removed":
+            self._names.pop(employee_id, None)
+            self._last_punches.pop(employee_id, None)
+
+    def apply_updates(self, updates):
+        """Applies committed changes: ("punch", id, LastPunch), ("stale", id, None), ("employee", id, name)..."""
+        with self._lock:
+            if self._building:
+                self._pending.extend(updates)
+            elif self._built:
+                for update in updates:
+                    self._apply(update)
+            # Not built yet: the initial load will read these from the database
+
+    def _ensure_built(self, session, lookback):
+        if self._built and not self._stale_employee_ids:
+            return
+        with self._build_lock: # One loader at a time; other readers wait for it
+            with self._lock:
+                if self._built and not self._stale_employee_ids:
+                    return
+                stale_ids = set(self._stale_employee_ids) if self._built else None
+                self._stale_employee_ids.clear()
+                self._building = True
+            try:
+                names, last_punches = load_presence(session, lookback, stale_ids)
+            except Exception:
+                with self._lock:
+                    self._building = False
+                    self._pending = []
+                    if stale_ids:
+                        self._stale_employee_ids.update(stale_ids)
+                raise
+            with self._lock:
+                if stale_ids is None:
+                    self._names = names
+                    self._last_punches = last_punches
+                else:
+                    for employee_id in stale_ids:
+                        self._last_punches.pop(employee_id, None)
+                    self._last_punches.update(last_punches)
+                for update in self._pending:
+                    self._apply(update)
+                self._pending = []
+                self._built = True
+                self._building = False
+
+    def snapshot(self, session, lookback, open_shift_timeout, states=None, near=None, radius_meters=None, site_id=None, now=None):
+        """
+        Returns (entries, counts) for the current presence board.
+
+        Args:
+            session: Database session, only used for the first load (and after corrections).
+            lookback (timedelta): How far back the initial load looks for last punches.
+            open_shift_timeout (timedelta): Open shifts older than this count as not arrived.
+            states (set, optional): Only return employees in these states.
+            near (tuple, optional): (latitude, longitude); only return employees whose last
+                punch was within radius_meters of it.
+            site_id (int, optional): Only return employees whose last punch was tagged with this site.
+            now (datetime, optional): Reference time (UTC), defaults to now.
+        """
+        self._ensure_built(session, lookback)
+        now = now or datetime.utcnow()
+        counts = {state: 0 for state in PRESENCE_STATES}
+        entries = []
+        with self._lock:
+            names = self._names
+            last_punches = self._last_punches
+            active_ids = set()
+            # O(employees with a recent punch); everyone else is "not arrived"
+            for employee_id, last in last_punches.items():
+                if employee_id not in names:
+                    continue
+                state = presence_state(last, now, open_shift_timeout)
+                if state == STATE_NOT_ARRIVED:
+                    continue
+                active_ids.add(employee_id)
+                counts[state] += 1
+                if states and state not in states:
+                    continue
+                if site_id is not None and last.site_id != site_id:
+                    continue
+                distance = None
+                if near is not None:
+                    if last.latitude is None or last.longitude is None:
+                        continue
+                    distance = distance_meters(near[0], near[1], last.latitude, last.longitude)
+                    if distance > radius_meters:
+                        continue
+                entries.append({
+                    "employee_id": employee_id,
+                    "name": names[employee_id],
+                    "state": state,
+                    "last_record_type": last.record_type,
+                    "last_record_time": last.timestamp.isoformat(),
+                    "latitude": last.latitude,
+                    "longitude": last.longitude,
+                    "site_id": last.site_id,
+                    "distance_meters": round(distance, 1) if distance is not None else None,
+                })
+            counts[STATE_NOT_ARRIVED] = len(names) - len(active_ids)
+            # Absent employees have no location, so they never match a location filter
+            if (not states or STATE_NOT_ARRIVED in states) and near is None and site_id is None:
+                for employee_id, name in names.items():
+                    if employee_id not in active_ids:
+                        entries.append({"employee_id": employee_id, "name": name, "state": STATE_NOT_ARRIVED})
+        entries.sort(key=lambda entry: (entry["name"] or "", entry["employee_id"]))
+        return entries, counts
+
+def load_presence(session, lookback, employee_ids=None):
+    """
+    Reads employee names and last punches since now - lookback (optionally for some employees only).
+
+    Uses its own connection from the session's engine, so the caller's transaction (and any
+    pending work in it) is left alone.
+    """
+    from sqlalchemy import select, func, and_
+    from src.models.employee import Employee
+    from src.models.time_record import TimeRecord
+
+    names = {}
+    with session.get_bind().connect() as connection: # Closing it ends the read transaction
+        if employee_ids is None:
+            names = {row.id: row.name for row in connection.execute(select(Employee.id, Employee.name))}
+
+        conditions = [TimeRecord.timestamp >= datetime.utcnow() - lookback]
+        if employee_ids is not None:
+            conditions.append(TimeRecord.employee_id.in_(employee_ids))
+        latest = select(
+            TimeRecord.employee_id, func.max(TimeRecord.timestamp).label("timestamp")
+        ).where(*conditions).group_by(TimeRecord.employee_id).subquery()
+        rows = connection.execute(
+            select(TimeRecord.id, TimeRecord.employee_id, TimeRecord.timestamp, TimeRecord.record_type, TimeRecord.latitude, TimeRecord.longitude, TimeRecord.site_id).join(
+                latest, and_(TimeRecord.employee_id == latest.c.employee_id, TimeRecord.timestamp == latest.c.timestamp)
+            )
+        ).all()
+    last_punches = {}
+    for row in sorted(rows, key=lambda row: row.id): # Same-timestamp ties resolve to the highest id
+        last_punches[row.employee_id] = LastPunch(row.record_type, row.timestamp, row.latitude, row.longitude, row.site_id)
+    return names, last_punches
+
+presence_index = PresenceIndex()
+
+# --- Keep the index current from committed changes --- #
+from sqlalchemy import event, inspect
+from sqlalchemy.orm import Session, object_session
+from src.models.employee import Employee
+from src.models.time_record import TimeRecord
+
+# Key in session.info holding presence updates to apply once the transaction commits
+PRESENCE_UPDATES_KEY = "presence_updates"
+
+def track_punch(session, employee_id, record_type, timestamp, latitude=None, longitude=None, site_id=None):
+    """Queues a new punch for the presence index (applied on commit).
+
+    ORM inserts are tracked automatically; call this after inserting punches with Core.
+    """
+    session.info.setdefault(PRESENCE_UPDATES_KEY, []).append(
+        ("punch", employee_id, LastPunch(record_type, timestamp, latitude, longitude, site_id))
+    )
+
+@event.listens_for(TimeRecord, "after_insert")
+def track_inserted_punch(mapper, connection, target):
+    track_punch(object_session(target), target.employee_id, target.record_type, target.timestamp, target.latitude, target.longitude, target.site_id)
+
+@event.listens_for(TimeRecord, "after_update")
+@event.listens_for(TimeRecord, "after_delete")
+def track_changed_punch(mapper, connection, target):
+    # The employee's last punch may now be an older one: reload them on the next read
+    updates = object_session(target).info.setdefault(PRESENCE_UPDATES_KEY, [])
+    old_employee_ids = inspect(target).attrs.employee_id.history.deleted or []
+    for employee_id in {target.employee_id, *old_employee_ids}:
+        updates.append(("stale", employee_id, None))
+
+@event.listens_for(Employee, "after_insert")
+@event.listens_for(Employee, "after_update")
+def track_employee_name(mapper, connection, target):
+    object_session(target).info.setdefault(PRESENCE_UPDATES_KEY, []).append(("employee", target.id, target.name))
+
+@event.listens_for(Employee, "after_delete")
+def track_removed_employee(mapper, connection, target):
+    object_session(target).info.setdefault(PRESENCE_UPDATES_KEY, []).append(("employee_removed", target.id, None))
+
+@event.listens_for(Session, "after_commit")
+def apply_committed_presence(session):
+    updates = session.info.pop(PRESENCE_UPDATES_KEY, None)
+    if updates:
+        presence_index.apply_updates(updates)
+
+@event.listens_for(Session, "after_rollback")
+def discard_uncommitted_presence(session):
+    session.info.pop(PRESENCE_UPDATES_KEY, None)
@@ -0,0 +1,98 @@
+import os
+import queue
+import threading
+import time
+
+from src.utils.punches import ingest_punch_batch
+
+# Group commit: punches from concurrent requests are written by one thread, many per transaction
+GROUP_COMMIT_ENABLED = os.getenv("PUNCH_GROUP_COMMIT", "0") == "1"
+# A batch is written once it has this many punches...
+PUNCH_BATCH_MAX_ROWS = int(os.getenv("PUNCH_BATCH_MAX_ROWS", "200"))
+# ...or once its first punch has waited this long
+PUNCH_BATCH_MAX_WAIT = int(os.getenv("PUNCH_BATCH_MAX_WAIT_MS", "5")) / 1000.0
+# How long a request waits for its batch to commit before giving up (the punch may still be stored)
+PUNCH_WRITE_TIMEOUT = float(os.getenv("PUNCH_WRITE_TIMEOUT_SECONDS", "10"))
+
+class PendingPunch:
+    """A queued punch; the request thread waits on it until its batch is committed."""
+
+    def __init__(self, item):
+        self.item = item
+        self.result = None
+        self.error = None
+        self._done = threading.Event()
+
+    def resolve(self, result=None, error=None):
+        self.result = result
+        self.error = error
+        self._done.set()
+
+    def wait(self, timeout=PUNCH_WRITE_TIMEOUT):
+        """Returns the PunchResult; raises TimeoutError, or the batch's error if it failed."""
+        if not self._done.wait(timeout):
+            raise TimeoutError("Punch batch not committed in time")
+        if self.error is not None:
+            raise self.error
+        return self.result
+
+class PunchWriter:
+    """Background thread that commits queued punches in batches (see ingest_punch_batch)."""
+
+    def __init__(self, app, max_rows=PUNCH_BATCH_MAX_ROWS, max_wait=PUNCH_BATCH_MAX_WAIT):
+        self.app = app
+        self.max_rows = max_rows
+        self.max_wait = max_wait
+        self._queue = queue.Queue()
+        self._thread = threading.Thread(target=self._run, name="punch-writer", daemon=True)
+        self._thread.start()
+
+    def submit(self, item):
+        """Queues a PunchItem and returns its PendingPunch."""
+        pending = PendingPunch(item)
+        self._queue.put(pending)
+        return pending
+
+    def _next_batch(self):
+        batch = [self._queue.get()] # Block until there is work
+        deadline = time.monotonic() + self.max_wait
+        while len(batch) < self.max_rows:
+            remaining = deadline - time.monotonic()
+            if remaining <= 0:
+                break
+            try:
+                batch.append(self._queue.get(timeout=remaining))
+            except queue.Empty:
+                break
+        return batch
+
+    def _run(self):
+        from src.main import db
+
+        with self.app.app_context():
+            while True:
+                batch = self._next_batch()
+                try:
+                    results = ingest_punch_batch(db.session, [pending.item for pending in batch])
+                except Exception as e:
+                    db.session.rollback()
+                    print(f"Error writing punch batch of {len(batch)}: {e}")
+                    for pending in batch:
+                        pending.resolve(error=e)
+                else:
+                    for pending, result in zip(batch, results):
+                        pending.resolve(result)
+                finally:
+                    db.session.close()
+
+_writer = None
+_writer_lock = threading.Lock()
+
+def get_punch_writer():
+    """Returns the process-wide PunchWriter, starting its thread on first use."""
+    global _writer
+    with _writer_lock:
+        if _writer is None:
+            from src.main import app
+            _writer = PunchWriter(app)
+        return _writer
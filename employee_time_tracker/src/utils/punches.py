@@ -0,0 +1,398 @@
+import os
+from datetime import datetime, timedelta
+from sqlalchemy import select, insert, exists, literal, func, or_, and_
+from sqlalchemy.exc import IntegrityError
+
+from src.models.employee import Employee
+from src.models.time_record import TimeRecord, shift_work_date
+from src.utils.business_time import local_date
+from src.models.daily_work_summary import mark_work_day
+from src.utils.presence import track_punch
+from src.utils.event_bus import queue_event, time_record_event_data
+from src.utils.site_index import resolve_site
+
+# Record types a punch may follow (None = the employee has no punches yet)
+ALLOWED_PREVIOUS_RECORD_TYPES = {
+    "arrival": (None, "departure"),
+    "lunch_start": ("arrival",),
+    "lunch_end": ("lunch_start",),
+    "departure": ("arrival", "lunch_start", "lunch_end"),
+}
+
+PUNCH_LABELS = {
+    "arrival": "Check-in",
+    "lunch_start": "Início do almoço",
+    "lunch_end": "Fim do almoço",
+    "departure": "Check-out",
+}
+
+# A shift left open (no check-out) for longer than this no longer blocks the next check-in
+OPEN_SHIFT_TIMEOUT = timedelta(hours=int(os.getenv("OPEN_SHIFT_TIMEOUT_HOURS", "16")))
+
+# Outcomes of record_punch
+PUNCH_CREATED = "created"
+PUNCH_REPLAYED = "replayed" # Same idempotency key seen before; the original punch is returned
+PUNCH_REJECTED = "rejected" # Transition not allowed after the employee's last punch
+
+class PunchResult:
+    """Outcome of a punch attempt, plus the stored punch (or the last one, when rejected)."""
+
+    def __init__(self, outcome, record_id=None, timestamp=None, record_type=None, last_record_type=None, out_of_order=False,
+                 site_id=None, outside_geofence=None):
+        self.outcome = outcome
+        self.record_id = record_id
+        self.timestamp = timestamp
+        self.record_type = record_type
+        self.last_record_type = last_record_type
+        self.out_of_order = out_of_order # Rejected for predating the last stored punch
+        self.site_id = site_id # Site the created punch was tagged with (see resolve_site)
+        self.outside_geofence = outside_geofence
+
+def transition_allowed(record_type, timestamp, last_record_type, last_timestamp):
+    """
+    True if a `record_type` punch at `timestamp` may follow the employee's last punch.
+
+    In-memory version of the check build_punch_insert runs in SQL: a check-in is also
+    allowed once the open shift is older than OPEN_SHIFT_TIMEOUT.
+    """
+    return last_record_type in ALLOWED_PREVIOUS_RECORD_TYPES[record_type] or (
+        record_type == "arrival" and last_timestamp is not None and last_timestamp < timestamp - OPEN_SHIFT_TIMEOUT
+    )
+
+def _last_punch_column(column, employee_id):
+    return select(column).where(TimeRecord.employee_id == employee_id).order_by(
+        TimeRecord.timestamp.desc(), TimeRecord.id.desc()
+    ).limit(1).scalar_subquery()
+
+def build_punch_insert(employee_id, record_type, timestamp, latitude=None, longitude=None, photo_url=None, idempotency_key=None,
+                       site_id=None, outside_geofence=None):
+    """
+    Builds one INSERT ... SELECT that stores the punch only if the transition is valid.
+
+    The employee's last punch is checked inside the statement itself, and a punch whose
+    idempotency key was already stored for this employee is skipped, so a valid punch costs
+    a single round trip and a replay inserts nothing (rowcount 0). work_date is taken from
+    the last punch too: anything but a check-in continues the open shift (see shift_work_date).
+    The check and the insert race under READ COMMITTED: run it after lock_employees.
+    """
+    allowed = ALLOWED_PREVIOUS_RECORD_TYPES[record_type]
+    last_type = func.coalesce(_last_punch_column(TimeRecord.record_type, employee_id), "")
+    transition_ok = last_type.in_(["" if value is None else value for value in allowed])
+    if record_type == "arrival":
+        transition_ok = or_(
+            transition_ok,
+            _last_punch_column(TimeRecord.timestamp, employee_id) < timestamp - OPEN_SHIFT_TIMEOUT
+        )
+
+    if record_type == "arrival":
+        work_date = literal(local_date(timestamp), TimeRecord.work_date.type)
+    else:
+        # The transition check guarantees the last punch belongs to an open shift
+        work_date = func.coalesce(
+            _last_punch_column(TimeRecord.work_date, employee_id),
+            literal(local_date(timestamp), TimeRecord.work_date.type)
+        )
+
+    conditions = [transition_ok]
+    if idempotency_key is not None:
+        conditions.append(~exists().where(and_(
+            TimeRecord.employee_id == employee_id,
+            TimeRecord.idempotency_key == idempotency_key
+        )))
+
+    values = select(
+        literal(employee_id), literal(timestamp), literal(record_type),
+        literal(latitude, TimeRecord.latitude.type), literal(longitude, TimeRecord.longitude.type),
+        literal(photo_url, TimeRecord.photo_url.type), literal(idempotency_key, TimeRecord.idempotency_key.type),
+        literal(site_id, TimeRecord.site_id.type), literal(outside_geofence, TimeRecord.outside_geofence.type), work_date
+    ).where(*conditions)
+    return insert(TimeRecord).from_select(
+        ["employee_id", "timestamp", "record_type", "latitude", "longitude", "photo_url", "idempotency_key", "site_id", "outside_geofence",
+         "work_date"],
+        values
+    )
+
+def lock_employees(session, employee_ids):
+    """
+    Locks the employees' rows (SELECT ... FOR UPDATE) until the transaction ends.
+
+    Checking the last punch and inserting the next one isn't atomic under READ COMMITTED:
+    two concurrent taps could both see the same last punch and both be stored. Punch writers
+    take this lock first, so one employee's punches are validated one transaction at a time
+    (SQLite has no row locks; its database write lock already serializes writers). Rows are
+    locked in id order so batches can't deadlock each other.
+    """
+    session.execute(
+        select(Employee.id).where(Employee.id.in_(sorted(employee_ids))).order_by(Employee.id).with_for_update()
+    ).all()
+
+def find_punch_by_key(session, employee_id, idempotency_key):
+    """Returns the (id, timestamp, record_type) row stored under this key, or None."""
+    return session.execute(
+        select(TimeRecord.id, TimeRecord.timestamp, TimeRecord.record_type).where(
+            TimeRecord.employee_id == employee_id,
+            TimeRecord.idempotency_key == idempotency_key
+        )
+    ).first()
+
+def last_punch(session, employee_id):
+    """Returns the employee's latest (id, timestamp, record_type, work_date) row, or None."""
+    return session.execute(
+        select(TimeRecord.id, TimeRecord.timestamp, TimeRecord.record_type, TimeRecord.work_date).where(
+            TimeRecord.employee_id == employee_id
+        ).order_by(TimeRecord.timestamp.desc(), TimeRecord.id.desc()).limit(1)
+    ).first()
+
+def _execute_punch_insert(session, statement, record_type, timestamp):
+    """
+    Runs a build_punch_insert statement; returns the stored (id, work_date), or None if it inserted nothing.
+
+    Where the database supports INSERT ... RETURNING (PostgreSQL, SQLite 3.35+) the id and the
+    work_date computed inside the insert come back with it. Elsewhere the id is the cursor's
+    lastrowid (MySQL), and a continued shift's work_date is read back by primary key.
+    """
+    if session.get_bind().dialect.insert_returning:
+        return session.execute(statement.returning(TimeRecord.id, TimeRecord.work_date)).first()
+    result = session.execute(statement)
+    if result.rowcount != 1:
+        return None
+    work_date = local_date(timestamp)
+    if record_type != "arrival":
+        # Inherited from the open shift inside the insert
+        work_date = session.execute(select(TimeRecord.work_date).where(TimeRecord.id == result.lastrowid)).scalar()
+    return result.lastrowid, work_date
+
+def record_punch(session, employee_id, record_type, latitude=None, longitude=None, photo_url=None, idempotency_key=None, timestamp=None):
+    """
+    Stores a punch and commits. Besides the employee row lock (see lock_employees), only a
+    rejected punch or a replay costs an extra read.
+
+    Args:
+        session: SQLAlchemy session (db.session).
+        employee_id (int): Employee punching.
+        record_type (str): One of ALLOWED_PREVIOUS_RECORD_TYPES.
+        latitude, longitude (float, optional): Punch location.
+        photo_url (str, optional): URL of the punch photo.
+        idempotency_key (str, optional): Client-generated key; retries with the same key
+            return the original punch instead of storing a new one.
+        timestamp (datetime, optional): Punch time, defaults to now (UTC).
+
+    Returns:
+        PunchResult
+    """
+    timestamp = timestamp or datetime.utcnow()
+    site_id, outside_geofence = resolve_site(session, latitude, longitude)
+    statement = build_punch_insert(
+        employee_id, record_type, timestamp, latitude, longitude, photo_url, idempotency_key, site_id, outside_geofence
+    )
+    try:
+        lock_employees(session, [employee_id])
+        stored = _execute_punch_insert(session, statement, record_type, timestamp)
+        if stored is not None:
+            record_id, work_date = stored
+            # Core insert: notify the DailyWorkSummary refresh, presence and event feed ourselves
+            mark_work_day(session, employee_id, work_date)
+            track_punch(session, employee_id, record_type, timestamp, latitude, longitude, site_id)
+            queue_event(session, "time_record", time_record_event_data(
+                record_id, employee_id, record_type, timestamp, latitude, longitude, photo_url, site_id, outside_geofence, work_date
+            ))
+            session.commit()
+            return PunchResult(PUNCH_CREATED, record_id, timestamp, record_type,
+                               site_id=site_id, outside_geofence=outside_geofence)
+    except IntegrityError:
+        # A concurrent request with the same idempotency key won the race
+        session.rollback()
+        if idempotency_key is None:
+            raise
+    else:
+        session.rollback()
+
+    if idempotency_key is not None:
+        original = find_punch_by_key(session, employee_id, idempotency_key)
+        if original is not None:
+            return PunchResult(PUNCH_REPLAYED, original.id, original.timestamp, original.record_type)
+    previous = last_punch(session, employee_id)
+    return PunchResult(PUNCH_REJECTED, record_type=record_type, last_record_type=previous.record_type if previous else None)
+
+def rejection_message(record_type, last_record_type):
+    """User-facing (Portuguese) reason why `record_type` can't follow `last_record_type`."""
+    if record_type != "arrival" and last_record_type in (None, "departure"):
+        return "Realize o check-in primeiro."
+    if record_type == "lunch_end" and last_record_type != "lunch_start":
+        return "Registre o início do almoço primeiro."
+    if record_type == last_record_type:
+        return f"{PUNCH_LABELS[record_type]} já registrado."
+    return f"{PUNCH_LABELS[record_type]} não permitido após {PUNCH_LABELS[last_record_type].lower()}."
+
+def describe_rejection(result):
+    """User-facing reason for a PUNCH_REJECTED result."""
+    if result.out_of_order:
+        return "Registro anterior ao último ponto registrado."
+    return rejection_message(result.record_type, result.last_record_type)
+
+# --- Batch ingestion (offline sync, group commit) --- #
+
+class PunchItem:
+    """One punch of a batch, already parsed. `timestamp` is naive UTC.
+
+    site_id / outside_geofence are resolved from the coordinates, and work_date from the
+    employee's previous punch, when the batch is stored.
+    """
+
+    def __init__(self, employee_id, record_type, timestamp, latitude=None, longitude=None, photo_url=None, idempotency_key=None):
+        self.employee_id = employee_id
+        self.record_type = record_type
+        self.timestamp = timestamp
+        self.latitude = latitude
+        self.longitude = longitude
+        self.photo_url = photo_url
+        self.idempotency_key = idempotency_key
+        self.site_id = None
+        self.outside_geofence = None
+        self.work_date = None
+
+    def to_row(self):
+        return {
+            "employee_id": self.employee_id,
+            "timestamp": self.timestamp,
+            "record_type": self.record_type,
+            "latitude": self.latitude,
+            "longitude": self.longitude,
+            "photo_url": self.photo_url,
+            "idempotency_key": self.idempotency_key,
+            "site_id": self.site_id,
+            "outside_geofence": self.outside_geofence,
+            "work_date": self.work_date,
+        }
+
+def _last_punches(session, employee_ids):
+    """Returns {employee_id: (timestamp, record_type, work_date)} of each employee's latest punch (two queries)."""
+    latest = select(
+        TimeRecord.employee_id, func.max(TimeRecord.timestamp).label("timestamp")
+    ).where(TimeRecord.employee_id.in_(employee_ids)).group_by(TimeRecord.employee_id).subquery()
+    rows = session.execute(
+        select(TimeRecord.employee_id, TimeRecord.id, TimeRecord.timestamp, TimeRecord.record_type, TimeRecord.work_date).join(
+            latest, and_(TimeRecord.employee_id == latest.c.employee_id, TimeRecord.timestamp == latest.c.timestamp)
+        )
+    ).all()
+    last = {}
+    for row in sorted(rows, key=lambda row: row.id): # Same-timestamp ties resolve to the highest id
+        last[row.employee_id] = (row.timestamp, row.record_type, row.work_date)
+    return last
+
+def _stored_keys(session, items):
+    """Returns {(employee_id, idempotency_key): PunchResult} for keys already stored."""
+    keys = {(item.employee_id, item.idempotency_key) for item in items if item.idempotency_key is not None}
+    if not keys:
+        return {}
+    rows = session.execute(
+        select(TimeRecord.employee_id, TimeRecord.idempotency_key, TimeRecord.id, TimeRecord.timestamp, TimeRecord.record_type).where(
+            TimeRecord.employee_id.in_({employee_id for employee_id, _ in keys}),
+            TimeRecord.idempotency_key.in_({key for _, key in keys})
+        )
+    ).all()
+    return {
+        (row.employee_id, row.idempotency_key): PunchResult(PUNCH_REPLAYED, row.id, row.timestamp, row.record_type)
+        for row in rows if (row.employee_id, row.idempotency_key) in keys
+    }
+
+def _validate_batch(items, last_punches, stored_keys):
+    """Validates items against the stored state and each other; returns (results, [(result, row to insert)])."""
+    results = [None] * len(items)
+    created = []
+    seen_keys = dict(stored_keys)
+    last = dict(last_punches)
+    # Each employee's punches are checked in punch order (stable for equal timestamps)
+    for index in sorted(range(len(items)), key=lambda index: (items[index].employee_id, items[index].timestamp)):
+        item = items[index]
+        key = (item.employee_id, item.idempotency_key)
+        if item.idempotency_key is not None and key in seen_keys:
+            original = seen_keys[key]
+            results[index] = PunchResult(PUNCH_REPLAYED, original.record_id, original.timestamp, original.record_type)
+            continue
+
+        last_timestamp, last_type, last_work_date = last.get(item.employee_id, (None, None, None))
+        if last_timestamp is not None and item.timestamp < last_timestamp:
+            # Can't be slotted in before punches that are already stored
+            results[index] = PunchResult(PUNCH_REJECTED, None, item.timestamp, item.record_type, last_type, out_of_order=True)
+            continue
+        if not transition_allowed(item.record_type, item.timestamp, last_type, last_timestamp):
+            results[index] = PunchResult(PUNCH_REJECTED, None, item.timestamp, item.record_type, last_type)
+            continue
+
+        item.work_date = shift_work_date(item.record_type, item.timestamp, last_type, last_work_date)
+        results[index] = PunchResult(PUNCH_CREATED, None, item.timestamp, item.record_type,
+                                     site_id=item.site_id, outside_geofence=item.outside_geofence)
+        created.append((results[index], item.to_row()))
+        last[item.employee_id] = (item.timestamp, item.record_type, item.work_date)
+        if item.idempotency_key is not None:
+            seen_keys[key] = results[index]
+    return results, created
+
+def _insert_punch_rows(session, rows):
+    """
+    Inserts punch rows; returns their new ids in the order given.
+
+    Where the database reports ids from an executemany (PostgreSQL, SQLite 3.35+) this is a
+    single INSERT ... RETURNING; elsewhere (MySQL) each row is inserted on its own to read
+    its lastrowid, still inside the batch's transaction.
+    """
+    if session.get_bind().dialect.insert_executemany_returning:
+        return session.execute(insert(TimeRecord).returning(TimeRecord.id, sort_by_parameter_order=True), rows).scalars().all()
+    return [session.execute(insert(TimeRecord).values(**row)).inserted_primary_key[0] for row in rows]
+
+def ingest_punch_batch(session, items, retry_on_conflict=True):
+    """
+    Validates a batch of punches and stores the valid ones in one transaction.
+
+    Locks the employees' rows (see lock_employees), reads their last punches and already
+    stored idempotency keys with one IN query each, validates every employee's punches in
+    timestamp order in memory, then inserts all accepted rows with a single executemany
+    (see _insert_punch_rows) and commits once.
+
+    Args:
+        session: SQLAlchemy session (db.session).
+        items (list[PunchItem]): Punches to store; employees must exist.
+        retry_on_conflict (bool): Re-validate once if a concurrent writer stored one of the
+            idempotency keys first (unique index violation).
+
+    Returns:
+        list[PunchResult]: One result per item, in the order given. Created punches carry their
+        new id; replays carry the original punch's id.
+    """
+    if not items:
+        return []
+    employee_ids = {item.employee_id for item in items}
+    for item in items:
+        # In-memory grid lookups, no queries (besides the first load of the site index)
+        item.site_id, item.outside_geofence = resolve_site(session, item.latitude, item.longitude)
+    lock_employees(session, employee_ids)
+    results, created = _validate_batch(items, _last_punches(session, employee_ids), _stored_keys(session, items))
+    if not created:
+        session.rollback() # End the read transaction
+        return results
+    try:
+        record_ids = _insert_punch_rows(session, [row for _, row in created])
+        created_keys = {}
+        for (result, row), record_id in zip(created, record_ids):
+            result.record_id = record_id
+            if row["idempotency_key"] is not None:
+                created_keys[(row["employee_id"], row["idempotency_key"])] = record_id
+            # Core insert: notify the DailyWorkSummary refresh, presence and event feed ourselves
+            mark_work_day(session, row["employee_id"], row["work_date"])
+            track_punch(session, row["employee_id"], row["record_type"], row["timestamp"], row["latitude"], row["longitude"], row["site_id"])
+            queue_event(session, "time_record", time_record_event_data(
+                record_id, row["employee_id"], row["record_type"], row["timestamp"], row["latitude"], row["longitude"], row["photo_url"],
+                row["site_id"], row["outside_geofence"], row["work_date"]
+            ))
+        for item, result in zip(items, results):
+            if result.outcome == PUNCH_REPLAYED and result.record_id is None:
+                # Repeats a key first seen earlier in this batch
+                result.record_id = created_keys[(item.employee_id, item.idempotency_key)]
+        session.commit()
+    except IntegrityError:
+        session.rollback()
+        if not retry_on_conflict:
+            raise
+        return ingest_punch_batch(session, items, retry_on_conflict=False)
+    return results
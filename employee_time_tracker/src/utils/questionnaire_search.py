@@ -0,0 +1,209 @@
+import re
+import unicodedata
+
+import sqlalchemy as sa
+from sqlalchemy import event
+
+from src.models.supervisor_questionnaire import SupervisorQuestionnaireResponse
+
+# Inverted index over the questionnaire texts, kept next to (not inside) the response table:
+# an FTS5 virtual table on SQLite, a tsvector column with a GIN index on PostgreSQL. Other
+# databases (or one where the index hasn't been created yet) fall back to a LIKE scan.
+SEARCH_TABLE = "questionnaire_search"
+SEARCHED_FIELDS = ("strengths_text", "improvements_text", "employee_wellbeing_text", "observations_text")
+# Text search configuration used on PostgreSQL (stemming + Portuguese stop words)
+POSTGRES_TEXT_SEARCH_CONFIG = "portuguese"
+
+BACKEND_FTS5 = "fts5"
+BACKEND_TSVECTOR = "tsvector"
+BACKEND_LIKE = "like"
+
+# Dialects that can have an index, and the backend serving it
+INDEXED_BACKENDS = {"sqlite": BACKEND_FTS5, "postgresql": BACKEND_TSVECTOR}
+
+_search_backends = {} # engine URL -> indexed backend, cached once the index table is seen
+
+def normalize_search_text(text):
+    """Lowercases and strips accents, so "Manutenção" and "manutencao" index (and match) alike."""
+    decomposed = unicodedata.normalize("NFKD", text or "")
+    return "".join(char for char in decomposed if not unicodedata.combining(char)).lower()
+
+def search_document(response):
+    """Normalized text indexed for a response: its four answers, one per line."""
+    return "\n".join(normalize_search_text(getattr(response, field)) for field in SEARCHED_FIELDS if getattr(response, field))
+
+def parse_search_query(query):
+    """
+    Splits a search string into terms, each a tuple of normalized words matched as a phrase.
+
+    "quoted text" is a phrase, and a trailing * makes the last word a prefix
+    ("vazam*"). Every term must match. Only word characters reach the index, so
+    the user can't inject FTS5 or tsquery syntax.
+
+    Returns:
+        list[tuple]: (words, prefix) pairs; empty if the query has no words.
+    """
+    terms = []
+    for match in re.finditer(r'"([^"]*)"?|(\S+)', query or ""):
+        phrase, word = match.group(1), match.group(2)
+        text = phrase if phrase is not None else word
+        words = tuple(re.findall(r"\w+", normalize_search_text(text)))
+        if words:
+            terms.append((words, phrase is None and word.endswith("*")))
+    return terms
+
+def fts5_query(terms):
+    return " ".join('"' + " ".join(words) + '"' + ("*" if prefix else "") for words, prefix in terms)
+
+def tsquery(terms):
+    return " & ".join(
+        "(" + " <-> ".join(words[:-1] + (words[-1] + (":*" if prefix else ""),)) + ")"
+        for words, prefix in terms
+    )
+
+def search_backend(connection):
+    """
+    Backend that serves searches on this database (see the module comment).
+
+    Only an indexed backend is cached: until the index table exists (m0009 may run while
+    workers are up) every call checks again, so no insert skips index_responses once it does.
+    """
+    backend = INDEXED_BACKENDS.get(connection.dialect.name)
+    if backend is None:
+        return BACKEND_LIKE
+    key = str(connection.engine.url)
+    if key in _search_backends:
+        return _search_backends[key]
+    if not sa.inspect(connection).has_table(SEARCH_TABLE):
+        return BACKEND_LIKE
+    _search_backends[key] = backend
+    return backend
+
+def create_search_index(connection):
+    """
+    Creates the search index for the connection's database (no-op where there is none).
+
+    Returns:
+        bool: True if the database has an index to maintain.
+    """
+    _search_backends.clear()
+    if connection.dialect.name == "sqlite":
+        try:
+            connection.execute(sa.text(
+                f"CREATE VIRTUAL TABLE IF NOT EXISTS {SEARCH_TABLE} USING fts5(body, tokenize='unicode61 remove_diacritics 2')"
+            ))
+        except sa.exc.OperationalError as e: # SQLite built without FTS5
+            print(f"Full-text search unavailable, falling back to LIKE: {e}")
+            return False
+        return True
+    if connection.dialect.name == "postgresql":
+        connection.execute(sa.text(
+            f"CREATE TABLE IF NOT EXISTS {SEARCH_TABLE} ("
+            "response_id INTEGER PRIMARY KEY REFERENCES supervisor_questionnaire_response(id) ON DELETE CASCADE, "
+            "search_vector TSVECTOR NOT NULL)"
+        ))
+        connection.execute(sa.text(
+            f"CREATE INDEX IF NOT EXISTS ix_{SEARCH_TABLE}_vector ON {SEARCH_TABLE} USING GIN (search_vector)"
+        ))
+        return True
+    return False
+
+def drop_search_index(connection):
+    _search_backends.clear()
+    if connection.dialect.name in ("sqlite", "postgresql"):
+        connection.execute(sa.text(f"DROP TABLE IF EXISTS {SEARCH_TABLE}"))
+
+def index_responses(connection, responses):
+    """
+    Writes (or rewrites) the index entries of `responses` on `connection`.
+
+    Args:
+        connection: SQLAlchemy connection, in the transaction that wrote the responses.
+        responses (list): Objects with id and the four text fields.
+    """
+    backend = search_backend(connection)
+    if backend == BACKEND_LIKE or not responses:
+        return
+    rows = [{"response_id": response.id, "body": search_document(response)} for response in responses]
+    if backend == BACKEND_FTS5:
+        connection.execute(sa.text(f"DELETE FROM {SEARCH_TABLE} WHERE rowid = :response_id"), rows)
+        connection.execute(sa.text(f"INSERT INTO {SEARCH_TABLE} (rowid, body) VALUES (:response_id, :body)"), rows)
+    else:
+        connection.execute(sa.text(
+            f"INSERT INTO {SEARCH_TABLE} (response_id, search_vector) "
+            f"VALUES (:response_id, to_tsvector('{POSTGRES_TEXT_SEARCH_CONFIG}', :body)) "
+            "ON CONFLICT (response_id) DO UPDATE SET search_vector = EXCLUDED.search_vector"
+        ), rows)
+
+def unindex_responses(connection, response_ids):
+    if search_backend(connection) == BACKEND_FTS5 and response_ids:
+        connection.execute(sa.text(f"DELETE FROM {SEARCH_TABLE} WHERE rowid = :response_id"),
+                           [{"response_id": response_id} for response_id in response_ids])
+    # PostgreSQL entries go with the response (ON DELETE CASCADE)
+
+def search_questionnaire_responses(session, query, supervisor_id=None, start=None, end=None, limit=20, offset=0):
+    """
+    Ranks questionnaire responses against a search string.
+
+    Matching ignores case and accents. FTS5 ranks by bm25 and PostgreSQL by ts_rank_cd,
+    with the most recent first on ties. The LIKE fallback has no ranking, so its results
+    are ordered by most recent, and it is only accent-insensitive if the collation is.
+
+    Args:
+        session: SQLAlchemy session (db.session).
+        query (str): Search string (see parse_search_query).
+        supervisor_id (int, optional): Only this supervisor's responses.
+        start, end (datetime, optional): Naive UTC [start, end) on the response timestamp.
+        limit, offset (int): Page of the ranked results.
+
+    Returns:
+        list[tuple]: (SupervisorQuestionnaireResponse, score or None), best match first.
+    """
+    terms = parse_search_query(query)
+    if not terms:
+        return []
+    Response = SupervisorQuestionnaireResponse
+    backend = search_backend(session.connection())
+
+    if backend == BACKEND_FTS5:
+        search = sa.table(SEARCH_TABLE, sa.column("rowid"))
+        score = (-sa.func.bm25(sa.literal_column(SEARCH_TABLE))).label("score") # bm25: lower is better
+        statement = sa.select(Response, score).join(search, search.c.rowid == Response.id).where(
+            sa.literal_column(SEARCH_TABLE).op("MATCH")(fts5_query(terms))
+        )
+    elif backend == BACKEND_TSVECTOR:
+        search = sa.table(SEARCH_TABLE, sa.column("response_id"), sa.column("search_vector"))
+        ts_query = sa.func.to_tsquery(sa.literal_column(f"'{POSTGRES_TEXT_SEARCH_CONFIG}'::regconfig"), tsquery(terms))
+        score = sa.func.ts_rank_cd(search.c.search_vector, ts_query).label("score")
+        statement = sa.select(Response, score).join(search, search.c.response_id == Response.id).where(
+            search.c.search_vector.op("@@")(ts_query)
+        )
+    else:
+        conditions = []
+        for words, _prefix in terms: # Substring matching already covers prefixes
+            pattern = "%" + "%".join(words) + "%"
+            conditions.append(sa.or_(*[getattr(Response, field).ilike(pattern) for field in SEARCHED_FIELDS]))
+        score = sa.null().label("score")
+        statement = sa.select(Response, score).where(*conditions)
+
+    if supervisor_id is not None:
+        statement = statement.where(Response.supervisor_id == supervisor_id)
+    if start is not None:
+        statement = statement.where(Response.timestamp >= start)
+    if end is not None:
+        statement = statement.where(Response.timestamp < end)
+    if backend != BACKEND_LIKE:
+        statement = statement.order_by(sa.desc("score"), Response.timestamp.desc(), Response.id.desc())
+    else:
+        statement = statement.order_by(Response.timestamp.desc(), Response.id.desc())
+    return [(row[0], row[1]) for row in session.execute(statement.limit(limit).offset(offset))]
+
+# Keep the index in step with ORM writes, in the same transaction
+@event.listens_for(SupervisorQuestionnaireResponse, "after_insert")
+@event.listens_for(SupervisorQuestionnaireResponse, "after_update")
+def index_questionnaire_response(mapper, connection, target):
+    index_responses(connection, [target])
+
+@event.listens_for(SupervisorQuestionnaireResponse, "after_delete")
+def unindex_questionnaire_response(mapper, connection, target):
+    unindex_responses(connection, [target.id])
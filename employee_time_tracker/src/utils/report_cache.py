@@ -0,0 +1,166 @@
+import os
+import json
+import threading
+import time
+from collections import OrderedDict, defaultdict
+from datetime import timedelta
+
+from src.utils.business_time import business_today
+
+REPORT_CACHE_MAX_ENTRIES = int(os.getenv("REPORT_CACHE_MAX_ENTRIES", "256"))
+REPORT_CACHE_MAX_BYTES = int(os.getenv("REPORT_CACHE_MAX_BYTES", str(64 * 1024 * 1024)))
+# Versions only see commits made by this process; writes from other workers or from scripts
+# (rebuild_daily_summary.py, migrate.py) are picked up once cached reports expire
+REPORT_CACHE_TTL_SECONDS = float(os.getenv("REPORT_CACHE_TTL_SECONDS", "300"))
+# Per-day versions are kept for this many days back; older ones are pruned once a day
+REPORT_VERSION_RETENTION_DAYS = int(os.getenv("REPORT_VERSION_RETENTION_DAYS", "400"))
+
+class DataVersions:
+    """
+    Monotonic change counters used to tell whether a cached report is still valid.
+
+    Punch changes bump a per-employee, per-day counter; changes to an employee's own data
+    (expected times, admission date, name, new/removed employees) bump a per-employee one.
+    A report's fingerprint sums the counters it depends on, so any relevant change moves it.
+
+    Day counters older than the retention window are dropped so the maps stay bounded.
+    Dropping resets sums, so every prune starts a new generation, and reports that reach
+    back past the horizon include it in their fingerprint.
+    """
+
+    def __init__(self, retention_days=REPORT_VERSION_RETENTION_DAYS):
+        self._lock = threading.Lock()
+        self._day_versions = defaultdict(int) # (employee_id, day) -> version
+        self._day_totals = defaultdict(int) # day -> sum of versions over all employees
+        self._employee_versions = defaultdict(int) # employee_id -> version
+        self._employees_total = 0 # Sum of all employee versions
+        self.retention_days = retention_days
+        self._horizon = None # Days before this may have been pruned
+        self._generation = 0 # Bumped on every prune
+
+    def _prune(self):
+        """Drops day counters older than the retention window (at most once a day). Call with the lock held."""
+        horizon = business_today() - timedelta(days=self.retention_days)
+        if self._horizon is not None and horizon <= self._horizon:
+            return
+        self._horizon = horizon
+        stale_days = [day for day in self._day_totals if day < horizon]
+        if not stale_days:
+            return
+        for day in stale_days:
+            del self._day_totals[day]
+        for key in [key for key in self._day_versions if key[1] < horizon]:
+            del self._day_versions[key]
+        self._generation += 1
+
+    def bump_day(self, employee_id, day):
+        with self._lock:
+            self._prune()
+            self._day_versions[(employee_id, day)] += 1
+            self._day_totals[day] += 1
+
+    def bump_employee(self, employee_id):
+        with self._lock:
+            self._employee_versions[employee_id] += 1
+            self._employees_total += 1
+
+    def fingerprint(self, start_date, end_date, employee_id=None):
+        """Version fingerprint of the data behind a report over [start_date, end_date]."""
+        days = [start_date + timedelta(days=offset) for offset in range((end_date - start_date).days + 1)]
+        with self._lock:
+            self._prune()
+            generation = self._generation if start_date < self._horizon else None
+            if employee_id is None:
+                return (generation, self._employees_total, sum(self._day_totals.get(day, 0) for day in days))
+            return (
+                generation,
+                self._employee_versions.get(employee_id, 0),
+                sum(self._day_versions.get((employee_id, day), 0) for day in days)
+            )
+
+class ReportCache:
+    """Thread-safe LRU cache of report results, bounded by entry count, total size and age."""
+
+    def __init__(self, max_entries=REPORT_CACHE_MAX_ENTRIES, max_bytes=REPORT_CACHE_MAX_BYTES, ttl_seconds=REPORT_CACHE_TTL_SECONDS):
+        self.max_entries = max_entries
+        self.max_bytes = max_bytes
+        self.ttl_seconds = ttl_seconds
+        self._entries = OrderedDict() # key -> (fingerprint, value, size, expires_at)
+        self._bytes = 0
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+
+    def get(self, key, fingerprint):
+        """Returns the cached value, or None if missing, expired or computed from older data."""
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is None or entry[0] != fingerprint or entry[3] <= time.monotonic():
+                self.misses += 1
+                return None
+            self._entries.move_to_end(key)
+            self.hits += 1
+            return entry[1]
+
+    def put(self, key, fingerprint, value):
+        size = len(value) if isinstance(value, bytes) else len(json.dumps(value, default=str))
+        if size > self.max_bytes:
+            return
+        with self._lock:
+            previous = self._entries.pop(key, None)
+            if previous is not None:
+                self._bytes -= previous[2]
+            self._entries[key] = (fingerprint, value, size, time.monotonic() + self.ttl_seconds)
+            self._bytes += size
+            while len(self._entries) > self.max_entries or self._bytes > self.max_bytes:
+                _, (_, _, evicted_size, _) = self._entries.popitem(last=False)
+                self._bytes -= evicted_size
+
+    def stats(self):
+        with self._lock:
+            return {
+                "hits": self.hits,
+                "misses": self.misses,
+                "entries": len(self._entries),
+                "bytes": self._bytes,
+                "max_entries": self.max_entries,
+                "max_bytes": self.max_bytes,
+                "ttl_seconds": self.ttl_seconds
+            }
+
+data_versions = DataVersions()
+report_cache = ReportCache()
+
+# Bump versions only once changes are committed, so a report computed in between can't
+# be cached under a fingerprint that already claims to include them.
+from sqlalchemy import event, inspect
+from sqlalchemy.orm import Session, object_session
+from src.models.employee import Employee
+from src.models.daily_work_summary import COMMITTED_WORK_DAYS_KEY
+
+CHANGED_EMPLOYEES_KEY = "changed_employee_ids"
+# Employee columns the reports read (besides punches)
+REPORT_EMPLOYEE_COLUMNS = ("name", "expected_arrival_time", "expected_departure_time", "admission_date")
+
+@event.listens_for(Employee, "after_insert")
+@event.listens_for(Employee, "after_delete")
+def track_added_removed_employee(mapper, connection, target):
+    object_session(target).info.setdefault(CHANGED_EMPLOYEES_KEY, set()).add(target.id)
+
+@event.listens_for(Employee, "after_update")
+def track_updated_employee(mapper, connection, target):
+    state = inspect(target)
+    if any(state.attrs[column].history.has_changes() for column in REPORT_EMPLOYEE_COLUMNS):
+        object_session(target).info.setdefault(CHANGED_EMPLOYEES_KEY, set()).add(target.id)
+
+@event.listens_for(Session, "after_commit")
+def bump_committed_versions(session):
+    for employee_id, work_date in session.info.pop(COMMITTED_WORK_DAYS_KEY, ()):
+        data_versions.bump_day(employee_id, work_date)
+    for employee_id in session.info.pop(CHANGED_EMPLOYEES_KEY, ()):
+        data_versions.bump_employee(employee_id)
+
+@event.listens_for(Session, "after_rollback")
+def discard_uncommitted_versions(session):
+    session.info.pop(COMMITTED_WORK_DAYS_KEY, None)
+    session.info.pop(CHANGED_EMPLOYEES_KEY, None)
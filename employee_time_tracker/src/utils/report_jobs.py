@@ -0,0 +1,124 @@
+import os
+import tempfile
+import threading
+import uuid
+import multiprocessing
+from concurrent.futures import ProcessPoolExecutor
+from datetime import datetime, timedelta
+
+# Rendered reports are written here and served from disk by the download endpoint
+REPORT_CACHE_DIR = os.getenv("REPORT_CACHE_DIR", os.path.join(tempfile.gettempdir(), "employee_time_tracker_reports"))
+# Number of separate rendering processes (WeasyPrint runs there, not in the web threads)
+REPORT_JOB_WORKERS = int(os.getenv("REPORT_JOB_WORKERS", "2"))
+# Finished jobs (and their files) are forgotten after this long
+REPORT_JOB_TTL = timedelta(hours=int(os.getenv("REPORT_JOB_TTL_HOURS", "6")))
+
+class ReportJob:
+    """A PDF report rendering job running in the process pool."""
+
+    def __init__(self, job_id, template_name, filename, output_path):
+        self.id = job_id
+        self.template_name = template_name
+        self.filename = filename # Download name shown to the user
+        self.output_path = output_path
+        self.created_at = datetime.utcnow()
+        self.finished_at = None
+        self.future = None
+
+    @property
+    def status(self):
+        if self.future is None or not self.future.done():
+            return "running" if self.future is not None and self.future.running() else "queued"
+        return "failed" if self.future.exception() is not None else "done"
+
+    def to_dict(self):
+        return {
+            "job_id": self.id,
+            "status": self.status,
+            "template": self.template_name,
+            "filename": self.filename,
+            "created_at": self.created_at.isoformat(),
+            "finished_at": self.finished_at.isoformat() if self.finished_at else None,
+            "error": str(self.future.exception()) if self.status == "failed" else None
+        }
+
+_jobs = {}
+_jobs_lock = threading.Lock()
+_executor = None
+
+def _get_executor():
+    global _executor
+    with _jobs_lock:
+        if _executor is None:
+            # "spawn" avoids forking a multi-threaded (gunicorn --threads) web process
+            _executor = ProcessPoolExecutor(
+                max_workers=REPORT_JOB_WORKERS,
+                mp_context=multiprocessing.get_context("spawn")
+            )
+        return _executor
+
+def _render_pdf_to_file(template_name, data, logo_path, output_path):
+    """Runs in a worker process: renders the report and writes it atomically to output_path."""
+    from src.utils.pdf_generator import generate_pdf_report
+
+    pdf_bytes = generate_pdf_report(template_name, data, logo_path=logo_path)
+    if not pdf_bytes:
+        raise RuntimeError("Falha ao gerar relatório PDF")
+    temp_path = f"{output_path}.tmp"
+    with open(temp_path, "wb") as output_file:
+        output_file.write(pdf_bytes)
+    os.replace(temp_path, output_path)
+    return output_path
+
+def _on_job_finished(job, future, on_success):
+    job.finished_at = datetime.utcnow()
+    error = future.exception()
+    if error is not None:
+        print(f"Error rendering report job {job.id} ({job.template_name}): {error}")
+    elif on_success is not None:
+        try:
+            on_success(job)
+        except Exception as e:
+            print(f"Error in report job {job.id} completion callback: {e}")
+
+def _purge_expired_jobs():
+    cutoff = datetime.utcnow() - REPORT_JOB_TTL
+    with _jobs_lock:
+        expired = [job for job in _jobs.values() if job.finished_at and job.finished_at < cutoff]
+        for job in expired:
+            del _jobs[job.id]
+    for job in expired:
+        try:
+            os.remove(job.output_path)
+        except OSError:
+            pass
+
+def submit_pdf_job(template_name, data, filename, logo_path=None, on_success=None):
+    """
+    Queues a PDF report for rendering in a separate process.
+
+    Args:
+        template_name (str): Jinja2 template, as for generate_pdf_report.
+        data (dict): Template data (must be picklable: plain dicts, lists, strings, numbers).
+        filename (str): Name used when the finished file is downloaded.
+        logo_path (str, optional): Absolute path to the logo image file.
+        on_success (callable, optional): Called with the job once its file is written.
+
+    Returns:
+        ReportJob: The queued job; poll get_job(job.id) for its status.
+    """
+    _purge_expired_jobs()
+    os.makedirs(REPORT_CACHE_DIR, exist_ok=True)
+
+    job_id = uuid.uuid4().hex
+    job = ReportJob(job_id, template_name, filename, os.path.join(REPORT_CACHE_DIR, f"{job_id}.pdf"))
+    with _jobs_lock:
+        _jobs[job_id] = job
+    job.future = _get_executor().submit(_render_pdf_to_file, template_name, data, logo_path, job.output_path)
+    job.future.add_done_callback(lambda future: _on_job_finished(job, future, on_success))
+    return job
+
+def get_job(job_id):
+    """Returns the ReportJob with this id, or None if unknown or expired."""
+    with _jobs_lock:
+        return _jobs.get(job_id)
@@ -0,0 +1,149 @@
+import math
+import os
+import threading
+import time
+
+from src.utils.geo import distance_meters, METERS_PER_DEGREE_LATITUDE
+
+# Side of a grid cell, in degrees (about 1.1 km north-south)
+SITE_GRID_CELL_DEGREES = 0.01
+# A location farther than this from every site's geofence isn't tagged with a site at all
+SITE_MATCH_MAX_METERS = float(os.getenv("SITE_MATCH_MAX_METERS", "1000"))
+# Other workers only see site changes through this reload (the committing one rebuilds at once)
+SITE_INDEX_TTL_SECONDS = float(os.getenv("SITE_INDEX_TTL_SECONDS", "300"))
+
+class IndexedSite:
+    __slots__ = ("id", "name", "latitude", "longitude", "radius_meters")
+
+    def __init__(self, site_id, name, latitude, longitude, radius_meters):
+        self.id = site_id
+        self.name = name
+        self.latitude = latitude
+        self.longitude = longitude
+        self.radius_meters = radius_meters
+
+class SiteMatch:
+    """Nearest site to a location: distance to its center and whether its geofence contains it."""
+    __slots__ = ("site", "distance_meters", "inside")
+
+    def __init__(self, site, distance, inside):
+        self.site = site
+        self.distance_meters = distance
+        self.inside = inside
+
+def _cell(latitude, longitude):
+    return (math.floor(latitude / SITE_GRID_CELL_DEGREES), math.floor(longitude / SITE_GRID_CELL_DEGREES))
+
+class SiteIndex:
+    """
+    Uniform lat/lng grid over the active sites, for tagging punches and check-ins.
+
+    Each site is stored in every cell its match area (geofence radius plus
+    SITE_MATCH_MAX_METERS) overlaps, so a lookup only computes distances to the sites of
+    the location's own cell: a handful, whatever the number of sites.
+    """
+
+    def __init__(self, ttl_seconds=SITE_INDEX_TTL_SECONDS):
+        self.ttl_seconds = ttl_seconds
+        self._cells = None # (lat cell, lng cell) -> [IndexedSite]
+        self._names = {} # site id -> name
+        self._loaded_at = 0.0
+        self._lock = threading.Lock()
+
+    def invalidate(self):
+        # Keep serving the current grid until the next lookup reloads it
+        self._loaded_at = float("-inf")
+
+    def build(self, sites):
+        cells = {}
+        for site in sites:
+            reach = site.radius_meters + SITE_MATCH_MAX_METERS
+            lat_reach = reach / METERS_PER_DEGREE_LATITUDE
+            # Degrees of longitude shrink towards the poles; use the widest latitude of the area
+            widest_cos = max(math.cos(math.radians(min(abs(site.latitude) + lat_reach, 89.9))), 1e-6)
+            lng_reach = reach / (METERS_PER_DEGREE_LATITUDE * widest_cos)
+            min_lat, min_lng = _cell(site.latitude - lat_reach, site.longitude - lng_reach)
+            max_lat, max_lng = _cell(site.latitude + lat_reach, site.longitude + lng_reach)
+            for lat_cell in range(min_lat, max_lat + 1):
+                for lng_cell in range(min_lng, max_lng + 1):
+                    cells.setdefault((lat_cell, lng_cell), []).append(site)
+        self._cells = cells
+        self._names = {site.id: site.name for site in sites}
+        self._loaded_at = time.monotonic()
+
+    def _ensure_loaded(self, session):
+        if self._cells is not None and time.monotonic() - self._loaded_at < self.ttl_seconds:
+            return
+        with self._lock:
+            if self._cells is not None and time.monotonic() - self._loaded_at < self.ttl_seconds:
+                return
+            rows = session.query(Site.id, Site.name, Site.latitude, Site.longitude, Site.radius_meters).filter(
+                Site.active.is_(True)
+            ).all()
+            self.build([IndexedSite(*row) for row in rows])
+
+    def has_sites(self, session):
+        self._ensure_loaded(session)
+        return bool(self._names)
+
+    def site_name(self, session, site_id):
+        self._ensure_loaded(session)
+        return self._names.get(site_id)
+
+    def nearest(self, session, latitude, longitude):
+        """
+        Returns the SiteMatch for the site whose geofence is closest to the location, or None
+        if no site is within SITE_MATCH_MAX_METERS of its geofence.
+
+        A site whose geofence contains the location always wins over one that doesn't.
+        """
+        self._ensure_loaded(session)
+        best = None
+        best_gap = None
+        for site in self._cells.get(_cell(latitude, longitude), ()):
+            distance = distance_meters(latitude, longitude, site.latitude, site.longitude)
+            gap = distance - site.radius_meters # Negative inside the geofence
+            if gap > SITE_MATCH_MAX_METERS:
+                continue
+            if best_gap is None or gap < best_gap:
+                best, best_gap = SiteMatch(site, distance, gap <= 0), gap
+        return best
+
+site_index = SiteIndex()
+
+def resolve_site(session, latitude, longitude):
+    """
+    Resolves a punch or check-in location to (site_id, outside_geofence).
+
+    Returns (None, None) without coordinates or when no sites are registered, and
+    (None, True) when the location is far from every site.
+    """
+    if latitude is None or longitude is None or not site_index.has_sites(session):
+        return None, None
+    match = site_index.nearest(session, latitude, longitude)
+    if match is None:
+        return None, True
+    return match.site.id, not match.inside
+
+# --- Rebuild after site changes commit --- #
+from sqlalchemy import event
+from sqlalchemy.orm import Session, object_session
+from src.models.site import Site
+
+# Key in session.info flagging that sites changed in the current transaction
+SITES_CHANGED_KEY = "sites_changed"
+
+@event.listens_for(Site, "after_insert")
+@event.listens_for(Site, "after_update")
+@event.listens_for(Site, "after_delete")
+def flag_sites_changed(mapper, connection, target):
+    object_session(target).info[SITES_CHANGED_KEY] = True
+
+@event.listens_for(Session, "after_commit")
+def rebuild_site_index(session):
+    if session.info.pop(SITES_CHANGED_KEY, None):
+        site_index.invalidate()
+
+@event.listens_for(Session, "after_rollback")
+def discard_site_changes(session):
+    session.info.pop(SITES_CHANGED_KEY, None)
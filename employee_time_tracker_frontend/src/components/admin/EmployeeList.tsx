@@ -24,7 +24,7 @@ const EmployeeList: React.FC = () => {
       setError(null);
       try {
         const token = localStorage.getItem('token'); // Assuming token is stored in localStorage
-        const response = await fetch('http://localhost:5004/admin/employees', {
+        const response = await fetch('http://localhost:5004/admin/employees?fields=id,name,email,cpf,role', {
           headers: {
             'Authorization': `Bearer ${token}`,
           },
@@ -1,7 +1,7 @@
 
 'use client';
 
-import React, { useState, useEffect } from 'react';
+import React, { useState, useEffect, useMemo } from 'react';
 
 // Define the TimeRecord type based on your backend model
 interface TimeRecord {
@@ -72,9 +72,15 @@ const groupRecords = (records: TimeRecord[]): DailyRecord[] => {
 };
 
 
+// Records fetched per page (the endpoint allows up to 500)
+const PAGE_SIZE = 200;
+
 const TimeRecordList: React.FC = () => {
-  const [groupedRecords, setGroupedRecords] = useState<DailyRecord[]>([]);
+  const [records, setRecords] = useState<TimeRecord[]>([]);
+  const [reloadKey, setReloadKey] = useState(0); // Bumped to reload the list from its first page (event feed gap)
   const [loading, setLoading] = useState(true);
+  const [nextCursor, setNextCursor] = useState<string | null>(null); // Next page of the current filters, if any
+  const [loadingMore, setLoadingMore] = useState(false);
   const [error, setError] = useState<string | null>(null);
   const [filterStartDate, setFilterStartDate] = useState<string>('');
   const [filterEndDate, setFilterEndDate] = useState<string>('');
@@ -85,43 +91,50 @@ const TimeRecordList: React.FC = () => {
     return timeString || '-';
   };
 
+  // Fetches one keyset page of records matching the filters (after `cursor`, if given)
+  const fetchPage = async (cursor: string | null) => {
+    const token = localStorage.getItem('token');
+    // Construct query parameters based on filters
+    const queryParams = new URLSearchParams();
+    if (filterStartDate) queryParams.append('start_date', filterStartDate);
+    if (filterEndDate) queryParams.append('end_date', filterEndDate);
+    if (filterEmployeeId) queryParams.append('employee_id', filterEmployeeId);
+    queryParams.append('limit', String(PAGE_SIZE));
+    if (cursor) queryParams.append('cursor', cursor);
+
+    const response = await fetch(`http://localhost:5004/admin/time-records?${queryParams.toString()}`, {
+      headers: {
+        'Authorization': `Bearer ${token}`,
+      },
+    });
+
+    const responseText = await response.text(); // Read response as text first
+
+    if (!response.ok) {
+      // Try to parse error message if backend sends JSON error
+      try {
+        const errorData = JSON.parse(responseText);
+        throw new Error(errorData.error || `Falha ao buscar registros: ${response.statusText}`);
+      } catch (parseError) {
+        // If parsing fails, use the raw text or status text
+        throw new Error(`Falha ao buscar registros: ${response.statusText} - ${responseText.substring(0, 100)}`);
+      }
+    }
+
+    // If response is OK, parse as JSON
+    const page: { records: TimeRecord[]; next_cursor: string | null } = JSON.parse(responseText);
+    return page;
+  };
+
   useEffect(() => {
+    // Only the first page: older records are fetched on demand with "Carregar mais"
     const fetchTimeRecords = async () => {
       setLoading(true);
       setError(null);
       try {
-        const token = localStorage.getItem('token');
-        // Construct query parameters based on filters
-        const queryParams = new URLSearchParams();
-        if (filterStartDate) queryParams.append('start_date', filterStartDate);
-        if (filterEndDate) queryParams.append('end_date', filterEndDate);
-        if (filterEmployeeId) queryParams.append('employee_id', filterEmployeeId);
-
-        // Corrected endpoint with hyphen
-        const response = await fetch(`http://localhost:5004/admin/time-records?${queryParams.toString()}`, {
-          headers: {
-            'Authorization': `Bearer ${token}`,
-          },
-        });
-
-        const responseText = await response.text(); // Read response as text first
-        // console.log("Raw response:", responseText);
-
-        if (!response.ok) {
-          // Try to parse error message if backend sends JSON error
-          try {
-            const errorData = JSON.parse(responseText);
-            throw new Error(errorData.error || `Falha ao buscar registros: ${response.statusText}`);
-          } catch (parseError) {
-            // If parsing fails, use the raw text or status text
-            throw new Error(`Falha ao buscar registros: ${response.statusText} - ${responseText.substring(0, 100)}`);
-          }
-        }
-
-        // If response is OK, parse as JSON
-        const data: TimeRecord[] = JSON.parse(responseText);
-        setGroupedRecords(groupRecords(data)); // Group the fetched records
-
+        const page = await fetchPage(null);
+        setRecords(page.records);
+        setNextCursor(page.next_cursor);
       } catch (err: any) {
         setError(err.message || 'Ocorreu um erro ao buscar registros.');
         console.error('Fetch time records error:', err);
@@ -131,7 +144,61 @@ const TimeRecordList: React.FC = () => {
     };
 
     fetchTimeRecords();
-  }, [filterStartDate, filterEndDate, filterEmployeeId]); // Refetch when filters change
+  }, [filterStartDate, filterEndDate, filterEmployeeId, reloadKey]); // Refetch when filters change
+
+  const loadMore = async () => {
+    if (!nextCursor) return;
+    setLoadingMore(true);
+    setError(null);
+    try {
+      const page = await fetchPage(nextCursor);
+      setRecords(current => [...current, ...page.records]);
+      setNextCursor(page.next_cursor);
+    } catch (err: any) {
+      setError(err.message || 'Ocorreu um erro ao buscar registros.');
+      console.error('Fetch more time records error:', err);
+    } finally {
+      setLoadingMore(false);
+    }
+  };
+
+  // Live updates: append punches committed after the initial load instead of polling
+  useEffect(() => {
+    let source: EventSource;
+    let retryTimer: ReturnType<typeof setTimeout> | undefined;
+    const connect = () => {
+      source = new EventSource('http://localhost:5004/admin/events?types=time_record');
+      source.addEventListener('time_record', (event) => {
+        const punch = JSON.parse((event as MessageEvent).data);
+        if (filterEmployeeId && String(punch.employee_id) !== filterEmployeeId) return;
+        // Filters are business days: compare the shift's work_date, not the UTC date of the timestamp
+        if (filterEndDate && punch.work_date && punch.work_date > filterEndDate) return;
+        setRecords(current => {
+          // Events carry no name: reuse one from the loaded records
+          const known = current.find(record => record.employee_id === punch.employee_id);
+          return [...current, { ...punch, employee_name: known ? known.employee_name : `#${punch.employee_id}` }];
+        });
+      });
+      // Some events were missed (server restart, reconnect too late): reload the list
+      source.addEventListener('resync', () => setReloadKey(key => key + 1));
+      // The browser only reconnects by itself after a dropped stream; a refused one (503 when the
+      // server's stream slots are full) closes the source, so retry later and reload what was missed
+      source.onerror = () => {
+        if (source.readyState !== EventSource.CLOSED) return;
+        retryTimer = setTimeout(() => {
+          setReloadKey(key => key + 1);
+          connect();
+        }, 30000);
+      };
+    };
+    connect();
+    return () => {
+      clearTimeout(retryTimer);
+      source.close();
+    };
+  }, [filterEndDate, filterEmployeeId]);
+
+  const groupedRecords = useMemo(() => groupRecords(records), [records]);
 
   // TODO: Fetch employee list for the filter dropdown
 
@@ -209,6 +276,18 @@ const TimeRecordList: React.FC = () => {
           </tbody>
         </table>
       </div>
+
+      {nextCursor && (
+        <div className="text-center mt-4">
+          <button
+            onClick={loadMore}
+            disabled={loadingMore}
+            className="bg-blue-500 hover:bg-blue-700 text-white font-bold py-2 px-4 rounded focus:outline-none focus:shadow-outline disabled:opacity-50"
+          >
+            {loadingMore ? 'Carregando...' : 'Carregar mais'}
+          </button>
+        </div>
+      )}
     </div>
   );
 };
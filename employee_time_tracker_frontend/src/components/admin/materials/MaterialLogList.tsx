@@ -78,7 +78,7 @@ const MaterialLogList: React.FC = () => {
     try {
       const token = localStorage.getItem('token');
       const [empRes, typeRes] = await Promise.all([
-        fetch('http://localhost:5004/admin/employees', { headers: { 'Authorization': `Bearer ${token}` } }),
+        fetch('http://localhost:5004/admin/employees?fields=id,name', { headers: { 'Authorization': `Bearer ${token}` } }),
         fetch('http://localhost:5004/admin/materials/types', { headers: { 'Authorization': `Bearer ${token}` } })
       ]);
       if (empRes.ok) setEmployees(await empRes.json());